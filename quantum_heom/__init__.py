@@ -1,5 +1,7 @@
 # Package info
 
+__version__ = '0.1'
+
 import os
 import sys
 
@@ -1,13 +1,15 @@
 """Contains functions for calculating quantities related to the
 thermal bath; spectral densities (Debye and Ohmic), Bose-Einstein
-distribution, and Redfield rate constant."""
+distribution, Redfield rate constant, and the exponential
+decomposition of the bath correlation function used in HEOM."""
 
 import math
 
-from scipy import constants
+from scipy import constants, linalg
 import numpy as np
 
 SPECTRAL_DENSITIES = ['debye', 'ohmic', 'renger-marcus']
+BATH_EXPANSIONS = ['matsubara', 'pade']
 
 
 def rate_constant_redfield(omega: float, deph_rate: float, cutoff_freq: float,
@@ -326,3 +328,172 @@ def dephasing_rate(cutoff_freq: float, reorg_energy: float,
         return 0.
     return (4 * reorg_energy * constants.k * temperature
             / (constants.hbar * cutoff_freq * 1e12))
+
+def matsubara_decomposition(cutoff_freq: float, reorg_energy: float,
+                            temperature: float, terms: int) -> tuple:
+
+    """
+    Decomposes the correlation function of a bath described by the
+    Debye spectral density into a sum of exponentials, truncating
+    its Matsubara expansion after a number of terms,
+
+    .. math::
+        C(t) \\approx \\sum_{k=0}^{K-1} c_k e^{- \\nu_k t}
+
+    where the first term, with frequency equal to the cutoff
+    frequency, comes from the pole of the spectral density and the
+    remaining terms have the Matsubara frequencies
+    nu_k = 2 pi k k_B T / hbar. These are the coefficients and
+    frequencies generated by QuTiP's HSolverDL.
+
+    Parameters
+    ----------
+    cutoff_freq : float
+        The cutoff frequency of the Debye spectral density, in
+        units of rad ps^-1. Must be a positive float.
+    reorg_energy : float
+        The reorganisation energy of the Debye spectral density, in
+        units of rad ps^-1. Must be a non-negative float.
+    temperature : float
+        The temperature of the bath, in units of Kelvin.
+    terms : int
+        The number of exponential terms K to include.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The K coefficients c_k, in units of rad^2 ps^-2, and the K
+        frequencies nu_k, in units of rad ps^-1.
+    """
+
+    assert cutoff_freq > 0., (
+        'The cutoff freq must be a positive float, in units of rad ps^-1')
+    assert reorg_energy >= 0., (
+        'The scaling factor must be a non-negative float, in units of rad ps^-1')
+    assert temperature > 0., (
+        'The temperature must be a positive float, in units of Kelvin')
+
+    beta = constants.hbar * 1e12 / (constants.k * temperature)  # ps rad^-1
+    freqs = 2 * np.pi * np.arange(terms) / beta
+    coeffs = np.empty(terms, dtype=complex)
+    if terms > 0:
+        freqs[0] = cutoff_freq
+        coeffs[0] = (reorg_energy * cutoff_freq
+                     * (1. / np.tan(cutoff_freq * beta / 2.) - 1j))
+        coeffs[1:] = (4 * reorg_energy * cutoff_freq * freqs[1:]
+                      / ((freqs[1:]**2 - cutoff_freq**2) * beta))
+    return coeffs, freqs
+
+def pade_decomposition(cutoff_freq: float, reorg_energy: float,
+                       temperature: float, terms: int) -> tuple:
+
+    """
+    Decomposes the correlation function of a bath described by the
+    Debye spectral density into a sum of exponentials, using the
+    [N-1/N] Pade spectrum decomposition (PSD) of the Bose function
+    in place of its Matsubara expansion; see J. Hu, R.-X. Xu and
+    Y. Yan, J. Chem. Phys., 2010, 133, 101106. As for
+    matsubara_decomposition(), the first term comes from the pole
+    of the spectral density, and the remaining K - 1 terms from the
+    poles of the approximated Bose function. The Pade poles
+    converge much faster than the Matsubara frequencies, so fewer
+    terms (and hence ADOs) are needed for the same accuracy,
+    particularly at low temperature.
+
+    Parameters
+    ----------
+    cutoff_freq : float
+        The cutoff frequency of the Debye spectral density, in
+        units of rad ps^-1. Must be a positive float.
+    reorg_energy : float
+        The reorganisation energy of the Debye spectral density, in
+        units of rad ps^-1. Must be a non-negative float.
+    temperature : float
+        The temperature of the bath, in units of Kelvin.
+    terms : int
+        The number of exponential terms K to include.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The K coefficients c_k, in units of rad^2 ps^-2, and the K
+        frequencies nu_k, in units of rad ps^-1.
+    """
+
+    assert cutoff_freq > 0., (
+        'The cutoff freq must be a positive float, in units of rad ps^-1')
+    assert reorg_energy >= 0., (
+        'The scaling factor must be a non-negative float, in units of rad ps^-1')
+    assert temperature > 0., (
+        'The temperature must be a positive float, in units of Kelvin')
+
+    coeffs, freqs = matsubara_decomposition(cutoff_freq, reorg_energy,
+                                            temperature, min(terms, 1))
+    poles = terms - 1
+    if poles < 1:
+        return coeffs, freqs
+    beta = constants.hbar * 1e12 / (constants.k * temperature)  # ps rad^-1
+    # The poles (eps) and zeros (chi) of the Pade approximant are given by
+    # the eigenvalues of symmetric tridiagonal matrices.
+    diag = 1. / np.sqrt((2 * np.arange(2 * poles - 1) + 3)
+                        * (2 * np.arange(2 * poles - 1) + 5))
+    eps = -2. / linalg.eigvalsh_tridiagonal(np.zeros(2 * poles), diag)[:poles]
+    diag = 1. / np.sqrt((2 * np.arange(2 * poles - 2) + 5)
+                        * (2 * np.arange(2 * poles - 2) + 7))
+    chi = -2. / linalg.eigvalsh_tridiagonal(np.zeros(2 * poles - 1),
+                                            diag)[:poles - 1]
+    # The residue (kappa) of each pole of the Pade approximant
+    eps_sq = eps**2
+    gaps = eps_sq[np.newaxis, :] - eps_sq[:, np.newaxis] + np.eye(poles)
+    kappa = (0.5 * poles * (2 * poles + 3)
+             * np.prod((chi[np.newaxis, :]**2 - eps_sq[:, np.newaxis])
+                       / gaps[:, :-1], axis=1)
+             / gaps[:, -1])
+    pade_freqs = eps / beta
+    pade_coeffs = (kappa / beta) * 4 * reorg_energy * cutoff_freq * pade_freqs
+    pade_coeffs /= pade_freqs**2 - cutoff_freq**2
+    return (np.concatenate([coeffs, pade_coeffs.astype(complex)]),
+            np.concatenate([freqs, pade_freqs]))
+
+def terminator_factor(cutoff_freq: float, reorg_energy: float,
+                      temperature: float, coeffs: np.ndarray,
+                      freqs: np.ndarray) -> complex:
+
+    """
+    Calculates the factor of the Tanimura terminator for a bath
+    described by the Debye spectral density, whose correlation
+    function has been truncated to the exponential terms passed.
+    This is the integral over time of the part of the correlation
+    function the truncated terms leave out, in the high temperature
+    limit,
+
+    .. math::
+        \\frac{2 \\lambda k_B T}{\\hbar \\omega_c} - i \\lambda
+            - \\sum_k \\frac{c_k}{\\nu_k}
+
+    Parameters
+    ----------
+    cutoff_freq : float
+        The cutoff frequency of the Debye spectral density, in
+        units of rad ps^-1.
+    reorg_energy : float
+        The reorganisation energy of the Debye spectral density, in
+        units of rad ps^-1.
+    temperature : float
+        The temperature of the bath, in units of Kelvin.
+    coeffs : np.ndarray
+        The coefficients c_k of the exponential terms, in units of
+        rad^2 ps^-2.
+    freqs : np.ndarray
+        The frequencies nu_k of the exponential terms, in units of
+        rad ps^-1.
+
+    Returns
+    -------
+    complex
+        The terminator factor, in units of rad ps^-1.
+    """
+
+    beta = constants.hbar * 1e12 / (constants.k * temperature)  # ps rad^-1
+    return (2 * reorg_energy / (beta * cutoff_freq) - 1j * reorg_energy
+            - np.sum(np.asarray(coeffs) / np.asarray(freqs)))
@@ -0,0 +1,212 @@
+"""Contains functions for a persistent, on-disk cache of the time
+evolution data of QuantumSystems, keyed by a hash of their settings."""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import quantum_heom
+from quantum_heom.trajectory import Trajectory
+
+CACHE_DIR_VARIABLE = 'QUANTUM_HEOM_CACHE_DIR'
+CACHE_SIZE_VARIABLE = 'QUANTUM_HEOM_CACHE_SIZE'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache',
+                                 'quantum_heom')
+DEFAULT_CACHE_SIZE = 2 ** 30  # bytes
+
+
+def cache_dir() -> str:
+
+    """
+    Returns the directory the cache is stored in; the value of the
+    QUANTUM_HEOM_CACHE_DIR environment variable if set, otherwise
+    ~/.cache/quantum_heom.
+
+    Returns
+    -------
+    str
+        The path of the cache directory.
+    """
+
+    return os.environ.get(CACHE_DIR_VARIABLE, DEFAULT_CACHE_DIR)
+
+def cache_size() -> int:
+
+    """
+    Returns the maximum total size of the cache; the value of the
+    QUANTUM_HEOM_CACHE_SIZE environment variable if set, otherwise
+    1 GiB.
+
+    Returns
+    -------
+    int
+        The maximum size of the cache, in bytes.
+    """
+
+    return int(os.environ.get(CACHE_SIZE_VARIABLE, DEFAULT_CACHE_SIZE))
+
+def _canonical(value):
+
+    """
+    Converts a setting value to a JSON-serialisable form that is
+    identical for equal values, i.e. tuples and lists, or numpy and
+    Python scalars, give the same result.
+    """
+
+    if isinstance(value, np.ndarray):
+        return {'ndarray': _canonical(value.tolist())}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, complex):
+        return {'complex': [value.real, value.imag]}
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+def settings_key(settings: dict) -> str:
+
+    """
+    Returns a key for a set of QuantumSystem settings; the SHA-256
+    hash of their canonical JSON representation together with the
+    package version, so that results computed by a different
+    version of quantum_HEOM are never reused.
+
+    Parameters
+    ----------
+    settings : dict
+        The settings of the QuantumSystem, as {name: value} pairs.
+
+    Returns
+    -------
+    str
+        The hexadecimal key.
+    """
+
+    canonical = json.dumps({'version': quantum_heom.__version__,
+                            'settings': _canonical(settings)},
+                           sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _path(key: str) -> str:
+
+    return os.path.join(cache_dir(), key + '.npz')
+
+def load(key: str):
+
+    """
+    Loads the time evolution data stored under the key passed, if
+    present, marking it as recently used.
+
+    Parameters
+    ----------
+    key : str
+        The key, as returned by settings_key().
+
+    Returns
+    -------
+    tuple or None
+        The Trajectory and a dict of any extra arrays stored with
+        it, or None if nothing is stored under the key.
+    """
+
+    path = _path(key)
+    try:
+        with np.load(path) as data:
+            evolution = Trajectory(data['times'], data['rho'],
+                                   data['purity'], data['distance'])
+            extras = {name[len('extra_'):]: data[name] for name in data.files
+                      if name.startswith('extra_')}
+    except (OSError, KeyError, ValueError):
+        return None
+    os.utime(path)  # update the access time for least recently used eviction
+    return evolution, extras
+
+def save(key: str, evolution: Trajectory, **extras):
+
+    """
+    Stores time evolution data under the key passed, in compressed
+    .npz format, then evicts the least recently used entries until
+    the cache is within its maximum size. The file is written to a
+    temporary path first and moved into place, so concurrent
+    readers never see a partially written entry.
+
+    Parameters
+    ----------
+    key : str
+        The key, as returned by settings_key().
+    evolution : Trajectory
+        The time evolution data to store.
+    **extras : np.ndarray
+        Any extra arrays to store alongside the time evolution,
+        i.e. the matsubara coefficients used for a HEOM run.
+    """
+
+    directory = cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    arrays = {'extra_' + name: np.asarray(value)
+              for name, value in extras.items() if value is not None}
+    # The temporary file's suffix keeps it out of evict()'s entries, so
+    # another process can't remove it before it is moved into place.
+    handle, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            np.savez_compressed(f, times=evolution.times, rho=evolution.rho,
+                                purity=evolution.purity,
+                                distance=evolution.distance, **arrays)
+        os.replace(tmp_path, _path(key))
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    evict(cache_size())
+
+def evict(max_size: int):
+
+    """
+    Removes the least recently used entries from the cache until its
+    total size is no greater than max_size.
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum total size of the cache, in bytes.
+    """
+
+    directory = cache_dir()
+    if not os.path.isdir(directory):
+        return
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith('.npz'):
+            # Entries may be removed by other processes at any time
+            try:
+                stat = os.stat(os.path.join(directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def clear():
+
+    """
+    Removes all entries from the cache.
+    """
+
+    evict(0)
@@ -0,0 +1,342 @@
+"""Contains functions for averaging the dynamics of a QuantumSystem over
+static disorder in its site energies, by Monte Carlo sampling of many
+realisations of the disorder."""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+from scipy import stats
+import numpy as np
+
+from quantum_heom import ensemble
+from quantum_heom import lindbladian as lind
+from quantum_heom import sweep
+from quantum_heom.lindbladian import LINDBLAD_MODELS
+
+
+class RunningStatistics:
+
+    """
+    Accumulates the mean and variance of a stream of equally shaped
+    arrays, one batch at a time, without storing them, using
+    Welford's algorithm generalised to batches (Chan et al., 1979).
+    Two accumulators over separate parts of a stream can be merged
+    into one over the whole stream.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of each array in the stream.
+    """
+
+    def __init__(self, shape: tuple):
+
+        self._count = 0
+        self._mean = np.zeros(shape, dtype=float)
+        self._sum_sq = np.zeros(shape, dtype=float)
+
+    @property
+    def count(self) -> int:
+
+        """
+        Gets the number of arrays accumulated.
+
+        Returns
+        -------
+        int
+            The number of arrays accumulated.
+        """
+
+        return self._count
+
+    @property
+    def mean(self) -> np.ndarray:
+
+        """
+        Gets the elementwise mean of the arrays accumulated.
+
+        Returns
+        -------
+        np.ndarray
+            The mean, of the shape of the arrays in the stream.
+        """
+
+        return self._mean
+
+    @property
+    def variance(self) -> np.ndarray:
+
+        """
+        Gets the elementwise (unbiased) sample variance of the
+        arrays accumulated.
+
+        Returns
+        -------
+        np.ndarray
+            The variance, of the shape of the arrays in the stream.
+        """
+
+        if self._count < 2:
+            return np.zeros_like(self._mean)
+        return self._sum_sq / (self._count - 1)
+
+    def update(self, batch: np.ndarray):
+
+        """
+        Adds a batch of arrays to the accumulator.
+
+        Parameters
+        ----------
+        batch : np.ndarray
+            The arrays to add, stacked along the first axis.
+        """
+
+        batch = np.asarray(batch, dtype=float)
+        assert batch.shape[1:] == self._mean.shape, (
+            'Arrays must all be of the same shape.')
+        other = RunningStatistics(self._mean.shape)
+        other._count = len(batch)
+        other._mean = np.mean(batch, axis=0)
+        other._sum_sq = np.sum((batch - other._mean) ** 2, axis=0)
+        self.merge(other)
+
+    def merge(self, other):
+
+        """
+        Adds all the arrays accumulated by another RunningStatistics
+        to this one.
+
+        Parameters
+        ----------
+        other : RunningStatistics
+            The accumulator to merge into this one.
+        """
+
+        assert other.mean.shape == self._mean.shape, (
+            'Arrays must all be of the same shape.')
+        count = self._count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self._mean
+        self._sum_sq = (self._sum_sq + other._sum_sq
+                        + delta ** 2 * self._count * other.count / count)
+        self._mean = self._mean + delta * other.count / count
+        self._count = count
+
+    def confidence_interval(self, confidence: float = 0.95) -> np.ndarray:
+
+        """
+        Returns the half-width of the confidence interval of the
+        mean, from the normal approximation to its sampling
+        distribution.
+
+        Parameters
+        ----------
+        confidence : float
+            The confidence level, between 0 and 1. Default is 0.95.
+
+        Returns
+        -------
+        np.ndarray
+            The half-width of the interval, of the shape of the
+            arrays in the stream.
+        """
+
+        assert 0. < confidence < 1., 'confidence must be between 0 and 1.'
+        if self._count == 0:
+            return np.full(self._mean.shape, np.inf)
+        z_score = stats.norm.ppf(0.5 + confidence / 2.)
+        return z_score * np.sqrt(self.variance / self._count)
+
+def disordered_hamiltonians(hamiltonian: np.ndarray, disorder: float,
+                            realisations: int, seed=None) -> np.ndarray:
+
+    """
+    Samples realisations of static disorder in the site energies of
+    a system Hamiltonian; each realisation adds an independent
+    Gaussian random shift, of standard deviation 'disorder', to each
+    diagonal element.
+
+    Parameters
+    ----------
+    hamiltonian : np.ndarray
+        The N x N system Hamiltonian, as built by
+        hamiltonian.system_hamiltonian(), in units of rad ps^-1.
+    disorder : float
+        The standard deviation of the site energies, in units of rad
+        ps^-1.
+    realisations : int
+        The number of realisations B to sample.
+    seed : int
+        The seed of the random number generator. If None (default),
+        a different set of realisations is sampled on every call.
+
+    Returns
+    -------
+    np.ndarray
+        A (B x N x N) array of the disordered Hamiltonians, in units
+        of rad ps^-1.
+    """
+
+    assert disorder >= 0., 'disorder must be a non-negative float.'
+    dims = hamiltonian.shape[0]
+    shifts = np.random.RandomState(seed).normal(0., disorder,
+                                                (realisations, dims))
+    hamiltonians = np.repeat(hamiltonian[np.newaxis], realisations, axis=0)
+    hamiltonians[:, np.arange(dims), np.arange(dims)] += shifts
+    return hamiltonians
+
+def _batch_superops(system, hamiltonians: np.ndarray) -> np.ndarray:
+
+    """
+    Builds the (B x N^2 x N^2) Liouvillians of a QuantumSystem's
+    Lindblad dynamics for each of a stack of Hamiltonians. The
+    Hamiltonian superoperators, -i(H x I - I x H^*), are built for
+    the whole stack at once; the Lindbladian is built once if
+    independent of the Hamiltonian (i.e. for local dephasing), and
+    otherwise for each Hamiltonian in turn.
+    """
+
+    dims = system.sites
+    iden = np.eye(dims)
+    superops = -1j * (np.einsum('bij,kl->bikjl', hamiltonians, iden)
+                      - np.einsum('ij,blk->bikjl', iden,
+                                  hamiltonians.conjugate()))
+    superops = superops.reshape((len(hamiltonians), dims ** 2, dims ** 2))
+
+    def lindbladian(hamiltonian):
+        return lind.lindbladian_superop(dims, system.dynamics_model,
+                                        hamiltonian,  # rad ps^-1
+                                        system.deph_rate,  # rad ps^-1
+                                        system.cutoff_freq,  # rad ps^-1
+                                        system.reorg_energy,  # rad ps^-1
+                                        system.temperature,  # Kelvin
+                                        system.spectral_density,
+                                        system.ohmic_exponent)
+
+    if system.dynamics_model == 'local dephasing lindblad':
+        return superops + lindbladian(hamiltonians[0])
+    return superops + np.array([lindbladian(ham) for ham in hamiltonians])
+
+def _evaluate_batch(args: tuple) -> RunningStatistics:
+
+    """
+    Evolves a batch of realisations of the disorder together, and
+    returns the statistics of the real and imaginary parts of their
+    density matrices at each time.
+    """
+
+    system, disorder, realisations, seed = args
+    hamiltonians = disordered_hamiltonians(system.hamiltonian, disorder,
+                                           realisations, seed)
+    superops = _batch_superops(system, hamiltonians)
+    dens_mats = np.repeat(system.initial_density_matrix[np.newaxis],
+                          realisations, axis=0)
+    times = np.arange(system.timesteps + 1) * system.time_interval  # fs
+    matrices = ensemble.evolve_ensemble(dens_mats, superops,
+                                        times * 1e-3)  # fs --> ps
+    statistics = RunningStatistics((2,) + matrices.shape[1:])
+    statistics.update(np.stack([matrices.real, matrices.imag], axis=1))
+    return statistics
+
+def static_disorder_average(system, disorder: float, realisations: int,
+                            seed: int = None, batch_size: int = 256,
+                            processes: int = 1,
+                            threads_per_process: int = 1,
+                            confidence: float = 0.95) -> tuple:
+
+    """
+    Averages the dynamics of a QuantumSystem with Lindblad dynamics
+    over static Gaussian disorder in its site energies, returning
+    the mean density matrix at each time, whose diagonals and
+    off-diagonals give the ensemble-averaged populations and
+    coherences, with confidence intervals.
+
+    The realisations are sampled and evolved in batches of
+    batch_size, each batch in a single vectorised pass with
+    ensemble.evolve_ensemble(), and only the running means and
+    variances of the density matrix elements are kept, so the
+    memory used is independent of the number of realisations.
+    Batches are evaluated over a pool of processes if processes is
+    greater than 1, as in sweep.sweep(). Each batch has its own
+    seed, derived from the one passed, so results for a given seed
+    don't depend on the number of processes.
+
+    Parameters
+    ----------
+    system : QuantumSystem
+        The QuantumSystem whose dynamics to average, defined with
+        Lindblad dynamics. Left unchanged.
+    disorder : float
+        The standard deviation of the site energies, in units of rad
+        ps^-1.
+    realisations : int
+        The number of realisations of the disorder to average over.
+    seed : int
+        The seed of the random number generator. If None (default),
+        a different set of realisations is sampled on every call.
+    batch_size : int
+        The number of realisations evolved together in each batch.
+        Default is 256.
+    processes : int
+        The number of worker processes. If 1 (default), the batches
+        are evaluated serially in the calling process. If None, as
+        many as fit on the machine's cores at threads_per_process
+        threads each.
+    threads_per_process : int
+        The number of BLAS threads each worker process uses.
+        Default is 1.
+    confidence : float
+        The confidence level of the intervals returned. Default is
+        0.95.
+
+    Returns
+    -------
+    times : np.ndarray
+        1D array of the times at which the density matrix is
+        evaluated, in fs.
+    mean : np.ndarray
+        A (T x N x N) complex array of the mean density matrix at
+        each time.
+    interval : np.ndarray
+        A (T x N x N) complex array of the half-widths of the
+        confidence intervals of the mean; the real part for the
+        real part of each element, and the imaginary part for its
+        imaginary part.
+    """
+
+    if system.dynamics_model not in LINDBLAD_MODELS:
+        raise NotImplementedError(
+            'Static disorder averaging is only implemented for Lindblad'
+            ' models. Choose from ' + str(LINDBLAD_MODELS))
+    assert isinstance(realisations, int) and realisations > 0, (
+        'realisations must be a positive int.')
+    assert isinstance(batch_size, int) and batch_size > 0, (
+        'batch_size must be a positive int.')
+    sizes = [batch_size] * (realisations // batch_size)
+    if realisations % batch_size:
+        sizes.append(realisations % batch_size)
+    seeds = np.random.RandomState(seed).randint(2 ** 31, size=len(sizes))
+    tasks = [(system, disorder, size, batch_seed)
+             for size, batch_seed in zip(sizes, seeds)]
+    if processes is None:
+        processes = max(1, (os.cpu_count() or 1) // threads_per_process)
+    assert processes >= 1, 'processes must be a positive int.'
+    processes = min(processes, len(tasks))
+
+    times = np.arange(system.timesteps + 1) * system.time_interval  # fs
+    statistics = RunningStatistics((2, len(times), system.sites,
+                                    system.sites))
+    if processes == 1:
+        for task in tasks:
+            statistics.merge(_evaluate_batch(task))
+    else:
+        with sweep.pinned_blas_threads(threads_per_process):
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(processes, mp_context=context) as pool:
+                for batch in pool.map(_evaluate_batch, tasks):
+                    statistics.merge(batch)
+    mean = statistics.mean
+    interval = statistics.confidence_interval(confidence)
+    return times, mean[0] + 1j * mean[1], interval[0] + 1j * interval[1]
@@ -0,0 +1,183 @@
+"""Contains functions for evolving an ensemble of many QuantumSystems of
+the same size together, in batched operations over the whole ensemble
+rather than one system at a time."""
+
+from scipy import linalg, sparse
+import numpy as np
+
+from quantum_heom import utilities as util
+from quantum_heom.lindbladian import LINDBLAD_MODELS
+from quantum_heom.trajectory import Trajectory
+
+
+def ensemble_superops(systems: list) -> np.ndarray:
+
+    """
+    Stacks the Liouvillian superoperators (the sum of the
+    Hamiltonian and Lindbladian superoperators) of an ensemble of
+    QuantumSystems with the same number of sites into a single
+    dense array.
+
+    Parameters
+    ----------
+    systems : list of QuantumSystem
+        The B QuantumSystems of the ensemble, all with N sites and
+        Lindblad dynamics.
+
+    Returns
+    -------
+    np.ndarray
+        A (B x N^2 x N^2) array of the superoperators, in units of
+        rad ps^-1.
+    """
+
+    assert systems, 'Must pass at least one QuantumSystem.'
+    sites = systems[0].sites
+    superops = np.empty((len(systems), sites ** 2, sites ** 2), dtype=complex)
+    for idx, system in enumerate(systems):
+        assert system.sites == sites, (
+            'All QuantumSystem objects must have the same dimensions')
+        assert system.dynamics_model in LINDBLAD_MODELS, (
+            'Ensembles can only be evolved for Lindblad dynamics. Choose from '
+            + str(LINDBLAD_MODELS))
+        superop = system.hamiltonian_superop + system.lindbladian_superop
+        if sparse.issparse(superop):
+            superop = superop.toarray()
+        superops[idx] = superop
+    return superops
+
+def evolve_ensemble(dens_mats: np.ndarray, superops: np.ndarray,
+                    times: np.ndarray,
+                    max_condition: float = 1e8) -> np.ndarray:
+
+    """
+    Evaluates the density matrix of each member of an ensemble at
+    each of a set of times, evolving all B members together. As in
+    evolution.SpectralPropagator, the superoperators are
+    diagonalised, here with a single batched eigendecomposition,
+    and all times evaluated at once with batched matrix products,
+    so that the cost per member is a few small array operations
+    rather than a full Python-level time evolution. Any members
+    whose superoperators are defective or have ill-conditioned
+    eigenvectors are instead stepped between consecutive times with
+    exponential propagators, batched over those members. Each
+    density matrix is renormalised to unit trace. Assumes the
+    superops are in units of rad ps^-1 and times in ps.
+
+    Parameters
+    ----------
+    dens_mats : np.ndarray
+        A (B x N x N) array of the density matrix of each member at
+        time t=0.
+    superops : np.ndarray
+        A (B x N^2 x N^2) array of the superoperator of each
+        member, as returned by ensemble_superops().
+    times : np.ndarray
+        1D array of the T times at which to evaluate the density
+        matrices, in ps. Must be non-negative and in ascending
+        order.
+    max_condition : float
+        The largest condition number of the matrix of eigenvectors
+        for which the eigendecomposition of a member is trusted.
+        Default value is 1e8.
+
+    Returns
+    -------
+    np.ndarray
+        A (B x T x N x N) array of the density matrix of each
+        member at each time.
+    """
+
+    times = np.asarray(times, dtype=float)
+    assert times.ndim == 1, 'times must be passed as a 1D array.'
+    assert np.all(times >= 0.), 'times must be non-negative.'
+    assert np.all(np.diff(times) >= 0.), 'times must be in ascending order.'
+    assert dens_mats.ndim == 3 and superops.ndim == 3, (
+        'Must pass stacks of density matrices and superoperators.')
+    members, dims = dens_mats.shape[:2]
+    assert superops.shape == (members, dims ** 2, dims ** 2), (
+        'Must pass a (B x N^2 x N^2) superoperator for each of the B'
+        ' (N x N) density matrices.')
+
+    vecs = dens_mats.reshape((members, dims ** 2))
+    evolved = np.empty((members, len(times), dims ** 2), dtype=complex)
+    eigvals, eigvecs = np.linalg.eig(superops)
+    condition = np.linalg.cond(eigvecs)
+    good = np.flatnonzero(np.isfinite(condition)
+                          & (condition <= max_condition))
+    inv_eigvecs = np.linalg.inv(eigvecs[good])
+    # Check each decomposition actually reproduces its superoperator
+    rebuilt = np.matmul(eigvecs[good] * eigvals[good, np.newaxis, :],
+                        inv_eigvecs)
+    error = np.max(np.absolute(rebuilt - superops[good]), axis=(1, 2))
+    scale = np.max(np.absolute(superops[good]), axis=(1, 2))
+    accurate = error <= 1e-10 * scale
+    good, inv_eigvecs = good[accurate], inv_eigvecs[accurate]
+    # Expand each vectorised density matrix in its eigenbasis, then evolve
+    # every eigencomponent of every member at all times at once.
+    coeffs = np.matmul(inv_eigvecs, vecs[good][..., np.newaxis])[..., 0]
+    amps = (np.exp(times[np.newaxis, :, np.newaxis]
+                   * eigvals[good, np.newaxis, :])
+            * coeffs[:, np.newaxis, :])
+    evolved[good] = np.matmul(amps, np.swapaxes(eigvecs[good], 1, 2))
+    bad = np.setdiff1d(np.arange(members), good)
+    if bad.size:
+        # Step between consecutive times, with a stack of propagators for
+        # each distinct time gap (to within rounding).
+        propagators = {}
+        previous, current = 0., vecs[bad]
+        for idx, time in enumerate(times):
+            gap = np.round(time - previous, decimals=12)
+            if gap > 0.:
+                if gap not in propagators:
+                    propagators[gap] = np.array([linalg.expm(superops[mem]
+                                                             * gap)
+                                                 for mem in bad])
+                current = np.matmul(propagators[gap],
+                                    current[..., np.newaxis])[..., 0]
+            evolved[bad, idx], previous = current, time
+    evolved = evolved.reshape((members, len(times), dims, dims))
+    return util.batch_renormalise_matrices(evolved)
+
+def ensemble_time_evolution(systems: list) -> list:
+
+    """
+    Evaluates the time evolution of each of an ensemble of
+    QuantumSystems, with the same number of sites, timesteps and
+    time_interval and Lindblad dynamics, in a single batched pass
+    with evolve_ensemble(). This is much faster than evaluating
+    the time_evolution of each system in turn for ensembles of many
+    small systems (i.e. for static disorder or parameter scans),
+    where the Python overhead per system would otherwise dominate.
+    The systems' own memoised time evolutions are left untouched.
+
+    Parameters
+    ----------
+    systems : list of QuantumSystem
+        The B QuantumSystems of the ensemble.
+
+    Returns
+    -------
+    list of Trajectory
+        The time evolution data of each system, in the same format
+        as QuantumSystem.time_evolution.
+    """
+
+    superops = ensemble_superops(systems)
+    timesteps, time_interval = systems[0].timesteps, systems[0].time_interval
+    for system in systems:
+        assert system.timesteps == timesteps, (
+            'The time evolution of all QuantumSystems must be evaluated for'
+            ' the same number of timesteps')
+        assert system.time_interval == time_interval, (
+            'The time evolution of all QuantumSystems must be evaluated for'
+            ' the same time_interval')
+    times = np.arange(timesteps + 1) * time_interval  # fs
+    dens_mats = np.array([system.initial_density_matrix for system in systems])
+    eq_states = np.array([system.equilibrium_state for system in systems])
+    matrices = evolve_ensemble(dens_mats, superops, times * 1e-3)  # fs --> ps
+    squared = util.batch_trace_matrix_squared(matrices)
+    distance = util.batch_trace_distance(matrices,
+                                         eq_states[:, np.newaxis, :, :])
+    return [Trajectory(times, matrices[idx], squared[idx], distance[idx])
+            for idx in range(len(systems))]
@@ -1,19 +1,34 @@
 """Contains functions for creating initial and equilibrium density
 matrices and evolving them in time."""
 
-from scipy import linalg, constants
+from collections import OrderedDict
+
+from scipy import linalg, constants, integrate, sparse
+from scipy.sparse import linalg as sparse_linalg
 import numpy as np
 from qutip.nonmarkov.heom import HSolverDL
 from qutip import Qobj
 
 
+from quantum_heom import bath
+from quantum_heom import heom
 from quantum_heom import utilities as util
+from quantum_heom.trajectory import Trajectory
 
 TEMP_INDEP_MODELS = ['local dephasing lindblad']
 TEMP_DEP_MODELS = ['global thermalising lindblad',
                    'local thermalising lindblad',
                    'HEOM']
 DYNAMICS_MODELS = TEMP_INDEP_MODELS + TEMP_DEP_MODELS
+PROPAGATION_METHODS = ['stepping', 'spectral', 'krylov', 'ode', 'secular']
+# The largest number of sites for which steady_state_lindblad() uses a dense
+# LU factorisation by default, rather than an iterative sparse solver.
+DENSE_STEADY_STATE_SITES = 20
+# QuTiP HEOM solvers built by time_evo_heom(), least recently used first,
+# reused for repeated runs of the same system and bath, and the maximum
+# number kept.
+_HSOLVER_CACHE = OrderedDict()
+HSOLVER_CACHE_SIZE = 8
 
 
 def initial_density_matrix(dims: int, init_site_pop: list) -> np.ndarray:
@@ -123,11 +138,13 @@ def equilibrium_state(dynamics_model: str, dims: int, hamiltonian: np.ndarray,
         # Maximally-mixed state for dephasing model:
         return np.eye(dims, dtype=complex) * 1. / dims
 
-    eigv, eigs = util.eigv(hamiltonian), util.eigs(hamiltonian)
-    eq_values = np.zeros_like(eigv)
-    for idx, _ in enumerate(eq_values):
-        eq_values[idx] = np.exp(- eigv[idx] * 1e12 * constants.hbar
-                                / (constants.k * temperature))
+    # The Hamiltonian is Hermitian, so a single Hermitian eigendecomposition
+    # gives both the eigenvalues and eigenstates.
+    eigv, eigs = linalg.eigh(hamiltonian)
+    # Shift by the lowest eigenvalue before exponentiating to avoid
+    # overflow; the shift cancels upon normalisation.
+    eq_values = np.exp(- (eigv - np.min(eigv)) * 1e12 * constants.hbar
+                       / (constants.k * temperature)).astype(complex)
     # Divide each exponentiated eigenvalue by the total sum.
     # Forms a vector representation of the diagonalised equilibrium state,
     # in the eigenbasis.
@@ -137,6 +154,137 @@ def equilibrium_state(dynamics_model: str, dims: int, hamiltonian: np.ndarray,
     # Convert from the eigenbasis to site basis.
     return util.basis_change(eq_values, eigs, False)
 
+class LindbladPropagator:
+
+    """
+    Exponential propagator for a time-independent superoperator,
+    given by:
+
+        P(dt) = exp(superop * dt)
+
+    The N^2 x N^2 propagator is built once upon initialisation and
+    can then be applied to any number of density matrices, so that
+    a trajectory evaluated at a fixed time interval requires only
+    a single matrix exponential. Assumes quantities passed in
+    correct and consistent units; i.e. that the superop is in
+    angular frequency units of rad ps^-1, and the time_interval
+    is in time units ps.
+
+    Parameters
+    ----------
+    superop : np.ndarray
+        The superoperator that governs the dynamics of the quantum
+        system, typically formed from the sum of Hamiltonian and
+        Lindbladian superoperators.
+    time_interval : float
+        The step forward in time by which the propagator evolves
+        a density matrix.
+    """
+
+    def __init__(self, superop: np.ndarray, time_interval: float):
+
+        assert isinstance(superop, np.ndarray), (
+            'Superoperator must be a np.ndarray')
+        assert superop.shape[0] == superop.shape[1], (
+            'Superoperator must be square')
+
+        self._superop = superop.copy()
+        self._time_interval = time_interval
+        self._dims = int(np.sqrt(superop.shape[0]))
+        # Build the N^2 x N^2 propagator
+        self._matrix = linalg.expm(superop * time_interval)
+
+    @property
+    def superop(self) -> np.ndarray:
+
+        """
+        Gets the superoperator the propagator was built from.
+
+        Returns
+        -------
+        np.ndarray
+            The (N^2) x (N^2) superoperator.
+        """
+
+        return self._superop
+
+    @property
+    def time_interval(self) -> float:
+
+        """
+        Gets the time interval the propagator evolves a density
+        matrix by.
+
+        Returns
+        -------
+        float
+            The time interval, in the time units consistent with
+            the superoperator.
+        """
+
+        return self._time_interval
+
+    @property
+    def matrix(self) -> np.ndarray:
+
+        """
+        Gets the exponential propagator exp(superop * dt).
+
+        Returns
+        -------
+        np.ndarray
+            The (N^2) x (N^2) propagator.
+        """
+
+        return self._matrix
+
+    def matches(self, superop: np.ndarray, time_interval: float) -> bool:
+
+        """
+        Returns whether or not this propagator was built from the
+        given superoperator and time interval, and so can be reused
+        in their place.
+
+        Parameters
+        ----------
+        superop : np.ndarray
+            The superoperator to compare against.
+        time_interval : float
+            The time interval to compare against.
+
+        Returns
+        -------
+        bool
+            True if both the superoperator and time interval are
+            equal to those the propagator was built from.
+        """
+
+        return (time_interval == self._time_interval
+                and superop.shape == self._superop.shape
+                and np.array_equal(superop, self._superop))
+
+    def evolve(self, dens_mat: np.ndarray) -> np.ndarray:
+
+        """
+        Evolves a density matrix at time t to time (t + dt), where
+        dt is the time interval of the propagator.
+
+        Parameters
+        ----------
+        dens_mat : np.ndarray
+            The N x N density matrix to evolve forward in time.
+
+        Returns
+        -------
+        np.ndarray
+            The input density matrix evolved forward in time by
+            the propagator's time interval.
+        """
+
+        # Propagate vectorised density matrix
+        evolved = np.matmul(self._matrix, dens_mat.flatten('C'))
+        # Reshape back to square and return
+        return evolved.reshape((self._dims, self._dims), order='C')
 
 def evolve_matrix_one_step(dens_mat: np.ndarray, superop: np.ndarray,
                            time_interval: float) -> np.ndarray:
@@ -152,7 +300,8 @@ def evolve_matrix_one_step(dens_mat: np.ndarray, superop: np.ndarray,
     Lindbladian superoperators. Assumes quantities passed in
     correct and consistent units; i.e. that the superop is in
     angular frequency units of rad ps^-1, and the time_interval
-    is in time units ps.
+    is in time units ps. To evolve over many steps of the same
+    time interval, build a LindbladPropagator once instead.
 
     Parameters
     ----------
@@ -176,27 +325,513 @@ def evolve_matrix_one_step(dens_mat: np.ndarray, superop: np.ndarray,
     assert isinstance(dens_mat, np.ndarray), 'Input matrix must be a np.ndarray'
     dims = dens_mat.shape[0]
     assert dims == dens_mat.shape[1], 'Input matrix must be square'
+    if sparse.issparse(superop):
+        superop = superop.toarray()
     assert isinstance(superop, np.ndarray), 'Superoperator must be a np.ndarray'
 
-    dims = int(np.sqrt(superop.shape[0]))
-    # Build the N^2 x N^2 propagator
-    propa = linalg.expm(superop * time_interval)
-    # Propagate vectorised density matrix
-    evolved = np.matmul(propa, dens_mat.flatten('C'))
-    # Reshape back to square and return
-    return evolved.reshape((dims, dims), order='C')
+    return LindbladPropagator(superop, time_interval).evolve(dens_mat)
+
+class SpectralPropagator:
+
+    """
+    Propagator for a time-independent superoperator that uses its
+    eigendecomposition, L = V diag(w) V^-1, so that a density
+    matrix can be evaluated at any time t directly:
+
+        \\rho(t) = V diag(exp(w t)) V^-1 \\rho(0)
+
+    The superoperator is diagonalised once upon initialisation,
+    after which any set of (not necessarily evenly spaced) times
+    is evaluated in a single vectorised operation, with no step-
+    by-step recursion. Assumes quantities passed in correct and
+    consistent units; i.e. that the superop is in angular
+    frequency units of rad ps^-1, and times are in units of ps.
+
+    Parameters
+    ----------
+    superop : np.ndarray
+        The superoperator that governs the dynamics of the quantum
+        system, typically formed from the sum of Hamiltonian and
+        Lindbladian superoperators.
+    max_condition : float
+        The largest condition number of the matrix of eigenvectors
+        for which the eigendecomposition is trusted. Default value
+        is 1e8.
+
+    Raises
+    ------
+    linalg.LinAlgError
+        If the superoperator is defective or its eigenvectors are
+        too ill-conditioned to reconstruct it accurately.
+    """
+
+    def __init__(self, superop: np.ndarray, max_condition: float = 1e8):
+
+        assert isinstance(superop, np.ndarray), (
+            'Superoperator must be a np.ndarray')
+        assert superop.shape[0] == superop.shape[1], (
+            'Superoperator must be square')
+
+        self._dims = int(np.sqrt(superop.shape[0]))
+        self._eigvals, self._eigvecs = linalg.eig(superop)
+        condition = np.linalg.cond(self._eigvecs)
+        if not np.isfinite(condition) or condition > max_condition:
+            raise linalg.LinAlgError('Superoperator is defective or its'
+                                     ' eigenvectors are ill-conditioned.')
+        self._inv_eigvecs = linalg.inv(self._eigvecs)
+        # Check the decomposition actually reproduces the superoperator
+        rebuilt = np.matmul(self._eigvecs * self._eigvals, self._inv_eigvecs)
+        if not np.allclose(rebuilt, superop,
+                           atol=1e-10 * np.max(np.absolute(superop))):
+            raise linalg.LinAlgError('Eigendecomposition of the superoperator'
+                                     ' is inaccurate.')
+
+    @property
+    def eigvals(self) -> np.ndarray:
+
+        """
+        Gets the eigenvalues of the superoperator.
+
+        Returns
+        -------
+        np.ndarray
+            1D array of the N^2 eigenvalues, in units of rad ps^-1.
+        """
+
+        return self._eigvals
+
+    def evolve(self, dens_mat: np.ndarray, times: np.ndarray) -> np.ndarray:
+
+        """
+        Evaluates an initial density matrix at each of the times
+        passed.
+
+        Parameters
+        ----------
+        dens_mat : np.ndarray
+            The N x N density matrix at time t=0.
+        times : np.ndarray
+            1D array of the T times at which to evaluate the
+            density matrix, in ps.
+
+        Returns
+        -------
+        np.ndarray
+            A (T x N x N) array of the density matrix at each time.
+        """
+
+        # Expand the vectorised density matrix in the eigenbasis
+        coeffs = np.matmul(self._inv_eigvecs, dens_mat.flatten('C'))
+        # Evolve each eigencomponent at all times at once, then transform
+        # back; gives a (T x N^2) array of vectorised density matrices.
+        amps = np.exp(np.outer(times, self._eigvals)) * coeffs
+        evolved = np.matmul(amps, self._eigvecs.T)
+        return evolved.reshape((len(times), self._dims, self._dims),
+                               order='C')
+
+class SecularPropagator:
+
+    """
+    Propagator for the 'global thermalising lindblad' model that
+    exploits the secular structure of its Liouvillian in the
+    eigenbasis of the system Hamiltonian. There, each Lindblad
+    operator |b><a| only transfers population between eigenstates,
+    so the populations p_a obey a classical (Pauli) rate equation
+
+    .. math::
+        \\frac{dp_b}{dt} = \\sum_{a \\neq b} (k_{a \\to b} p_a
+                                              - k_{b \\to a} p_b)
+
+    whilst each coherence between eigenstates a and b decays
+    independently:
+
+    .. math::
+        \\rho_{ab}(t) = \\rho_{ab}(0) e^{(-i(E_a - E_b)
+                                       - (\\Gamma_a + \\Gamma_b) / 2) t}
+
+    where \\Gamma_a = \\sum_b k_{a \\to b} is the total rate out of
+    eigenstate a. The N x N rate matrix is diagonalised once upon
+    initialisation, so evaluating the density matrix at T times
+    costs O(T N^3), for the transformations to and from the site
+    basis, rather than the O(N^6) of exponentiating the N^2 x N^2
+    Liouvillian. The result is exact, not an approximation, for
+    this model. Assumes quantities passed in correct and
+    consistent units; i.e. that the Hamiltonian and rates are in
+    angular frequency units of rad ps^-1, and times are in units of
+    ps.
+
+    Parameters
+    ----------
+    hamiltonian : np.ndarray
+        The N x N system Hamiltonian, in rad ps^-1.
+    rates : np.ndarray
+        The (N x N) matrix of rate constants k_{a -> b} between the
+        eigenstates of the Hamiltonian, as returned by
+        lindbladian.glob_therm_rates(), in rad ps^-1.
+    max_condition : float
+        The largest condition number of the matrix of eigenvectors
+        of the rate matrix for which its eigendecomposition is
+        trusted; otherwise the populations are evolved with a
+        matrix exponential at each time. Default value is 1e8.
+    """
+
+    def __init__(self, hamiltonian: np.ndarray, rates: np.ndarray,
+                 max_condition: float = 1e8):
+
+        assert hamiltonian.shape == rates.shape, (
+            'The Hamiltonian and rate matrix must have the same dimensions.')
+        # The orthonormal eigenbasis the Lindblad operators are built in
+        eigv, self._eigs = linalg.eigh(hamiltonian)
+        decay = np.sum(rates, axis=1)  # total rate out of each eigenstate
+        # The rate matrix W, such that dp/dt = W p
+        self._rate_matrix = rates.T - np.diag(decay)
+        self._coherence_rates = (-1j * (eigv[:, np.newaxis] - eigv)
+                                 - 0.5 * (decay[:, np.newaxis] + decay))
+        self._pop_eigvals, self._pop_eigvecs = linalg.eig(self._rate_matrix)
+        condition = np.linalg.cond(self._pop_eigvecs)
+        if np.isfinite(condition) and condition <= max_condition:
+            self._pop_inv_eigvecs = linalg.inv(self._pop_eigvecs)
+        else:
+            self._pop_inv_eigvecs = None
+
+    @property
+    def rate_matrix(self) -> np.ndarray:
+
+        """
+        Gets the rate matrix W of the Pauli master equation for the
+        populations of the eigenstates, dp/dt = W p.
+
+        Returns
+        -------
+        np.ndarray
+            The N x N rate matrix, in rad ps^-1.
+        """
+
+        return self._rate_matrix
+
+    def evolve(self, dens_mat: np.ndarray, times: np.ndarray) -> np.ndarray:
+
+        """
+        Evaluates an initial density matrix at each of the times
+        passed.
+
+        Parameters
+        ----------
+        dens_mat : np.ndarray
+            The N x N density matrix at time t=0, in the site basis.
+        times : np.ndarray
+            1D array of the T times at which to evaluate the
+            density matrix, in ps.
+
+        Returns
+        -------
+        np.ndarray
+            A (T x N x N) array of the density matrix at each time,
+            in the site basis.
+        """
+
+        times = np.asarray(times, dtype=float)
+        dims = dens_mat.shape[0]
+        # Transform to the eigenbasis, where each coherence decays
+        # independently of all other elements
+        eig_dens = np.matmul(self._eigs.conjugate().T,
+                             np.matmul(dens_mat, self._eigs))
+        evolved = eig_dens * np.exp(times[:, np.newaxis, np.newaxis]
+                                    * self._coherence_rates)
+        # Evolve the populations with the rate matrix
+        pops = np.diagonal(eig_dens)
+        if self._pop_inv_eigvecs is not None:
+            coeffs = np.matmul(self._pop_inv_eigvecs, pops)
+            amps = np.exp(np.outer(times, self._pop_eigvals)) * coeffs
+            pops = np.matmul(amps, self._pop_eigvecs.T)
+        else:
+            pops = np.array([np.matmul(linalg.expm(self._rate_matrix * time),
+                                       pops) for time in times])
+        evolved[:, np.arange(dims), np.arange(dims)] = pops
+        # Transform back to the site basis
+        return np.matmul(self._eigs,
+                         np.matmul(evolved, self._eigs.conjugate().T))
+
+def evolve_matrix_times(dens_mat: np.ndarray, superop: np.ndarray,
+                        times: np.ndarray) -> np.ndarray:
+
+    """
+    Evaluates a density matrix at each of an arbitrary set of
+    times, which need not be evenly spaced. The superoperator is
+    diagonalised once with a SpectralPropagator and all times
+    evaluated in one operation. If the superoperator is defective
+    or ill-conditioned, falls back to stepping between consecutive
+    times with exponential propagators, built once per distinct
+    time gap. Each returned density matrix is renormalised to unit
+    trace. Assumes quantities passed in correct and consistent
+    units; i.e. that the superop is in angular frequency units of
+    rad ps^-1, and times are in units of ps.
+
+    Parameters
+    ----------
+    dens_mat : np.ndarray
+        The N x N density matrix at time t=0.
+    superop : np.ndarray
+        The superoperator that governs the dynamics of the quantum
+        system, typically formed from the sum of Hamiltonian and
+        Lindbladian superoperators.
+    times : np.ndarray
+        1D array of the T times at which to evaluate the density
+        matrix, in ps. Must be non-negative and in ascending order.
+
+    Returns
+    -------
+    np.ndarray
+        A (T x N x N) array of the density matrix at each time.
+    """
+
+    times = np.asarray(times, dtype=float)
+    assert times.ndim == 1, 'times must be passed as a 1D array.'
+    assert np.all(times >= 0.), 'times must be non-negative.'
+    assert np.all(np.diff(times) >= 0.), 'times must be in ascending order.'
+
+    try:
+        evolved = SpectralPropagator(superop).evolve(dens_mat, times)
+    except linalg.LinAlgError:
+        # Step between consecutive times, reusing propagators for gaps
+        # that are equal (to within rounding).
+        evolved = np.empty((len(times),) + dens_mat.shape, dtype=complex)
+        propagators = {}
+        previous, current = 0., dens_mat
+        for idx, time in enumerate(times):
+            gap = np.round(time - previous, decimals=12)
+            if gap > 0.:
+                if gap not in propagators:
+                    propagators[gap] = LindbladPropagator(superop, gap)
+                current = propagators[gap].evolve(current)
+            evolved[idx], previous = current, time
+    traces = np.trace(evolved, axis1=1, axis2=2)
+    return evolved / traces[:, np.newaxis, np.newaxis]
+
+def krylov_expm_multiply(operator, vec: np.ndarray, time: float,
+                         krylov_dim: int = 30,
+                         tolerance: float = 1e-10) -> np.ndarray:
+
+    """
+    Evaluates the action of the exponential of an operator on a
+    vector, exp(operator * time) vec, without forming the
+    exponential. Projects the operator onto the Krylov subspace
+    spanned by {vec, L vec, ..., L^(m-1) vec} using the Arnoldi
+    process, exponentiates the small m x m Hessenberg matrix H_m,
+    and estimates the error of each substep from the residual
+    beta * |h_{m+1,m} [exp(dt H_m)]_{m,1}| (Saad, SIAM J. Numer.
+    Anal. 29 (1992) 209). The time is split into substeps small
+    enough for this error to stay within tolerance. Only requires
+    matrix-vector products, so works with dense, sparse or
+    matrix-free (LinearOperator) operators.
+
+    Parameters
+    ----------
+    operator : np.ndarray, scipy.sparse.spmatrix or LinearOperator
+        The (N^2 x N^2) operator L, typically a Liouvillian in
+        units of rad ps^-1.
+    vec : np.ndarray
+        The vector of length N^2 to evolve, i.e. a vectorised
+        density matrix.
+    time : float
+        The time to evolve the vector forward by, in units
+        consistent with the operator (i.e. ps).
+    krylov_dim : int
+        The maximum dimension m of the Krylov subspace. Default 30.
+    tolerance : float
+        The error tolerance, relative to the norm of the vector,
+        over the whole time. Default 1e-10.
+
+    Returns
+    -------
+    np.ndarray
+        The evolved vector exp(operator * time) vec.
+    """
+
+    assert time >= 0., 'time must be non-negative.'
+
+    vec = np.array(vec, dtype=complex).ravel()
+    size = vec.shape[0]
+    krylov_dim = min(krylov_dim, size)
+    remaining, step = time, time
+    while remaining > 0.:
+        beta = np.linalg.norm(vec)
+        if beta == 0.:
+            return vec
+        # Arnoldi process, with modified Gram-Schmidt orthogonalisation
+        basis = np.zeros((krylov_dim + 1, size), dtype=complex)
+        hess = np.zeros((krylov_dim + 1, krylov_dim), dtype=complex)
+        basis[0] = vec / beta
+        dim = krylov_dim
+        for j in range(krylov_dim):
+            new = operator.dot(basis[j])
+            for i in range(j + 1):
+                hess[i][j] = np.vdot(basis[i], new)
+                new = new - hess[i][j] * basis[i]
+            hess[j + 1][j] = np.linalg.norm(new)
+            if np.absolute(hess[j + 1][j]) <= 1e-12:
+                # Happy breakdown; the subspace is invariant, so exact
+                dim = j + 1
+                break
+            basis[j + 1] = new / hess[j + 1][j]
+        # Shrink the substep until its error estimate is within tolerance
+        while True:
+            substep = min(step, remaining)
+            small = linalg.expm(substep * hess[:dim, :dim])
+            error = beta * np.absolute(hess[dim][dim - 1] * small[dim - 1][0])
+            if error <= tolerance * beta * substep / time:
+                break
+            step = substep / 2.
+        vec = beta * np.matmul(small[:, 0], basis[:dim])
+        remaining -= substep
+        step = substep * 2.
+    return vec
+
+def evolve_matrix_krylov(dens_mat: np.ndarray, superop, times: np.ndarray,
+                         krylov_dim: int = 30,
+                         tolerance: float = 1e-10) -> np.ndarray:
+
+    """
+    Evaluates a density matrix at each of a set of times by
+    applying exp(superop * t) to the vectorised density matrix,
+    without forming the dense exponential or diagonalising the
+    superoperator. For explicit (dense or sparse) superoperators,
+    uses scipy's expm_multiply, which evaluates a whole evenly
+    spaced time grid in one call; for uneven grids it steps
+    between consecutive times. For matrix-free superoperators
+    (LinearOperator) uses the Arnoldi method of
+    krylov_expm_multiply(). Each returned density matrix is
+    renormalised to unit trace. Assumes quantities passed in
+    correct and consistent units; i.e. that the superop is in
+    angular frequency units of rad ps^-1, and times are in ps.
+
+    Parameters
+    ----------
+    dens_mat : np.ndarray
+        The N x N density matrix at time t=0.
+    superop : np.ndarray, scipy.sparse.spmatrix or LinearOperator
+        The (N^2 x N^2) superoperator that governs the dynamics of
+        the quantum system.
+    times : np.ndarray
+        1D array of the T times at which to evaluate the density
+        matrix, in ps. Must be non-negative and in ascending order.
+    krylov_dim : int
+        The maximum Krylov subspace dimension used for matrix-free
+        superoperators. Default 30.
+    tolerance : float
+        The error tolerance used for matrix-free superoperators.
+        Default 1e-10.
+
+    Returns
+    -------
+    np.ndarray
+        A (T x N x N) array of the density matrix at each time.
+    """
+
+    times = np.asarray(times, dtype=float)
+    assert times.ndim == 1, 'times must be passed as a 1D array.'
+    assert np.all(times >= 0.), 'times must be non-negative.'
+    assert np.all(np.diff(times) >= 0.), 'times must be in ascending order.'
+    dims = dens_mat.shape[0]
+    assert superop.shape == (dims ** 2, dims ** 2), (
+        'Superoperator dimensions must be the square of the density matrix'
+        ' dims.')
+
+    vec = dens_mat.reshape(dims ** 2).astype(complex)
+    gaps = np.diff(times)
+    explicit = isinstance(superop, np.ndarray) or sparse.issparse(superop)
+    if explicit and len(times) > 1 and np.allclose(gaps, gaps[0]):
+        evolved = sparse_linalg.expm_multiply(superop, vec, start=times[0],
+                                              stop=times[-1], num=len(times),
+                                              endpoint=True)
+    else:
+        evolved = np.empty((len(times), dims ** 2), dtype=complex)
+        previous = 0.
+        for idx, time in enumerate(times):
+            if time > previous:
+                if explicit:
+                    vec = sparse_linalg.expm_multiply(
+                        superop * (time - previous), vec)
+                else:
+                    vec = krylov_expm_multiply(superop, vec, time - previous,
+                                               krylov_dim, tolerance)
+            evolved[idx], previous = vec, time
+    evolved = evolved.reshape((len(times), dims, dims), order='C')
+    traces = np.trace(evolved, axis1=1, axis2=2)
+    return evolved / traces[:, np.newaxis, np.newaxis]
+
+def evolve_matrix_ode(dens_mat: np.ndarray, superop, times: np.ndarray,
+                      rtol: float = 1e-8, atol: float = 1e-10) -> np.ndarray:
+
+    """
+    Evaluates a density matrix at each of a set of times by
+    integrating the master equation d vec(rho)/dt = superop
+    vec(rho) with an adaptive Runge-Kutta (RK45) ODE solver. Only
+    requires the action of the superoperator, so works with dense,
+    sparse or matrix-free (LinearOperator) superoperators. Each
+    returned density matrix is renormalised to unit trace. Assumes
+    quantities passed in correct and consistent units; i.e. that
+    the superop is in angular frequency units of rad ps^-1, and
+    times are in units of ps.
+
+    Parameters
+    ----------
+    dens_mat : np.ndarray
+        The N x N density matrix at time t=0.
+    superop : np.ndarray, scipy.sparse.spmatrix or LinearOperator
+        The (N^2 x N^2) superoperator that governs the dynamics of
+        the quantum system.
+    times : np.ndarray
+        1D array of the T times at which to evaluate the density
+        matrix, in ps. Must be non-negative and in ascending order.
+    rtol, atol : float
+        The relative and absolute tolerances of the ODE solver.
+        Defaults 1e-8 and 1e-10 respectively.
+
+    Returns
+    -------
+    np.ndarray
+        A (T x N x N) array of the density matrix at each time.
+    """
+
+    times = np.asarray(times, dtype=float)
+    assert times.ndim == 1, 'times must be passed as a 1D array.'
+    assert np.all(times >= 0.), 'times must be non-negative.'
+    assert np.all(np.diff(times) >= 0.), 'times must be in ascending order.'
+    dims = dens_mat.shape[0]
+    assert superop.shape == (dims ** 2, dims ** 2), (
+        'Superoperator dimensions must be the square of the density matrix'
+        ' dims.')
+
+    vec = dens_mat.reshape(dims ** 2).astype(complex)
+    if times[-1] == 0.:
+        evolved = np.tile(vec, (len(times), 1))
+    else:
+        result = integrate.solve_ivp(lambda t, y: superop.dot(y),
+                                     (0., times[-1]), vec, method='RK45',
+                                     t_eval=times, rtol=rtol, atol=atol)
+        if not result.success:
+            raise RuntimeError('ODE integration of the master equation'
+                               ' failed: ' + result.message)
+        evolved = result.y.T
+    evolved = evolved.reshape((len(times), dims, dims), order='C')
+    traces = np.trace(evolved, axis1=1, axis2=2)
+    return evolved / traces[:, np.newaxis, np.newaxis]
 
 def time_evo_lindblad(dens_mat: np.ndarray, superop: np.ndarray,
                       timesteps: int, time_interval: float,
                       dynamics_model: str, hamiltonian: np.ndarray,
-                      temperature: float) -> np.ndarray:
+                      temperature: float,
+                      propagator: LindbladPropagator = None,
+                      method: str = 'stepping',
+                      eq_state: np.ndarray = None) -> Trajectory:
 
     """
     Evaluates the time evolution of a starting density matrix over
-    multiple time steps for the Lindblad models. Returns an array
-    containing the times, density matrices at each timestep, and
-    the trace of the density matrix squared and/or the trace
-    distance at each step, if specified in 'trace_measure'. Assumes
+    multiple time steps for the Lindblad models. Returns a
+    Trajectory containing the times, density matrices at each
+    timestep, and the trace of the density matrix squared and the
+    trace distance at each step. Assumes
     quantities passed in correct and consistent units; i.e. that
     the superop is in angular frequency units of rad ps^-1, and the
     time_interval is in time units ps.
@@ -205,10 +840,15 @@ def time_evo_lindblad(dens_mat: np.ndarray, superop: np.ndarray,
     ----------
     dens_mat : np.ndarray
         The initial density matrix to evolve forward in time.
-    superop : np.ndarray
+    superop : np.ndarray, scipy.sparse.spmatrix or LinearOperator
         The superoperator that governs the dynamics of the quantum
         system, in units of rad ps^-1. Typically formed from the
-        sum of Hamiltonian and Lindbladian superoperators.
+        sum of Hamiltonian and Lindbladian superoperators. Sparse
+        superoperators are converted to dense arrays for the
+        'stepping' and 'spectral' methods, as the exponential
+        propagator and eigendecomposition are dense. The 'krylov'
+        and 'ode' methods use sparse and matrix-free
+        (LinearOperator) superoperators directly.
     timesteps : int
         The number of timesteps over which to evaluate the density
         matrix.
@@ -226,31 +866,67 @@ def time_evo_lindblad(dens_mat: np.ndarray, superop: np.ndarray,
     temperature : float
         The temperature of the bath, in K. Need only be passed if
         dynamics_model is a thermalising model.
+    propagator : LindbladPropagator or SecularPropagator
+        For the 'stepping' method, a pre-built LindbladPropagator
+        for 'superop' at 'time_interval' (converted to ps), shared
+        between runs that use the same superoperator. If None
+        (default), one is built for this run. For the 'secular'
+        method, the SecularPropagator for the system, which must be
+        passed.
+    method : str
+        How to propagate the density matrix. Must be one of
+        'stepping' (default), which repeatedly applies the
+        exponential propagator for one time interval, or
+        'spectral', which diagonalises the superoperator once and
+        evaluates all timesteps directly (falling back to stepping
+        if the superoperator is defective or ill-conditioned),
+        'krylov', which applies the exponential to the density
+        matrix with Krylov subspace methods (see
+        evolve_matrix_krylov()), 'ode', which integrates the
+        master equation with an adaptive ODE solver (see
+        evolve_matrix_ode()), or 'secular', which evaluates all
+        timesteps directly with a SecularPropagator for the
+        'global thermalising lindblad' model, in which case
+        superop isn't used and may be None.
+    eq_state : np.ndarray
+        The equilibrium state the trace distance at each timestep
+        is measured relative to, as returned by
+        equilibrium_state(). If None (default), it is computed once
+        from dynamics_model, hamiltonian and temperature.
 
     Returns
     -------
-    np.array
-        An array where each element corresponds to a timestep in the
-        evolution of the density matrix, containing the following
-        info, respectively; time, density matrix at time, trace
-        squared, trace distance.
+    Trajectory
+        The time evolution of the density matrix, containing the
+        time, density matrix, trace squared and trace distance at
+        each timestep.
     """
 
     # Check inputs
     assert isinstance(dens_mat, np.ndarray), 'Input matrix must be a np.ndarray'
     dims = dens_mat.shape[0]
     assert dims == dens_mat.shape[1], 'Input matrix must be square'
-    assert isinstance(superop, np.ndarray), 'Superoperator must be a np.ndarray'
-    assert superop.shape[0] == superop.shape[1], 'Superoperator must be square'
-    assert superop.shape[0] == dims**2, (
-        'Superoperator dimensions must be the square of the density matrix'
-        ' dims.')
+    assert method in PROPAGATION_METHODS, (
+        'Must choose a propagation method from ' + str(PROPAGATION_METHODS))
+    if method == 'secular':
+        assert isinstance(propagator, SecularPropagator), (
+            "Must pass a SecularPropagator for the 'secular' method.")
+    else:
+        if sparse.issparse(superop) and method in ('stepping', 'spectral'):
+            superop = superop.toarray()
+        assert isinstance(superop, np.ndarray) or method in ('krylov', 'ode'), (
+            'Superoperator must be a np.ndarray')
+        assert superop.shape[0] == superop.shape[1], (
+            'Superoperator must be square')
+        assert superop.shape[0] == dims**2, (
+            'Superoperator dimensions must be the square of the density'
+            ' matrix dims.')
     assert isinstance(timesteps, int), 'timesteps must be passed as an int.'
     assert isinstance(time_interval, float), 'time_interval must be a float.'
     assert isinstance(dynamics_model, str), (
         'Must provide the dynamics model to calculate the trace'
         ' distance.')
-    if dynamics_model in TEMP_DEP_MODELS:
+    if dynamics_model in TEMP_DEP_MODELS and eq_state is None:
         assert isinstance(hamiltonian, np.ndarray), (
             'Must provide the system Hamiltonian as a numpy ndarray to'
             ' calculate the trace distance for thermalising models.')
@@ -258,39 +934,280 @@ def time_evo_lindblad(dens_mat: np.ndarray, superop: np.ndarray,
             'Must provide the temperature as a positive float in order to'
             ' calculate the trace distance for thermalising models.')
 
+    # The reference state is constant, so is evaluated once per trajectory
+    if eq_state is None:
+        eq_state = equilibrium_state(dynamics_model, dims, hamiltonian,
+                                     temperature)
+    if method != 'stepping':
+        times = np.arange(timesteps + 1) * time_interval  # fs
+        return time_evo_lindblad_times(dens_mat, superop, times,
+                                       dynamics_model, hamiltonian,
+                                       temperature, eq_state, method,
+                                       propagator)
     # Convert time fs --> ps to match superoperator units
     time_interval = time_interval * 1e-3
+    # Build the propagator once for the whole trajectory
+    if propagator is None:
+        propagator = LindbladPropagator(superop, time_interval)
+    assert propagator.matches(superop, time_interval), (
+        'The propagator passed must be built from the same superoperator'
+        ' and time interval (in ps) as passed.')
     # Produce time evolution data
     time, evolved = 0., dens_mat
-    squared = util.trace_matrix_squared(evolved)
-    eq_state = equilibrium_state(dynamics_model, dims, hamiltonian, temperature)
-    distance = util.trace_distance(evolved, eq_state)
-    evolution = np.empty(timesteps + 1, dtype=np.ndarray)
-    evolution[0] = np.array([time, evolved, squared, distance])
-    for step in range(1, timesteps + 1):
-        time += time_interval
-        evolved = evolve_matrix_one_step(evolved, superop, time_interval)
-        evolved = util.renormalise_matrix(evolved)
-        squared = util.trace_matrix_squared(evolved)
-        eq_state = equilibrium_state(dynamics_model, dims,
-                                     hamiltonian, temperature)
-        distance = util.trace_distance(evolved, eq_state)
+    times = np.empty(timesteps + 1, dtype=float)
+    matrices = np.empty((timesteps + 1, dims, dims), dtype=complex)
+    for step in range(0, timesteps + 1):
+        if step > 0:
+            time += time_interval
+            evolved = propagator.evolve(evolved)
+            evolved = util.renormalise_matrix(evolved)
         # Add quantities in quantum_HEOM units; i.e. convert time back ps --> fs
-        evolution[step] = np.array([time * 1e3, evolved, squared, distance])
-    return evolution
+        times[step] = time * 1e3
+        matrices[step] = evolved
+    # Evaluate the trace measures for the whole trajectory at once
+    squared = util.batch_trace_matrix_squared(matrices)
+    distance = util.batch_trace_distance(matrices, eq_state)
+    return Trajectory(times, matrices, squared, distance)
+
+def time_evo_lindblad_times(dens_mat: np.ndarray, superop: np.ndarray,
+                            times: np.ndarray, dynamics_model: str,
+                            hamiltonian: np.ndarray, temperature: float,
+                            eq_state: np.ndarray = None,
+                            method: str = 'spectral',
+                            propagator: SecularPropagator = None
+                           ) -> Trajectory:
+
+    """
+    Evaluates the time evolution of a starting density matrix at
+    an arbitrary set of times for the Lindblad models, which need
+    not be evenly spaced (i.e. log-spaced times for long
+    equilibration studies). With the 'spectral' method the
+    superoperator is diagonalised once and all times evaluated
+    directly; see evolve_matrix_times(). With the 'krylov' method
+    the exponential is applied to the density matrix without
+    forming it; see evolve_matrix_krylov(). With the 'ode' method
+    the master equation is integrated numerically; see
+    evolve_matrix_ode(). With the 'secular' method all times are
+    evaluated directly with a SecularPropagator. Returns a
+    Trajectory, as for time_evo_lindblad().
+
+    Parameters
+    ----------
+    dens_mat : np.ndarray
+        The initial density matrix to evolve forward in time.
+    superop : np.ndarray, scipy.sparse.spmatrix or LinearOperator
+        The superoperator that governs the dynamics of the quantum
+        system, in units of rad ps^-1. Typically formed from the
+        sum of Hamiltonian and Lindbladian superoperators. Sparse
+        superoperators are converted to dense arrays for the
+        'spectral' method.
+    times : np.ndarray
+        1D array of the times at which to evaluate the density
+        matrix, in fs. Must be non-negative and in ascending order.
+    dynamics_model : str
+        The model used to describe the system dynamics. Must be one
+        of 'local dephasing lindblad','local thermalising
+        lindblad', 'global thermalising lindblad'.
+    hamiltonian : np.ndarray
+        The system Hamiltonian for the open quantum system, with
+        dimensions (dims x dims), in rad ps^-1. Only needs to be
+        passed if dynamics_model is a thermalising model.
+    temperature : float
+        The temperature of the bath, in K. Need only be passed if
+        dynamics_model is a thermalising model.
+    eq_state : np.ndarray
+        The equilibrium state the trace distance at each time is
+        measured relative to. If None (default), it is computed
+        from dynamics_model, hamiltonian and temperature.
+    method : str
+        One of 'spectral' (default), 'krylov', 'ode' or 'secular'.
+    propagator : SecularPropagator
+        The SecularPropagator for the system. Must be passed for,
+        and is only used by, the 'secular' method, for which
+        superop isn't used and may be None.
+
+    Returns
+    -------
+    Trajectory
+        The time evolution of the density matrix, containing the
+        time, density matrix, trace squared and trace distance at
+        each of the times passed.
+    """
+
+    assert isinstance(dens_mat, np.ndarray), 'Input matrix must be a np.ndarray'
+    dims = dens_mat.shape[0]
+    assert dims == dens_mat.shape[1], 'Input matrix must be square'
+    assert method in ('spectral', 'krylov', 'ode', 'secular'), (
+        "Must choose either the 'spectral', 'krylov', 'ode' or 'secular'"
+        " method.")
+    if method == 'secular':
+        assert isinstance(propagator, SecularPropagator), (
+            "Must pass a SecularPropagator for the 'secular' method.")
+    else:
+        if sparse.issparse(superop) and method == 'spectral':
+            superop = superop.toarray()
+        assert isinstance(superop, np.ndarray) or method != 'spectral', (
+            'Superoperator must be a np.ndarray')
+        assert superop.shape[0] == dims**2, (
+            'Superoperator dimensions must be the square of the density'
+            ' matrix dims.')
+
+    times = np.asarray(times, dtype=float)
+    # Convert time fs --> ps to match superoperator units
+    if method == 'krylov':
+        matrices = evolve_matrix_krylov(dens_mat, superop, times * 1e-3)
+    elif method == 'ode':
+        matrices = evolve_matrix_ode(dens_mat, superop, times * 1e-3)
+    elif method == 'secular':
+        matrices = util.batch_renormalise_matrices(
+            propagator.evolve(dens_mat, times * 1e-3))
+    else:
+        matrices = evolve_matrix_times(dens_mat, superop, times * 1e-3)
+    if eq_state is None:
+        eq_state = equilibrium_state(dynamics_model, dims, hamiltonian,
+                                     temperature)
+    squared = util.batch_trace_matrix_squared(matrices)
+    distance = util.batch_trace_distance(matrices, eq_state)
+    return Trajectory(times, matrices, squared, distance)
+
+def stream_time_evo_lindblad(dens_mat: np.ndarray, superop: np.ndarray,
+                             timesteps: int, time_interval: float,
+                             dynamics_model: str,
+                             hamiltonian: np.ndarray = None,
+                             temperature: float = None,
+                             propagator: LindbladPropagator = None,
+                             method: str = 'stepping',
+                             eq_state: np.ndarray = None,
+                             batch_size: int = 100):
+
+    """
+    Evaluates the time evolution of a density matrix under Lindblad
+    dynamics as for time_evo_lindblad(), but yields it in batches
+    of consecutive timesteps as they are evaluated, rather than
+    returning the whole trajectory at once, so that long runs can
+    be inspected, written to disk or stopped early without holding
+    every density matrix in memory. With the 'stepping' method the
+    density matrix is stepped forward with an exponential
+    propagator; with 'spectral' the superoperator is diagonalised
+    once and each batch evaluated directly from the initial state
+    (falling back to stepping if the superoperator is defective),
+    as is each batch with the SecularPropagator passed for
+    'secular'; and with 'krylov' or 'ode' each batch is evolved
+    from the last density matrix of the one before.
+
+    Parameters
+    ----------
+    dens_mat, superop, timesteps, time_interval, dynamics_model,
+    hamiltonian, temperature, propagator, method, eq_state
+        As for time_evo_lindblad().
+    batch_size : int
+        The number of consecutive timesteps in each batch. Default
+        is 100.
+
+    Yields
+    ------
+    Trajectory
+        The time evolution data for each batch of timesteps in
+        turn, the first starting at t=0.
+    """
+
+    assert isinstance(dens_mat, np.ndarray), 'Input matrix must be a np.ndarray'
+    dims = dens_mat.shape[0]
+    assert dims == dens_mat.shape[1], 'Input matrix must be square'
+    assert method in PROPAGATION_METHODS, (
+        'Must choose a propagation method from ' + str(PROPAGATION_METHODS))
+    if method == 'secular':
+        assert isinstance(propagator, SecularPropagator), (
+            "Must pass a SecularPropagator for the 'secular' method.")
+    else:
+        if sparse.issparse(superop) and method in ('stepping', 'spectral'):
+            superop = superop.toarray()
+        assert superop.shape == (dims ** 2, dims ** 2), (
+            'Superoperator dimensions must be the square of the density'
+            ' matrix dims.')
+    assert isinstance(timesteps, int), 'timesteps must be passed as an int.'
+    assert isinstance(time_interval, float), 'time_interval must be a float.'
+    assert isinstance(batch_size, int) and batch_size > 0, (
+        'batch_size must be a positive int.')
+
+    if eq_state is None:
+        eq_state = equilibrium_state(dynamics_model, dims, hamiltonian,
+                                     temperature)
+    if method == 'spectral':
+        try:
+            propagator = SpectralPropagator(superop)
+        except linalg.LinAlgError:
+            method = 'stepping'
+    if method == 'stepping':
+        # Convert time fs --> ps to match superoperator units
+        if propagator is None:
+            propagator = LindbladPropagator(superop, time_interval * 1e-3)
+        assert propagator.matches(superop, time_interval * 1e-3), (
+            'The propagator passed must be built from the same'
+            ' superoperator and time interval (in ps) as passed.')
+    evolve = {'krylov': evolve_matrix_krylov, 'ode': evolve_matrix_ode}
+    start, current = 0, dens_mat
+    while start <= timesteps:
+        steps = np.arange(start, min(start + batch_size, timesteps + 1))
+        times = steps * time_interval  # fs
+        if method == 'stepping':
+            matrices = np.empty((len(steps), dims, dims), dtype=complex)
+            for idx, step in enumerate(steps):
+                if step > 0:
+                    current = util.renormalise_matrix(
+                        propagator.evolve(current))
+                matrices[idx] = current
+        elif method in ('spectral', 'secular'):
+            matrices = util.batch_renormalise_matrices(
+                propagator.evolve(dens_mat, times * 1e-3))  # fs --> ps
+        else:
+            # Evolve on from the last density matrix of the last batch
+            offset = (steps - max(start - 1, 0)) * time_interval * 1e-3  # ps
+            matrices = evolve[method](current, superop, offset)
+            current = matrices[-1]
+        squared = util.batch_trace_matrix_squared(matrices)
+        distance = util.batch_trace_distance(matrices, eq_state)
+        yield Trajectory(times, matrices, squared, distance)
+        start += len(steps)
+
+class _HSolverDLTerms(HSolverDL):
+
+    """
+    QuTiP's HSolverDL, with the matsubara coefficients and/or
+    frequencies it generates replaced by those passed (if not None)
+    before the hierarchy is configured, so that they are used in
+    the dynamics. HSolverDL builds the hierarchy upon
+    initialisation, so setting exp_coeff and exp_freq afterwards
+    has no effect on the dynamics.
+    """
+
+    def __init__(self, *args, exp_coeff=None, exp_freq=None, **kwargs):
+
+        self._terms = (exp_coeff, exp_freq)
+        super().__init__(*args, **kwargs)
+
+    def _calc_matsubara_params(self):
+
+        coeffs, freqs = super()._calc_matsubara_params()
+        if self._terms[0] is not None:
+            coeffs = list(self._terms[0])
+        if self._terms[1] is not None:
+            freqs = list(self._terms[1])
+        self.exp_coeff, self.exp_freq = coeffs, freqs
+        return coeffs, freqs
 
 def time_evo_heom(dens_mat: np.ndarray, timesteps: int, time_interval: float,
                   hamiltonian: np.ndarray, coupling_op: np.ndarray,
                   reorg_energy: float, temperature: float, bath_cutoff: int,
                   matsubara_terms: int, cutoff_freq: float,
-                  matsubara_coeffs: np.ndarray, matsubara_freqs: np.ndarray
-                  ) -> tuple:
+                  matsubara_coeffs: np.ndarray, matsubara_freqs: np.ndarray,
+                  eq_state: np.ndarray = None) -> tuple:
 
     """
     Evaluates the time evolution of a starting density matrix over
     multiple time steps for the HEOM model, interfacing with
     QuTiP's in-built HEOMSolver. Returns a 3-ple (tuple) containing
-    the time evolution data, the matsubara coefficients, and the
+    the time evolution Trajectory, the matsubara coefficients, and the
     matsubara frequencies (respectively) used in the calculation.
 
     Parameters
@@ -336,14 +1253,23 @@ def time_evo_heom(dens_mat: np.ndarray, timesteps: int, time_interval: float,
         Must be in order (smallest -> largest), where the nth
         frequency corresponds to the nth matsubara term. If None;
         QuTiP's HEOMSolver automatically generates them.
+    eq_state : np.ndarray
+        The thermal equilibrium state the trace distance at each
+        timestep is measured relative to. If None (default), it is
+        computed from the Hamiltonian and temperature.
+
+    Raises
+    ------
+    ValueError
+        If the number of matsubara_coeffs or matsubara_freqs passed
+        differs from matsubara_terms.
 
     Returns
     -------
-    np.array
-        An array where each element corresponds to a timestep in the
-        evolution of the density matrix, containing the following
-        info, respectively; time, density matrix at time, trace
-        squared, trace distance.
+    tuple
+        The time evolution Trajectory of the density matrix, and
+        the matsubara coefficients and frequencies used, as
+        np.ndarrays.
     """
 
     assert isinstance(dens_mat, np.ndarray), 'Input matrix must be a np.ndarray'
@@ -384,45 +1310,463 @@ def time_evo_heom(dens_mat: np.ndarray, timesteps: int, time_interval: float,
                     'matsubara_freqs must be passed as a np.ndarray with all'
                     ' elements as floats.')
 
-    # Build HEOM Solver
-    hsolver = HSolverDL(Qobj(hamiltonian),   # rad ps^-1
-                        Qobj(coupling_op),
-                        reorg_energy,  # rad ps^-1
-                        temperature,   # rad ps^-1
-                        bath_cutoff,
-                        matsubara_terms,
-                        cutoff_freq,   # ps^-1
-                        planck=1.0,
-                        boltzmann=1.0,
-                        renorm=True,
-                        stats=False)
-    # Set the matsubara coeffs and freqs to those passed (if actually passed)
-    if matsubara_coeffs is not None:
-        hsolver.exp_coeff = matsubara_coeffs
-    if matsubara_freqs is not None:
-        hsolver.exp_freq = matsubara_freqs
+    for terms in (matsubara_coeffs, matsubara_freqs):
+        if terms is not None and len(terms) != matsubara_terms:
+            raise ValueError('The number of matsubara_coeffs and'
+                             ' matsubara_freqs passed must equal'
+                             ' matsubara_terms, ' + str(matsubara_terms)
+                             + '.')
+
+    # Build HEOM Solver, or reuse one built for the same system and bath
+    key = util.array_key(hamiltonian, coupling_op, reorg_energy, temperature,
+                         bath_cutoff, matsubara_terms, cutoff_freq,
+                         matsubara_coeffs, matsubara_freqs)
+    hsolver = util.memoise_lru(_HSOLVER_CACHE, key,
+                               lambda: _HSolverDLTerms(
+                                   Qobj(hamiltonian),  # rad ps^-1
+                                   Qobj(coupling_op),
+                                   reorg_energy,  # rad ps^-1
+                                   temperature,   # rad ps^-1
+                                   bath_cutoff,
+                                   matsubara_terms,
+                                   cutoff_freq,   # ps^-1
+                                   planck=1.0,
+                                   boltzmann=1.0,
+                                   renorm=True,
+                                   stats=False,
+                                   exp_coeff=matsubara_coeffs,
+                                   exp_freq=matsubara_freqs),
+                               HSOLVER_CACHE_SIZE)
     # Run the simulation over the time interval.
     times = np.array(range(timesteps + 1)) * time_interval  # ps
     result = hsolver.run(Qobj(dens_mat), times)
-    # CONVERT BACK TO QUANTUM_HEOM UNITS
-    conv_kelvin_to_rad_per_ps = constants.k / (constants.hbar * 1e12)
-    temperature = temperature / conv_kelvin_to_rad_per_ps  # Kelvin
-    hamiltonian = hamiltonian  # rad ps^-1
     # RETRIEVE THERMAL EQUILIBRIUM STATE
-    # equilibrium_state() method requires Hamiltonian in rad ps^-1 and T in K
-    eq_state = equilibrium_state('HEOM', dims, hamiltonian, temperature)
+    if eq_state is None:
+        # CONVERT BACK TO QUANTUM_HEOM UNITS
+        conv_kelvin_to_rad_per_ps = constants.k / (constants.hbar * 1e12)
+        temperature = temperature / conv_kelvin_to_rad_per_ps  # Kelvin
+        # equilibrium_state() requires Hamiltonian in rad ps^-1 and T in K
+        eq_state = equilibrium_state('HEOM', dims, hamiltonian, temperature)
     # PROCESS TIME EVOLUTION DATA
-    evolution = np.empty(len(result.states), dtype=np.ndarray)
-    for i in range(0, len(result.states)):
-        dens_matrix = np.array(result.states[i]).T
-        dens_matrix = util.renormalise_matrix(dens_matrix)
-        evolution[i] = np.array([float(result.times[i]) * 1e3,  # ps --> fs
-                                 dens_matrix,
-                                 util.trace_matrix_squared(dens_matrix),
-                                 util.trace_distance(dens_matrix, eq_state)])
+    # Convert all the states to a single (T x N x N) array at once, then
+    # transpose and renormalise them together.
+    matrices = np.array([state.full() for state in result.states])
+    matrices = util.batch_renormalise_matrices(np.swapaxes(matrices, 1, 2))
+    squared = util.batch_trace_matrix_squared(matrices)
+    distance = util.batch_trace_distance(matrices, eq_state)
+    evolution = Trajectory(np.array(result.times, dtype=float) * 1e3,  # fs
+                           matrices, squared, distance)
     return evolution, np.array(hsolver.exp_coeff), np.array(hsolver.exp_freq)
 
-def process_evo_data(time_evolution: np.array, elements: [list, None],
+def time_evo_heom_native(dens_mat: np.ndarray, timesteps: int,
+                         time_interval: float, hamiltonian: np.ndarray,
+                         coupling_ops: np.ndarray, reorg_energy: float,
+                         temperature: float, bath_cutoff: int,
+                         matsubara_terms: int, cutoff_freq: float,
+                         matsubara_coeffs: np.ndarray = None,
+                         matsubara_freqs: np.ndarray = None,
+                         eq_state: np.ndarray = None,
+                         bath_expansion: str = 'matsubara',
+                         ado_tolerance: float = None) -> tuple:
+
+    """
+    Evaluates the time evolution of a starting density matrix over
+    multiple time steps for the HEOM model, using the native sparse
+    HEOM engine in heom.py rather than QuTiP's HEOMSolver. Unlike
+    time_evo_heom(), supports systems of any size, each site (or
+    coupling operator) interacting with its own independent bath
+    described by the Debye spectral density. Takes the same
+    arguments as time_evo_heom(), except that the coupling
+    operators of all the baths are passed, and returns a 3-ple
+    (tuple) of the same form. The hierarchy generator is reused
+    between calls for the same system and bath, and a stack of
+    initial density matrices can be passed to evolve them all
+    together.
+
+    Parameters
+    ----------
+    dens_mat : np.ndarray
+        The initial density matrix to evolve forward in time, or a
+        (B x dims x dims) stack of them.
+    timesteps : int
+        The number of timesteps over which to evaluate the density
+        matrix.
+    time_interval : float
+        The step forward in time to which the density matrix
+        will be evolved, in units of ps.
+    hamiltonian : np.ndarray
+        The system Hamiltonian for the open quantum system, with
+        dimensions (dims x dims), in units of rad ps^-1.
+    coupling_ops : np.ndarray
+        The coupling operators for the interaction of the system
+        with each bath, as a (B x dims x dims) array.
+    reorg_energy : float
+        The reorganisation energy of each bath, in units of rad
+        ps^-1. Must be a non-negative float.
+    temperature : float
+        The temperature of the baths, in units of rad ps^-1.
+    bath_cutoff : int
+        The depth at which the hierarchy is truncated.
+    matsubara_terms : int
+        The number of exponential terms to include in the expansion
+        of the correlation function of each bath.
+    cutoff_freq : float
+        The cutoff frequency used in calculating the spectral
+        density, in units of rad ps^-1.
+    matsubara_coeffs : np.ndarray
+        The coefficients c_k of the exponential terms of each bath,
+        replacing all matsubara_terms generated by the bath
+        expansion. If None (default) they are generated by the bath
+        expansion.
+    matsubara_freqs : np.ndarray
+        The frequencies v_k of the exponential terms of each bath,
+        in units of rad ps^-1, replacing all matsubara_terms
+        generated by the bath expansion. If None (default) they are
+        generated by the bath expansion.
+    eq_state : np.ndarray
+        The thermal equilibrium state the trace distance at each
+        timestep is measured relative to. If None (default), it is
+        computed from the Hamiltonian and temperature.
+    bath_expansion : str
+        The expansion of the correlation function into exponential
+        terms; either 'matsubara' (default) for
+        bath.matsubara_decomposition() or 'pade' for
+        bath.pade_decomposition().
+    ado_tolerance : float
+        If passed, the hierarchy is propagated with adaptive
+        filtering of the ADOs, as in
+        heom.propagate_hierarchy_filtered(), dropping those whose
+        elements are all smaller in magnitude than this tolerance.
+        If None (default) the full hierarchy is propagated.
+
+    Raises
+    ------
+    ValueError
+        If the number of matsubara_coeffs or matsubara_freqs passed
+        differs from the number of terms of the bath expansion.
+
+    Returns
+    -------
+    tuple
+        The time evolution Trajectory of the density matrix (or a
+        list of B Trajectories, if a stack of initial density
+        matrices was passed), and the matsubara coefficients and
+        frequencies used, as np.ndarrays.
+    """
+
+    assert isinstance(dens_mat, np.ndarray), 'Input matrix must be a np.ndarray'
+    assert dens_mat.ndim in (2, 3), (
+        'Must pass a single initial density matrix or a stack of them.')
+    dims = dens_mat.shape[-1]
+    assert dims == dens_mat.shape[-2], 'Initial density matrix must be square.'
+    assert isinstance(timesteps, int), 'timesteps must be passed as an int.'
+    assert isinstance(time_interval, float), 'time_interval must be a float.'
+    assert (isinstance(hamiltonian, np.ndarray)
+            and hamiltonian.shape == (dims, dims)), (
+                'Must provide the system Hamiltonian as a square np.ndarray'
+                ' with dimensions matching the density matrix.')
+    coupling_ops = np.asarray(coupling_ops)
+    assert coupling_ops.ndim == 3 and coupling_ops.shape[1:] == (dims, dims), (
+        'Must provide the coupling operators as a (B x dims x dims)'
+        ' np.ndarray with dimensions matching the density matrix.')
+    assert (isinstance(reorg_energy, (int, float)) and reorg_energy >= 0.), (
+        'Must provide the coupling strength of the system as a positive float.')
+    assert (isinstance(temperature, (int, float)) and temperature > 0.), (
+        'Must provide the temperature of the system as a positive float.')
+    assert (isinstance(bath_cutoff, int) and bath_cutoff >= 0), (
+        'Bath cutoff must be a positive int')
+    assert (isinstance(matsubara_terms, int) and matsubara_terms >= 0), (
+        'matsubara_terms must be a positive int')
+    assert (isinstance(cutoff_freq, (int, float)) and cutoff_freq > 0.), (
+        'Must provide the cutoff_freq as a positive float.')
+    assert bath_expansion in bath.BATH_EXPANSIONS, (
+        'Must choose a bath_expansion from ' + str(bath.BATH_EXPANSIONS))
+    assert ado_tolerance is None or ado_tolerance >= 0., (
+        'ado_tolerance must be a non-negative float.')
+
+    generator, coeffs, freqs = _native_heom_generator(
+        hamiltonian, coupling_ops, reorg_energy, temperature, bath_cutoff,
+        matsubara_terms, cutoff_freq, matsubara_coeffs, matsubara_freqs,
+        bath_expansion)
+    times = np.arange(timesteps + 1) * time_interval  # ps
+    batch = dens_mat.reshape((-1, dims, dims))
+    if ado_tolerance is None:
+        # All initial states are propagated together
+        matrices = heom.propagate_hierarchy(generator, batch, times)
+    else:
+        # Each initial state has its own set of active ADOs
+        ados = heom.ado_indices(len(coupling_ops) * len(coeffs), bath_cutoff)
+        matrices = np.array([heom.propagate_hierarchy_filtered(
+            generator, ados, initial, times, ado_tolerance)
+                             for initial in batch])
+    matrices = util.batch_renormalise_matrices(matrices)
+    if eq_state is None:
+        # equilibrium_state() requires Hamiltonian in rad ps^-1 and T in K
+        kelvin = temperature / (constants.k / (constants.hbar * 1e12))
+        eq_state = equilibrium_state('HEOM', dims, hamiltonian, kelvin)
+    squared = util.batch_trace_matrix_squared(matrices)
+    distance = util.batch_trace_distance(matrices, eq_state)
+    evolutions = [Trajectory(times * 1e3,  # fs
+                             matrices[idx], squared[idx], distance[idx])
+                  for idx in range(len(batch))]
+    if dens_mat.ndim == 3:
+        return evolutions, coeffs, freqs
+    return evolutions[0], coeffs, freqs
+
+def stream_time_evo_heom_native(dens_mat: np.ndarray, timesteps: int,
+                                time_interval: float,
+                                hamiltonian: np.ndarray,
+                                coupling_ops: np.ndarray,
+                                reorg_energy: float, temperature: float,
+                                bath_cutoff: int, matsubara_terms: int,
+                                cutoff_freq: float,
+                                matsubara_coeffs: np.ndarray = None,
+                                matsubara_freqs: np.ndarray = None,
+                                eq_state: np.ndarray = None,
+                                bath_expansion: str = 'matsubara',
+                                ado_tolerance: float = None,
+                                batch_size: int = 100):
+
+    """
+    Evaluates the time evolution of a density matrix with the
+    native HEOM engine as for time_evo_heom_native(), but yields it
+    in batches of consecutive timesteps as they are evaluated,
+    using heom.stream_hierarchy(), rather than returning the whole
+    trajectory at once. The full hierarchy is carried from one
+    batch to the next, so the dynamics are identical to those of
+    an unbroken run.
+
+    Parameters
+    ----------
+    dens_mat, timesteps, time_interval, hamiltonian, coupling_ops,
+    reorg_energy, temperature, bath_cutoff, matsubara_terms,
+    cutoff_freq, matsubara_coeffs, matsubara_freqs, eq_state,
+    bath_expansion, ado_tolerance
+        As for time_evo_heom_native(), except that only a single
+        initial density matrix can be passed.
+    batch_size : int
+        The number of consecutive timesteps in each batch. Default
+        is 100.
+
+    Yields
+    ------
+    Trajectory
+        The time evolution data for each batch of timesteps in
+        turn, the first starting at t=0.
+    """
+
+    assert isinstance(dens_mat, np.ndarray) and dens_mat.ndim == 2, (
+        'Must pass a single initial density matrix as a np.ndarray.')
+    dims = dens_mat.shape[0]
+    assert isinstance(timesteps, int), 'timesteps must be passed as an int.'
+    assert isinstance(time_interval, float), 'time_interval must be a float.'
+    assert bath_expansion in bath.BATH_EXPANSIONS, (
+        'Must choose a bath_expansion from ' + str(bath.BATH_EXPANSIONS))
+    assert isinstance(batch_size, int) and batch_size > 0, (
+        'batch_size must be a positive int.')
+
+    coupling_ops = np.asarray(coupling_ops)
+    generator, coeffs, _ = _native_heom_generator(
+        hamiltonian, coupling_ops, reorg_energy, temperature, bath_cutoff,
+        matsubara_terms, cutoff_freq, matsubara_coeffs, matsubara_freqs,
+        bath_expansion)
+    if eq_state is None:
+        # equilibrium_state() requires Hamiltonian in rad ps^-1 and T in K
+        kelvin = temperature / (constants.k / (constants.hbar * 1e12))
+        eq_state = equilibrium_state('HEOM', dims, hamiltonian, kelvin)
+    times = np.arange(timesteps + 1) * time_interval  # ps
+    if ado_tolerance is None:
+        batches = heom.stream_hierarchy(generator, dens_mat, times,
+                                        batch_size)
+    else:
+        ados = heom.ado_indices(len(coupling_ops) * len(coeffs), bath_cutoff)
+        batches = heom.stream_hierarchy_filtered(generator, ados, dens_mat,
+                                                 times, ado_tolerance,
+                                                 batch_size)
+    start = 0
+    for matrices in batches:
+        matrices = util.batch_renormalise_matrices(matrices)
+        squared = util.batch_trace_matrix_squared(matrices)
+        distance = util.batch_trace_distance(matrices, eq_state)
+        yield Trajectory(times[start:start + len(matrices)] * 1e3,  # fs
+                         matrices, squared, distance)
+        start += len(matrices)
+
+def _native_heom_generator(hamiltonian, coupling_ops, reorg_energy,
+                           temperature, bath_cutoff, matsubara_terms,
+                           cutoff_freq, matsubara_coeffs, matsubara_freqs,
+                           bath_expansion) -> tuple:
+
+    """
+    Returns the (memoised) hierarchy generator of the native HEOM
+    engine, and the matsubara coefficients and frequencies it was
+    built with, for the arguments of time_evo_heom_native().
+    """
+
+    conv_kelvin_to_rad_per_ps = constants.k / (constants.hbar * 1e12)
+    kelvin = temperature / conv_kelvin_to_rad_per_ps  # Kelvin
+    if bath_expansion == 'pade':
+        decomposition = bath.pade_decomposition
+    else:
+        decomposition = bath.matsubara_decomposition
+    coeffs, freqs = decomposition(cutoff_freq, reorg_energy, kelvin,
+                                  matsubara_terms)
+    # Any terms passed replace the generated ones outright
+    if matsubara_coeffs is not None:
+        if len(matsubara_coeffs) != len(coeffs):
+            raise ValueError('The number of matsubara_coeffs passed must'
+                             ' equal the number of terms of the bath'
+                             ' expansion, ' + str(len(coeffs)) + '.')
+        coeffs = np.array(matsubara_coeffs, dtype=complex)
+    if matsubara_freqs is not None:
+        if len(matsubara_freqs) != len(freqs):
+            raise ValueError('The number of matsubara_freqs passed must'
+                             ' equal the number of terms of the bath'
+                             ' expansion, ' + str(len(freqs)) + '.')
+        freqs = np.array(matsubara_freqs)
+    terminator = bath.terminator_factor(cutoff_freq, reorg_energy, kelvin,
+                                        coeffs, freqs)
+    generator = heom.cached_hierarchy_generator(hamiltonian, coupling_ops,
+                                                coeffs, freqs, bath_cutoff,
+                                                terminator)
+    return generator, coeffs, freqs
+
+def steady_state_heom(hamiltonian: np.ndarray, coupling_ops: np.ndarray,
+                      reorg_energy: float, temperature: float,
+                      bath_cutoff: int, matsubara_terms: int,
+                      cutoff_freq: float, matsubara_coeffs: np.ndarray = None,
+                      matsubara_freqs: np.ndarray = None,
+                      bath_expansion: str = 'matsubara',
+                      method: str = 'direct') -> np.ndarray:
+
+    """
+    Evaluates the steady state of the system density matrix under
+    HEOM dynamics directly, with heom.hierarchy_steady_state(),
+    using the same hierarchy as time_evo_heom_native(). This is the
+    exact long-time limit of the HEOM dynamics for the truncation
+    used, which differs from the thermal state of the system
+    Hamiltonian alone by the effect of the system-bath coupling.
+
+    Parameters
+    ----------
+    hamiltonian : np.ndarray
+        The system Hamiltonian, with dimensions (dims x dims), in
+        units of rad ps^-1.
+    coupling_ops : np.ndarray
+        The coupling operators for the interaction of the system
+        with each bath, as a (B x dims x dims) array.
+    reorg_energy : float
+        The reorganisation energy of each bath, in units of rad
+        ps^-1.
+    temperature : float
+        The temperature of the baths, in units of rad ps^-1.
+    bath_cutoff : int
+        The depth at which the hierarchy is truncated.
+    matsubara_terms : int
+        The number of exponential terms to include in the expansion
+        of the correlation function of each bath.
+    cutoff_freq : float
+        The cutoff frequency used in calculating the spectral
+        density, in units of rad ps^-1.
+    matsubara_coeffs : np.ndarray
+        The coefficients c_k of the exponential terms of each bath.
+        If None (default) they are generated by the bath expansion.
+    matsubara_freqs : np.ndarray
+        The frequencies v_k of the exponential terms of each bath,
+        in units of rad ps^-1. If None (default) they are generated
+        by the bath expansion.
+    bath_expansion : str
+        The expansion of the correlation function into exponential
+        terms; either 'matsubara' (default) or 'pade'.
+    method : str
+        The linear solver used; either 'direct' (default) or
+        'iterative'.
+
+    Returns
+    -------
+    np.ndarray
+        The steady state density matrix, with dimensions
+        (dims x dims).
+    """
+
+    assert bath_expansion in bath.BATH_EXPANSIONS, (
+        'Must choose a bath_expansion from ' + str(bath.BATH_EXPANSIONS))
+    generator = _native_heom_generator(hamiltonian, np.asarray(coupling_ops),
+                                       reorg_energy, temperature, bath_cutoff,
+                                       matsubara_terms, cutoff_freq,
+                                       matsubara_coeffs, matsubara_freqs,
+                                       bath_expansion)[0]
+    return heom.hierarchy_steady_state(generator, hamiltonian.shape[0],
+                                       method)
+
+def steady_state_lindblad(superop, method: str = None,
+                          tolerance: float = 1e-10) -> np.ndarray:
+
+    """
+    Evaluates the steady state of a Lindblad master equation
+    directly, as the null space of its Liouvillian, rather than by
+    time-evolving to equilibrium. The Liouvillian conserves the
+    trace of the density matrix, so as in
+    heom.hierarchy_steady_state() the row giving the rate of change
+    of its first diagonal element is replaced by the trace condition
+
+    .. math::
+        tr(\\rho) = 1
+
+    and the resulting non-singular linear system solved. Comparing
+    this with equilibrium_state() shows whether the analytic
+    equilibrium state is the fixed point of the Lindblad model.
+
+    Parameters
+    ----------
+    superop : np.ndarray or scipy.sparse.spmatrix
+        The (N^2 x N^2) Liouvillian; the sum of the Hamiltonian and
+        Lindbladian superoperators, in units of rad ps^-1.
+    method : str
+        The linear solver to use, from heom.STEADY_STATE_METHODS;
+        'direct' for an LU factorisation (dense if the Liouvillian
+        is a np.ndarray, and sparse otherwise), or 'iterative' for
+        GMRES preconditioned with an incomplete sparse LU
+        factorisation, which needs far less memory for systems with
+        many sites. If None (default), 'direct' is used for systems
+        of up to DENSE_STEADY_STATE_SITES sites, and 'iterative'
+        for larger ones.
+    tolerance : float
+        The relative residual at which the 'iterative' solver is
+        considered converged. Default is 1e-10.
+
+    Returns
+    -------
+    np.ndarray
+        The N x N steady state density matrix.
+
+    Raises
+    ------
+    ValueError
+        If the 'iterative' solver doesn't converge.
+    """
+
+    dims = int(round(np.sqrt(superop.shape[0])))
+    assert superop.shape == (dims ** 2, dims ** 2), (
+        'Liouvillian must be a square (N^2 x N^2) matrix.')
+    if method is None:
+        method = 'direct' if dims <= DENSE_STEADY_STATE_SITES else 'iterative'
+    assert method in heom.STEADY_STATE_METHODS, (
+        'Must choose a method from ' + str(heom.STEADY_STATE_METHODS))
+    if method == 'iterative' or sparse.issparse(superop):
+        return heom.hierarchy_steady_state(sparse.csr_matrix(superop), dims,
+                                           method, tolerance)
+    # Replace the first row with the trace of the density matrix
+    matrix = np.array(superop, dtype=complex)
+    matrix[0] = 0.
+    matrix[0, np.arange(dims) * (dims + 1)] = 1.
+    rhs = np.zeros(dims ** 2, dtype=complex)
+    rhs[0] = 1.
+    dens_mat = linalg.solve(matrix, rhs).reshape(dims, dims)
+    dens_mat = 0.5 * (dens_mat + dens_mat.conjugate().T)
+    return dens_mat / np.trace(dens_mat)
+
+def process_evo_data(time_evolution: Trajectory, elements: [list, None],
                      trace_measure: list):
 
     """
@@ -430,13 +1774,16 @@ def process_evo_data(time_evolution: np.array, elements: [list, None],
     by its time_evolution() method. Returns the time, matrix,
     and trace measure (trace of the matrix squared, and trace
     distance) as separate numpy arrays, ready for use in plotting.
+    The arrays returned are views of the Trajectory's data, so
+    should not be modified in place.
 
     Parameters
     ----------
-    time_evolution : np.array
+    time_evolution : Trajectory
         As produced by the QuantumSystem's time_evolution() method,
         containing the time, density matrix, and trace measures
-        at each timestep in the evolution.
+        at each timestep in the evolution. Time evolution data in
+        the legacy object array format is also accepted.
     elements : list
         The elements of the density matrix to extract and return,
         in the format i.e. ['11', '21', ...]. Can also take the
@@ -468,25 +1815,11 @@ def process_evo_data(time_evolution: np.array, elements: [list, None],
         None.
     """
 
-    times = np.empty(len(time_evolution), dtype=float)
-    matrix_data = ({element: np.empty(len(time_evolution), dtype=complex)
+    time_evolution = Trajectory.from_legacy(time_evolution)
+    times = time_evolution.times  # already in fs
+    matrix_data = ({element: time_evolution.element(element)
                     for element in elements} if elements else None)
-    squared = (np.empty(len(time_evolution), dtype=float)
-               if 'squared' in trace_measure else None)
-    distance = (np.empty(len(time_evolution), dtype=float)
-                if 'distance' in trace_measure else None)
-    for idx, (time, rho_t, squ, dist) in enumerate(time_evolution, start=0):
-        # Retrieve time
-        times[idx] = time  # already in fs
-        # Process density matrix data
-        if matrix_data is not None:
-            for element in elements:
-                n, m = int(element[0]) - 1, int(element[1]) - 1
-                matrix_data[element][idx] = rho_t[n][m]
-        # Process trace measure data
-        if squared is not None:
-            squared[idx] = squ
-        if distance is not None:
-            distance[idx] = dist
+    squared = time_evolution.purity if 'squared' in trace_measure else None
+    distance = time_evolution.distance if 'distance' in trace_measure else None
 
     return times, matrix_data, squared, distance
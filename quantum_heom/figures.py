@@ -33,6 +33,7 @@ from scipy.optimize import curve_fit
 from quantum_heom import bath
 from quantum_heom import evolution as evo
 from quantum_heom import metadata as meta
+from quantum_heom import sweep
 from quantum_heom import utilities as util
 from quantum_heom.bath import SPECTRAL_DENSITIES
 from quantum_heom.lindbladian import LINDBLAD_MODELS
@@ -80,8 +81,10 @@ def plot_dynamics(systems, elements: [list, str] = None,
     trace_measure : str or list of str or None
         The trace measure
     asymptote : bool
-        If True, plots an asymptote on the real axis at 1/N, where
-        N is the number of sites in qsys.
+        If True, plots asymptotes on the real axis at the site
+        populations of the steady state of qsys, found directly
+        from the generator of its dynamics (i.e. at 1/N for the
+        local dephasing model, where N is the number of sites).
     view_3d : bool
         If True, formats the axes in 3D, otherwise just formats
         in 2D. Default is False.
@@ -212,8 +215,10 @@ def _plot_data(ax, processed, qsys, multiple: bool, elements: list,
         Which components of the density matrix coherences to plot.
         Can be both, either, or neither of 'real', 'imag'.
     asymptote : bool
-        If True, plots an asymptote on the real axis at 1/N, where
-        N is the number of sites in qsys.
+        If True, plots asymptotes on the real axis at the site
+        populations of the steady state of qsys, found directly
+        from the generator of its dynamics (i.e. at 1/N for the
+        local dephasing model, where N is the number of sites).
     view_3d : bool
         If True, formats the axes in 3D, otherwise just formats
         in 2D.
@@ -354,10 +359,13 @@ def _plot_data(ax, processed, qsys, multiple: bool, elements: list,
         ax.plot(times, *args, dashes=[3, 1], linewidth=linewidth,
                 c=colour, label=label)
     if asymptote:
-        asym = [1 / qsys.sites] * len(times)
-        args = ((zeros, asym) if view_3d else (asym,))
-        ax.plot(times, *args, ls='--', linewidth=linewidth, c='gray',
-                label='$y = \\frac{1}{N}$')
+        # One asymptote for each distinct steady state population
+        pops = np.unique(np.round(np.diag(qsys.steady_state).real, 6))
+        for idx, pop in enumerate(pops):
+            asym = [pop] * len(times)
+            args = ((zeros, asym) if view_3d else (asym,))
+            ax.plot(times, *args, ls='--', linewidth=linewidth, c='gray',
+                    label='Steady State' if idx == 0 else None)
     return ax
 
 def _format_axes(ax, elements: [list, None], trace_measure: list,
@@ -607,16 +615,11 @@ def comparative_trace_distance(systems, reference, save: bool = False):
     figsize = (ratio * scaling, scaling)
     _, axes = plt.subplots(figsize=figsize)
 
-    # QuantumSystem.time_evolution = (time, matrix, squared, distance)
     evo_ref = reference.time_evolution
-    times = [step[0] for step in evo_ref]
+    times = evo_ref.times
     for sys_idx, sys in enumerate(systems):
         evo_sys = sys.time_evolution
-        distances = np.empty(len(evo_sys), dtype=float)
-        for idx, step in enumerate(evo_sys):
-            mat_sys = step[1]
-            mat_ref = evo_ref[idx][1]
-            distances[idx] = util.trace_distance(mat_sys, mat_ref)
+        distances = util.batch_trace_distance(evo_sys.rho, evo_ref.rho)
         axes.plot(times, distances, label=LEGEND_LABELS[sys.dynamics_model])
     axes = _format_axes(axes, elements=None, trace_measure=['distance'],
                         times=times, view_3d=False)
@@ -665,10 +668,7 @@ def fit_exponential_to_trace_distance(system, save: bool = False) -> tuple:
         system = system[0]
     if system is not None:
         evol = system.time_evolution
-        times, distances = [], []
-        for step in evol:
-            times.append(step[0])
-            distances.append(step[3])
+        times, distances = evol.times, evol.distance
     else:
         assert (times is not None and distances is not None), (
             'If not passing a QuantumSystem object, must pass times and'
@@ -745,11 +745,10 @@ def plot_systems_ipr(systems, save: bool = False) -> tuple:
 
     for sys in systems:
         evol = sys.time_evolution
-        times = np.zeros(len(evol), dtype=float)
+        times = evol.times
         iprs = np.zeros(len(evol), dtype=float)
-        for idx, step in enumerate(evol):
-            times[idx] = step[0]
-            iprs[idx] = util.calc_ipr_density_matrix(step[1])
+        for idx, mat in enumerate(evol.rho):
+            iprs[idx] = util.calc_ipr_density_matrix(mat)
         axes.plot(times, iprs, label=LEGEND_LABELS[sys.dynamics_model])
 
     axes = _format_axes(axes, elements=None, trace_measure='IPR',
@@ -766,7 +765,7 @@ def plot_systems_ipr(systems, save: bool = False) -> tuple:
     plt.show()
 
 def integrate_distance_fxn_variable(systems, reference, var_name,
-                                    var_values, save):
+                                    var_values, save, processes: int = 1):
 
     """
     Plots the integrated trace distance of each QuantumSystem
@@ -795,6 +794,13 @@ def integrate_distance_fxn_variable(systems, reference, var_name,
         Whether or not to save the figure. Saves to the relative
         directory quantum_HEOM/doc/figures/ with a descriptive
         filename. Default is False.
+    processes : int
+        The number of processes over which the values are
+        evaluated in parallel, as in sweep.sweep(). If 1 (default),
+        they are evaluated serially in the calling process. If
+        None, all the machine's cores are used, in which case the
+        calling script must be guarded by
+        if __name__ == '__main__'.
     """
 
     xaxis_labels = {'alpha': '$\\alpha$ / rad ps$^{-1}$',
@@ -823,31 +829,12 @@ def integrate_distance_fxn_variable(systems, reference, var_name,
     ratio, scaling = 1.6, 5
     figsize = (ratio * scaling, scaling)
     _, axes = plt.subplots(figsize=figsize)
-    for system in systems:
-        integ_dists = np.empty(len(var_values))
-        for idx, value in enumerate(var_values):
-            if var_name == 'alpha':
-                setattr(system, 'alpha_beta', (value, system.alpha_beta[1]))
-                setattr(reference, 'alpha_beta',
-                        (value, reference.alpha_beta[1]))
-            elif var_name == 'beta':
-                setattr(system, 'alpha_beta', (system.alpha_beta[0], value))
-                setattr(reference, 'alpha_beta',
-                        (reference.alpha_beta[0], value))
-            elif var_name == 'epsi':
-                setattr(system, 'epsi_delta', (value, system.epsi_delta[1]))
-                setattr(reference, 'epsi_delta',
-                        (value, reference.epsi_delta[1]))
-            elif var_name == 'delta':
-                setattr(system, 'epsi_delta', (system.epsi_delta[0], value))
-                setattr(reference, 'epsi_delta',
-                        (reference.epsi_delta[0], value))
-            else:
-                setattr(system, var_name, value)
-                setattr(reference, var_name, value)
-            integ_dists[idx] = meta.integrate_trace_distance(system, reference)
+    # The systems and reference are evaluated for all values in parallel
+    results = sweep.sweep(systems, reference, {var_name: var_values},
+                          processes=processes)
+    for idx, system in enumerate(systems):
         label = LEGEND_LABELS[system.dynamics_model]
-        axes.plot(var_values, integ_dists, label=label)
+        axes.plot(var_values, results['integ_dist'][:, idx], label=label)
     # Format plot
     axes_label_size = '15'
     tick_size = 15
@@ -946,18 +933,20 @@ def plot_comparison_publication(systems, rows: str, save: bool = False):
         # excitations on site 1, site 6, and site 1 + 6.
         times = []
         matrix_data = []
+        if rows == 'initial excitation':
+            # Evolve all 3 initial states together, sharing the dynamics
+            evols = system.time_evolutions([[1], [6], [1, 6]])
+        elif rows != 'phonon relaxation':
+            raise ValueError('Invalid variable to plot on the rows.')
         for idx in range(3):
             if rows == 'initial excitation':
-                initial_excitations = [[1], [6], [1, 6]]
-                system.init_site_pop = initial_excitations[idx]
-            elif rows == 'phonon relaxation':
+                evol = evols[idx]
+            else:
                 rates = [50, 100, 166]
                 system.cutoff_freq = util.unit_conversion(rates[idx],
                                                           'fs rad^-1',
                                                           'rad ps^-1')
-            else:
-                raise ValueError('Invalid variable to plot on the rows.')
-            evol = system.time_evolution
+                evol = system.time_evolution
             elements = util.elements_from_str(7, 'diagonals')
             tmp = evo.process_evo_data(evol, elements, [None])
             time, matrix, _, _ = tmp
@@ -1126,7 +1115,10 @@ def _write_args_to_file(systems, plot_type: str, plot_args: dict,
     # Write args to file as Python copyable text
     with open(filename, 'a+') as f:
         for idx, sys in enumerate(systems):
-            args = re.sub(' +', ' ', str(sys.__dict__).replace("\'_", "\'"))
+            # Only write the settings, not the memoised quantities
+            settings = {key: value for key, value in sys.__dict__.items()
+                        if key != '_cache'}
+            args = re.sub(' +', ' ', str(settings).replace("\'_", "\'"))
             args = args.replace('\n', '')
             args = args.replace('array', 'np.array')
             f.write('# Args for initialising QuantumSystem '
@@ -1,6 +1,6 @@
 """Contains functions to manipulate the Hamiltonian"""
 
-from scipy import constants
+from scipy import constants, sparse
 import numpy as np
 
 from quantum_heom import utilities as util
@@ -169,7 +169,8 @@ def adjacency_matrix(dims, interaction_model: str) -> np.ndarray:
                               'neighbour cyclic" or "nearest neighbour'
                               ' linear" models.')
 
-def hamiltonian_superop(hamiltonian: np.ndarray) -> np.ndarray:
+def hamiltonian_superop(hamiltonian: np.ndarray,
+                        sparse_format: bool = False) -> np.ndarray:
 
     """
     Builds the Hamiltonian superoperator from an input Hamiltonian,
@@ -182,18 +183,28 @@ def hamiltonian_superop(hamiltonian: np.ndarray) -> np.ndarray:
     ----------
     hamiltonian : np.ndarray
         The input 2D square system Hamiltonian, of dimensions N x N.
+    sparse_format : bool
+        If True, builds the superoperator as a scipy.sparse CSR
+        matrix. Default is False.
 
     Returns
     -------
     np.ndarray
         The (N^2) x (N^2) 2D array representing the Hamiltonian
-        superoperator.
+        superoperator. A scipy.sparse.csr_matrix if sparse_format
+        is True.
     """
 
     assert hamiltonian.shape[0] == hamiltonian.shape[1], (
         'Input Hamiltonian must be square.')
 
     dims = hamiltonian.shape[0]
+    if sparse_format:
+        hamiltonian = sparse.csr_matrix(hamiltonian)
+        iden = sparse.identity(dims, format='csr')
+        return (-1.0j * (sparse.kron(hamiltonian, iden, format='csr')
+                         - sparse.kron(iden, hamiltonian.conjugate().T,
+                                       format='csr'))).tocsr()
     iden = np.identity(dims)
     return (-1.0j * (np.kron(hamiltonian, iden)
                      - np.kron(iden, hamiltonian.T.conjugate())))
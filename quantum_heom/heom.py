@@ -1,8 +1,41 @@
-"""Contains functions that aid in the HEOM simulation process
-via QuTiP's HEOM Solver."""
+"""Contains functions that aid in the HEOM simulation process,
+either via QuTiP's HEOM Solver or the native sparse HEOM engine;
+enumeration of the auxiliary density operators (ADOs), assembly of
+the hierarchy generator, its propagation, and the convergence of its
+truncation."""
 
+from collections import OrderedDict
+from functools import partial
+import inspect
+import itertools
+
+from scipy import sparse
+from scipy.sparse import linalg as sparse_linalg
+from scipy.special import comb
 import numpy as np
 
+from quantum_heom import bath
+from quantum_heom import utilities as util
+
+HEOM_SOLVERS = ['qutip', 'native']
+# The maximum number of complex elements of the hierarchy held in memory
+# at once when propagating over an evenly spaced time grid.
+HIERARCHY_CHUNK = 2 ** 22
+# The largest number of ADOs of a hierarchy that hierarchy_generator()
+# will assemble; the default bath_cutoff of 20 gives ~1e9 ADOs for a
+# 7-site system with 2 exponential terms per bath.
+MAX_ADOS = 10 ** 5
+# The hierarchy generators assembled by cached_hierarchy_generator(), least
+# recently used first, and the maximum number kept.
+_GENERATOR_CACHE = OrderedDict()
+GENERATOR_CACHE_SIZE = 8
+STEADY_STATE_METHODS = ['direct', 'iterative']
+# The name of the relative tolerance argument of scipy's gmres(); 'rtol'
+# from scipy 1.12, where 'tol' is deprecated (and removed in 1.14).
+_GMRES_RTOL = ('rtol' if 'rtol' in inspect.signature(sparse_linalg.gmres)
+               .parameters else 'tol')
+
+
 def system_bath_coupling_op(sites: int = 2) -> np.ndarray:
 
     """
@@ -33,3 +66,762 @@ def system_bath_coupling_op(sites: int = 2) -> np.ndarray:
         return np.array([[1, 0], [0, -1]])
     raise NotImplementedError('HEOM can currently only be plotted for'
                               ' 2 site systems.')
+
+def system_bath_coupling_ops(sites: int, interaction_model: str) -> np.ndarray:
+
+    """
+    Builds the coupling operators for the interaction of the system
+    with each of its independent baths, as used by the native HEOM
+    engine. For the 'spin-boson' model there is a single bath,
+    coupled through the sigma z Pauli operator as in
+    system_bath_coupling_op(). For all other models each site is
+    coupled to its own bath through the projector onto that site,
+    |j><j|.
+
+    Parameters
+    ----------
+    sites : int
+        The number of sites in the system.
+    interaction_model : str
+        The interaction model used to build the system Hamiltonian.
+
+    Returns
+    -------
+    np.ndarray
+        3D array of shape (B, N, N), where B is the number of baths
+        and N the number of sites, of the coupling operators.
+    """
+
+    if interaction_model == 'spin-boson':
+        return system_bath_coupling_op(sites)[np.newaxis]
+    ops = np.zeros((sites, sites, sites))
+    ops[np.arange(sites), np.arange(sites), np.arange(sites)] = 1.
+    return ops
+
+def ado_indices(modes: int, depth: int) -> np.ndarray:
+
+    """
+    Enumerates the auxiliary density operators (ADOs) of a hierarchy
+    truncated at a given depth, i.e. all the ways of distributing at
+    most depth excitations between the exponential modes of the
+    baths. The ADOs are ordered by level (total number of
+    excitations), so the first is the system density matrix.
+
+    Parameters
+    ----------
+    modes : int
+        The total number of exponential modes, i.e. the number of
+        baths multiplied by the number of exponential terms per
+        bath.
+    depth : int
+        The hierarchy depth, i.e. the maximum total number of
+        excitations of any ADO.
+
+    Returns
+    -------
+    np.ndarray
+        2D int array of shape (n_ados, modes), where each row gives
+        the number of excitations of each mode for one ADO.
+    """
+
+    assert isinstance(modes, int) and modes >= 0, (
+        'modes must be a non-negative int.')
+    assert isinstance(depth, int) and depth >= 0, (
+        'depth must be a non-negative int.')
+    indices = [np.bincount(np.array(combo, dtype=int), minlength=modes)
+               for level in range(depth + 1)
+               for combo in itertools.combinations_with_replacement(
+                   range(modes), level)]
+    return np.array(indices, dtype=int).reshape(-1, modes)
+
+def ado_parents(ados: np.ndarray) -> np.ndarray:
+
+    """
+    Finds the parent of each ADO for each mode, i.e. the index of
+    the ADO one level up the hierarchy, with one fewer excitation
+    of that mode.
+
+    Parameters
+    ----------
+    ados : np.ndarray
+        The ADOs of the hierarchy, as returned by ado_indices().
+
+    Returns
+    -------
+    np.ndarray
+        2D int array of shape (n_ados, modes), where element [n, k]
+        is the index of the parent of ADO n for mode k, or -1 if
+        mode k of ADO n isn't excited.
+    """
+
+    lookup = {tuple(ado): idx for idx, ado in enumerate(ados)}
+    parents = np.full(ados.shape, -1, dtype=int)
+    for idx, ado in enumerate(ados):
+        for mode in np.flatnonzero(ado):
+            lowered = ado.copy()
+            lowered[mode] -= 1
+            parents[idx, mode] = lookup[tuple(lowered)]
+    return parents
+
+def ado_adjacency(ados: np.ndarray) -> sparse.csr_matrix:
+
+    """
+    Builds the adjacency matrix of the hierarchy; ADOs n and m are
+    adjacent if one is the parent of the other for some mode, so
+    that each is coupled to the other by the hierarchy generator.
+
+    Parameters
+    ----------
+    ados : np.ndarray
+        The ADOs of the hierarchy, as returned by ado_indices().
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        The symmetric n_ados x n_ados adjacency matrix, with
+        elements of 1 between adjacent ADOs.
+    """
+
+    parents = ado_parents(ados)
+    children, modes = np.nonzero(parents >= 0)
+    upper = sparse.csr_matrix((np.ones(len(children)),
+                               (parents[children, modes], children)),
+                              shape=(len(ados), len(ados)))
+    return (upper + upper.T).tocsr()
+
+def hierarchy_generator(hamiltonian: np.ndarray, coupling_ops: np.ndarray,
+                        coeffs: np.ndarray, freqs: np.ndarray, depth: int,
+                        terminator: complex = 0.) -> sparse.csr_matrix:
+
+    """
+    Assembles the generator of the hierarchical equations of motion
+    for a system coupled to B independent baths, each described by
+    the same K exponential terms of its correlation function,
+
+    .. math::
+        C(t) = \\sum_k c_k e^{- \\nu_k t}
+
+    The hierarchy is stored ADO-major; the vectorised (C-order)
+    density operators of each ADO are contiguous blocks of the
+    state vector, ordered as by ado_indices(), with the system
+    density matrix first. As in QuTiP's HSolverDL, the couplings
+    between ADOs are rescaled so that all ADOs are of similar
+    magnitude, and the Tanimura terminator, which approximates the
+    effect of the truncated exponentials, is applied to each ADO.
+
+    Parameters
+    ----------
+    hamiltonian : np.ndarray
+        The N x N system Hamiltonian, in units of rad ps^-1.
+    coupling_ops : np.ndarray
+        The coupling operators of the system to each bath, as a
+        (B x N x N) array, or a single N x N operator for one bath.
+    coeffs : np.ndarray
+        The K coefficients c_k of the exponential terms, in units of
+        rad^2 ps^-2.
+    freqs : np.ndarray
+        The K frequencies nu_k of the exponential terms, in units of
+        rad ps^-1.
+    depth : int
+        The hierarchy depth at which to truncate.
+    terminator : complex
+        The factor of the Tanimura terminator, as given by
+        bath.terminator_factor(). Default is 0, i.e. no terminator.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        The (n_ados * N^2) x (n_ados * N^2) hierarchy generator, in
+        units of rad ps^-1.
+
+    Raises
+    ------
+    ValueError
+        If the hierarchy has more than MAX_ADOS ADOs.
+    """
+
+    dims = hamiltonian.shape[0]
+    coupling_ops = np.asarray(coupling_ops).reshape(-1, dims, dims)
+    coeffs = np.asarray(coeffs, dtype=complex)
+    freqs = np.asarray(freqs)
+    assert len(coeffs) == len(freqs), (
+        'Must pass a frequency for each exponential coefficient.')
+    n_terms, n_baths = len(coeffs), len(coupling_ops)
+    n_ados = comb(n_baths * n_terms + depth, depth, exact=True)
+    if n_ados > MAX_ADOS:
+        raise ValueError('A hierarchy of depth ' + str(depth) + ' for '
+                         + str(n_baths) + ' baths of ' + str(n_terms)
+                         + ' exponential terms has ' + str(n_ados)
+                         + ' ADOs, more than MAX_ADOS = '
+                         + str(MAX_ADOS) + '. Reduce the bath_cutoff'
+                         ' or matsubara_terms (see converge_hierarchy()'
+                         ' for choosing them), or raise heom.MAX_ADOS.')
+    ados = ado_indices(n_baths * n_terms, depth)
+    kron = partial(sparse.kron, format='csr')
+    ident = sparse.identity(dims, format='csr')
+
+    # Liouvillian of the system, and the terminator, act on every ADO
+    ham = sparse.csr_matrix(hamiltonian)
+    block = -1j * (kron(ham, ident) - kron(ident, ham.T))
+    for q_op in coupling_ops:
+        q_sq = q_op.conjugate().T.dot(q_op)
+        block = block - terminator * (- 2 * kron(q_op, q_op.conjugate())
+                                      + kron(q_sq, ident)
+                                      + kron(ident, q_sq.T))
+    generator = kron(sparse.identity(n_ados), block)
+    # Each ADO decays at the sum of the frequencies of its excitations
+    generator = generator + kron(sparse.diags(- ados.dot(np.tile(freqs,
+                                                                 n_baths))),
+                                 sparse.identity(dims ** 2))
+
+    # Couplings between each ADO and its neighbours one level up and down
+    all_parents = ado_parents(ados)
+    for mode in range(n_baths * n_terms):
+        q_op = sparse.csr_matrix(coupling_ops[mode // n_terms])
+        coeff = coeffs[mode % n_terms]
+        phase = coeff / abs(coeff) if coeff != 0 else 0.
+        children = np.flatnonzero(ados[:, mode])
+        if len(children) == 0:
+            continue
+        parents = all_parents[children, mode]
+        scale = -1j * np.sqrt(abs(coeff) * ados[children, mode])
+        upper = sparse.csr_matrix((scale, (parents, children)),
+                                  shape=(n_ados, n_ados))
+        lower = sparse.csr_matrix((scale, (children, parents)),
+                                  shape=(n_ados, n_ados))
+        generator = generator + kron(upper, kron(q_op, ident)
+                                     - kron(ident, q_op.T))
+        generator = generator + kron(lower,
+                                     phase * kron(q_op, ident)
+                                     - np.conj(phase) * kron(ident, q_op.T))
+    generator.eliminate_zeros()
+    return generator
+
+def cached_hierarchy_generator(hamiltonian: np.ndarray,
+                               coupling_ops: np.ndarray, coeffs: np.ndarray,
+                               freqs: np.ndarray, depth: int,
+                               terminator: complex = 0.) -> sparse.csr_matrix:
+
+    """
+    Returns the hierarchy generator built by hierarchy_generator()
+    for the arguments passed, reusing a generator assembled by an
+    earlier call with the same Hamiltonian, coupling operators,
+    bath terms, truncation and terminator. Up to
+    GENERATOR_CACHE_SIZE generators are kept in a module-level
+    cache, so that repeated simulations of the same system (i.e.
+    for different initial states) assemble it only once. The
+    generator returned is shared, so must not be modified in place.
+
+    Parameters
+    ----------
+    As for hierarchy_generator().
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        The hierarchy generator, in units of rad ps^-1.
+    """
+
+    coupling_ops = np.asarray(coupling_ops)
+    key = util.array_key(np.asarray(hamiltonian), coupling_ops,
+                         np.asarray(coeffs, dtype=complex),
+                         np.asarray(freqs, dtype=complex),
+                         depth, complex(terminator))
+    return util.memoise_lru(_GENERATOR_CACHE, key,
+                            lambda: hierarchy_generator(hamiltonian,
+                                                        coupling_ops, coeffs,
+                                                        freqs, depth,
+                                                        terminator),
+                            GENERATOR_CACHE_SIZE)
+
+def clear_generator_cache():
+
+    """
+    Removes all hierarchy generators from the cache used by
+    cached_hierarchy_generator().
+    """
+
+    _GENERATOR_CACHE.clear()
+
+def _rebatch(blocks, batch_size: int):
+
+    """
+    Joins (along their first axis) and splits the arrays yielded by
+    an iterable into arrays of batch_size elements, yielding each in
+    turn; the last may have fewer.
+    """
+
+    buffer, count = [], 0
+    for block in blocks:
+        buffer.append(block)
+        count += len(block)
+        while count >= batch_size:
+            joined = np.concatenate(buffer)
+            yield joined[:batch_size]
+            buffer, count = [joined[batch_size:]], count - batch_size
+    if count:
+        yield np.concatenate(buffer)
+
+def stream_hierarchy(generator, dens_mat: np.ndarray, times: np.ndarray,
+                     batch_size: int = None):
+
+    """
+    Propagates a hierarchy from an initial system density matrix,
+    with all other ADOs initially zero, yielding the system density
+    matrix at each of a set of times in batches of consecutive
+    times as they are evaluated, so that long runs can be
+    inspected, written out or stopped early without holding the
+    whole trajectory in memory. Uses scipy's expm_multiply; over
+    evenly spaced times, whole chunks of the time grid are
+    evaluated in a single call, with the chunk length chosen so
+    that at most HIERARCHY_CHUNK elements of the hierarchy are held
+    in memory at once. A stack of initial density matrices can be
+    passed to propagate them all together, as the columns of a
+    multi-column right-hand side, so that the cost of each sparse
+    matrix product and of estimating the generator's norm is shared
+    between them.
+
+    Parameters
+    ----------
+    generator : scipy.sparse.spmatrix
+        The hierarchy generator, as built by hierarchy_generator(),
+        in units of rad ps^-1.
+    dens_mat : np.ndarray
+        The N x N system density matrix at time t=0, or a
+        (B x N x N) stack of them.
+    times : np.ndarray
+        1D array of the T times at which to evaluate the system
+        density matrix, in ps. Must be non-negative and in
+        ascending order.
+    batch_size : int
+        The number of consecutive times in each batch yielded. If
+        None (default), all T times are yielded in one batch.
+
+    Yields
+    ------
+    np.ndarray
+        A (T_b x N x N) array of the system density matrix at each
+        of the next T_b times, or a (B x T_b x N x N) array if a
+        stack of initial density matrices was passed.
+    """
+
+    times = np.asarray(times, dtype=float)
+    assert times.ndim == 1 and len(times) > 0, (
+        'times must be passed as a non-empty 1D array.')
+    assert np.all(times >= 0.), 'times must be non-negative.'
+    assert np.all(np.diff(times) >= 0.), 'times must be in ascending order.'
+    batch_size = len(times) if batch_size is None else batch_size
+    assert batch_size > 0, 'batch_size must be a positive int.'
+    batch = dens_mat.reshape((-1,) + dens_mat.shape[-2:])
+    dims = batch.shape[1]
+    sys_dim = dims ** 2
+    assert generator.shape[0] % sys_dim == 0, (
+        'Generator dimensions must be a multiple of the square of the'
+        ' density matrix dims.')
+
+    def blocks():
+        # Each column is the hierarchy for one initial density matrix
+        vec = np.zeros((generator.shape[0], len(batch)), dtype=complex)
+        vec[:sys_dim] = batch.reshape((len(batch), sys_dim)).T
+        if times[0] > 0.:
+            vec = sparse_linalg.expm_multiply(generator * times[0], vec)
+        yield vec[np.newaxis, :sys_dim]
+        gaps = np.diff(times)
+        uniform = len(gaps) > 0 and np.allclose(gaps, gaps[0])
+        chunk = max(1, HIERARCHY_CHUNK // vec.size) if uniform else 1
+        chunk = min(chunk, batch_size)
+        idx = 0
+        while idx < len(gaps):
+            num = min(chunk, len(gaps) - idx)
+            if num > 1:
+                block = sparse_linalg.expm_multiply(generator, vec, start=0.,
+                                                    stop=num * gaps[0],
+                                                    num=num + 1,
+                                                    endpoint=True)[1:]
+            else:
+                block = sparse_linalg.expm_multiply(generator * gaps[idx],
+                                                    vec)[np.newaxis]
+            yield block[:, :sys_dim]
+            vec = block[-1]
+            idx += num
+
+    for states in _rebatch(blocks(), batch_size):
+        states = np.moveaxis(states, 2, 0).reshape((len(batch), len(states),
+                                                     dims, dims))
+        yield states if dens_mat.ndim == 3 else states[0]
+
+def propagate_hierarchy(generator, dens_mat: np.ndarray,
+                        times: np.ndarray) -> np.ndarray:
+
+    """
+    Propagates a hierarchy from an initial system density matrix,
+    with all other ADOs initially zero, returning the system
+    density matrix at each of a set of times. See
+    stream_hierarchy() for details.
+
+    Parameters
+    ----------
+    generator : scipy.sparse.spmatrix
+        The hierarchy generator, as built by hierarchy_generator(),
+        in units of rad ps^-1.
+    dens_mat : np.ndarray
+        The N x N system density matrix at time t=0, or a
+        (B x N x N) stack of them.
+    times : np.ndarray
+        1D array of the T times at which to evaluate the system
+        density matrix, in ps. Must be non-negative and in
+        ascending order.
+
+    Returns
+    -------
+    np.ndarray
+        A (T x N x N) array of the system density matrix at each
+        time, or a (B x T x N x N) array if a stack of initial
+        density matrices was passed.
+    """
+
+    return next(stream_hierarchy(generator, dens_mat, times))
+
+def stream_hierarchy_filtered(generator, ados: np.ndarray,
+                              dens_mat: np.ndarray, times: np.ndarray,
+                              tolerance: float, batch_size: int = None):
+
+    """
+    Propagates a hierarchy from an initial system density matrix,
+    as for stream_hierarchy(), but with adaptive filtering of the
+    ADOs (see Q. Shi, L. Chen, G. Nan, R.-X. Xu and Y. Yan, J. Chem.
+    Phys., 2009, 130, 084105). After each timestep, any ADO none of
+    whose elements exceeds the tolerance in magnitude is set to
+    zero, and over the next timestep only the remaining (active)
+    ADOs and their neighbours are propagated, using the generator
+    restricted to them. Filtered ADOs are readmitted as soon as they
+    grow above the tolerance again through their coupling to the
+    active ADOs. Most of a deep hierarchy typically stays negligible,
+    so far fewer ADOs are propagated than in the full hierarchy.
+
+    Parameters
+    ----------
+    generator : scipy.sparse.spmatrix
+        The hierarchy generator, as built by hierarchy_generator(),
+        in units of rad ps^-1.
+    ados : np.ndarray
+        The ADOs of the hierarchy, as returned by ado_indices(), in
+        the order used to build the generator.
+    dens_mat : np.ndarray
+        The N x N system density matrix at time t=0.
+    times : np.ndarray
+        1D array of the T times at which to evaluate the system
+        density matrix, in ps. Must be non-negative and in
+        ascending order.
+    tolerance : float
+        The magnitude below which all elements of an ADO must be
+        for it to be filtered out. Must be a non-negative float.
+    batch_size : int
+        The number of consecutive times in each batch yielded. If
+        None (default), all T times are yielded in one batch.
+
+    Yields
+    ------
+    np.ndarray
+        A (T_b x N x N) array of the system density matrix at each
+        of the next T_b times.
+    """
+
+    times = np.asarray(times, dtype=float)
+    assert times.ndim == 1 and len(times) > 0, (
+        'times must be passed as a non-empty 1D array.')
+    assert np.all(times >= 0.), 'times must be non-negative.'
+    assert np.all(np.diff(times) >= 0.), 'times must be in ascending order.'
+    assert tolerance >= 0., 'tolerance must be a non-negative float.'
+    batch_size = len(times) if batch_size is None else batch_size
+    assert batch_size > 0, 'batch_size must be a positive int.'
+    dims = dens_mat.shape[0]
+    sys_dim = dims ** 2
+    assert generator.shape[0] == len(ados) * sys_dim, (
+        'Generator dimensions must match the number of ADOs and the'
+        ' density matrix dims.')
+
+    def blocks():
+        adjacency = ado_adjacency(ados)
+        hierarchy = np.zeros((len(ados), sys_dim), dtype=complex)
+        hierarchy[0] = dens_mat.reshape(sys_dim)
+        active = np.zeros(len(ados), dtype=bool)
+        active[0] = True
+        propagated, restricted = None, None
+        previous = 0.
+        for time in times:
+            core = active
+            while time > previous:
+                # Propagate the core ADOs and their neighbours, restricting
+                # the generator to them.
+                reach = core | (adjacency.dot(core.astype(float)) > 0)
+                if propagated is None or np.any(reach != propagated):
+                    propagated = reach
+                    rows = (np.flatnonzero(propagated)[:, np.newaxis]
+                            * sys_dim + np.arange(sys_dim)).ravel()
+                    restricted = generator[rows][:, rows]
+                vec = sparse_linalg.expm_multiply(
+                    restricted * (time - previous),
+                    hierarchy[propagated].ravel())
+                vec = vec.reshape((-1, sys_dim))
+                # If any outermost ADO grew above the tolerance, its own
+                # neighbours should also have been propagated, so repeat
+                # the step including them.
+                grown = np.zeros(len(ados), dtype=bool)
+                grown[propagated] = np.abs(vec).max(axis=1) >= tolerance
+                grown &= ~core
+                if np.any(grown) and not np.all(reach):
+                    core = core | grown
+                    continue
+                hierarchy[propagated] = vec
+                active = np.abs(hierarchy).max(axis=1) >= tolerance
+                active[0] = True
+                hierarchy[~active] = 0.
+                previous = time
+            yield hierarchy[np.newaxis, 0].copy()
+
+    for states in _rebatch(blocks(), batch_size):
+        yield states.reshape((len(states), dims, dims))
+
+def propagate_hierarchy_filtered(generator, ados: np.ndarray,
+                                 dens_mat: np.ndarray, times: np.ndarray,
+                                 tolerance: float) -> np.ndarray:
+
+    """
+    Propagates a hierarchy from an initial system density matrix
+    with adaptive filtering of the ADOs, returning the system
+    density matrix at each of a set of times. See
+    stream_hierarchy_filtered() for details.
+
+    Parameters
+    ----------
+    generator : scipy.sparse.spmatrix
+        The hierarchy generator, as built by hierarchy_generator(),
+        in units of rad ps^-1.
+    ados : np.ndarray
+        The ADOs of the hierarchy, as returned by ado_indices(), in
+        the order used to build the generator.
+    dens_mat : np.ndarray
+        The N x N system density matrix at time t=0.
+    times : np.ndarray
+        1D array of the T times at which to evaluate the system
+        density matrix, in ps. Must be non-negative and in
+        ascending order.
+    tolerance : float
+        The magnitude below which all elements of an ADO must be
+        for it to be filtered out. Must be a non-negative float.
+
+    Returns
+    -------
+    np.ndarray
+        A (T x N x N) array of the system density matrix at each
+        time.
+    """
+
+    return next(stream_hierarchy_filtered(generator, ados, dens_mat, times,
+                                          tolerance))
+
+def hierarchy_steady_state(generator, dims: int, method: str = 'direct',
+                           tolerance: float = 1e-10) -> np.ndarray:
+
+    """
+    Finds the steady state of a hierarchy directly, as the null
+    space of its generator, rather than by propagating it to long
+    times. The generator conserves the trace of the system density
+    matrix, so the rows giving the rate of change of its diagonal
+    elements are linearly dependent; the first is replaced by the
+    trace condition
+
+    .. math::
+        tr(\\rho^{(0)}) = 1
+
+    and the resulting non-singular sparse linear system solved for
+    the steady state of all ADOs, from which that of the system is
+    returned.
+
+    Parameters
+    ----------
+    generator : scipy.sparse.spmatrix
+        The hierarchy generator, as built by hierarchy_generator(),
+        in units of rad ps^-1.
+    dims : int
+        The dimension N of the system density matrix.
+    method : str
+        The linear solver to use; 'direct' (default) for a sparse
+        LU factorisation, or 'iterative' for GMRES preconditioned
+        with an incomplete LU factorisation, which needs less
+        memory for large hierarchies.
+    tolerance : float
+        The relative residual at which the 'iterative' solver is
+        considered converged. Default is 1e-10.
+
+    Returns
+    -------
+    np.ndarray
+        The N x N steady state density matrix of the system.
+
+    Raises
+    ------
+    ValueError
+        If the 'iterative' solver doesn't converge.
+    """
+
+    assert method in STEADY_STATE_METHODS, (
+        'Must choose a method from ' + str(STEADY_STATE_METHODS))
+    size = generator.shape[0]
+    assert size % dims ** 2 == 0, (
+        'Generator dimensions must be a multiple of the square of dims.')
+    # Replace the first row with the trace of the system density matrix
+    diagonals = np.arange(dims) * (dims + 1)
+    rows = sparse.diags(np.concatenate([[0.], np.ones(size - 1)]))
+    trace = sparse.csr_matrix((np.ones(dims), (np.zeros(dims), diagonals)),
+                              shape=(size, size))
+    matrix = (rows.dot(generator) + trace).tocsc()
+    rhs = np.zeros(size, dtype=complex)
+    rhs[0] = 1.
+    if method == 'direct':
+        vec = sparse_linalg.spsolve(matrix, rhs)
+    else:
+        # A symmetric ordering keeps the diagonal pivots, without which
+        # the incomplete factors of Lindblad Liouvillians can be singular
+        ilu = sparse_linalg.spilu(matrix, permc_spec='MMD_AT_PLUS_A')
+        precond = sparse_linalg.LinearOperator(matrix.shape, ilu.solve,
+                                               dtype=complex)
+        vec, info = sparse_linalg.gmres(matrix, rhs, M=precond, atol=0.,
+                                        **{_GMRES_RTOL: tolerance})
+        if info != 0:
+            raise ValueError('Iterative steady state solver did not converge;'
+                             ' use the direct method instead.')
+    dens_mat = vec[:dims ** 2].reshape(dims, dims)
+    dens_mat = 0.5 * (dens_mat + dens_mat.conjugate().T)
+    return dens_mat / np.trace(dens_mat)
+
+def converge_hierarchy(hamiltonian: np.ndarray, coupling_ops: np.ndarray,
+                       dens_mat: np.ndarray, times: np.ndarray,
+                       cutoff_freq: float, reorg_energy: float,
+                       temperature: float, tolerance: float = 1e-3,
+                       bath_expansion: str = 'matsubara',
+                       max_depth: int = 20, max_terms: int = 10) -> tuple:
+
+    """
+    Finds the cheapest hierarchy depth (bath_cutoff) and number of
+    exponential terms (matsubara_terms) for which the HEOM dynamics
+    are converged, by evolving the system over a short time window
+    for increasing depths and numbers of terms. Starting from a
+    depth of 1 and a single term, the depth is increased until the
+    dynamics agree with those one level deeper, and the number of
+    terms until the dynamics agree with those with one more term,
+    repeating until both hold at once. Agreement is measured by the
+    maximum trace distance between the density matrices over the
+    window.
+
+    Work is reused between levels; the ADOs of a shallower
+    hierarchy are the first ADOs of a deeper one, so for each
+    number of terms only the generator of the deepest level
+    evaluated so far is kept, and sliced for shallower levels, and
+    each (depth, terms) pair is evolved only once. As the deeper of
+    two levels is evaluated first, the generator is rebuilt each
+    time the depth increases, rather than built ahead at a depth
+    that may never be needed. For K modes, the hierarchy of depth
+    d + 1 has (K + d + 1) / (d + 1) times as many ADOs as that of
+    depth d, so when there are many modes, and the generators are
+    large, the rebuilds cost little more than building the deepest
+    generator alone.
+
+    Parameters
+    ----------
+    hamiltonian : np.ndarray
+        The N x N system Hamiltonian, in units of rad ps^-1.
+    coupling_ops : np.ndarray
+        The coupling operators of the system to each bath, as a
+        (B x N x N) array.
+    dens_mat : np.ndarray
+        The N x N system density matrix at time t=0.
+    times : np.ndarray
+        1D array of the times over which to compare the dynamics,
+        in ps.
+    cutoff_freq : float
+        The cutoff frequency of the Debye spectral density, in
+        units of rad ps^-1.
+    reorg_energy : float
+        The reorganisation energy of the Debye spectral density, in
+        units of rad ps^-1.
+    temperature : float
+        The temperature of the baths, in units of Kelvin.
+    tolerance : float
+        The maximum trace distance between the dynamics of
+        successive levels for them to be considered converged.
+        Default is 1e-3.
+    bath_expansion : str
+        The expansion of the correlation function into exponential
+        terms; either 'matsubara' (default) or 'pade'.
+    max_depth : int
+        The maximum hierarchy depth to try. Default is 20.
+    max_terms : int
+        The maximum number of exponential terms to try. Default is
+        10.
+
+    Returns
+    -------
+    tuple of int
+        The converged hierarchy depth and number of exponential
+        terms.
+
+    Raises
+    ------
+    ValueError
+        If the dynamics aren't converged within max_depth and
+        max_terms.
+    """
+
+    assert bath_expansion in bath.BATH_EXPANSIONS, (
+        'Must choose a bath_expansion from ' + str(bath.BATH_EXPANSIONS))
+    assert tolerance > 0., 'tolerance must be a positive float.'
+    dims = dens_mat.shape[0]
+    coupling_ops = np.asarray(coupling_ops).reshape(-1, dims, dims)
+    if bath_expansion == 'pade':
+        decomposition = bath.pade_decomposition
+    else:
+        decomposition = bath.matsubara_decomposition
+    generators, results = {}, {}
+
+    def evolve(depth, terms):
+        if (depth, terms) not in results:
+            built = generators.get(terms)
+            if built is None or built[0] < depth:
+                coeffs, freqs = decomposition(cutoff_freq, reorg_energy,
+                                              temperature, terms)
+                terminator = bath.terminator_factor(cutoff_freq, reorg_energy,
+                                                    temperature, coeffs, freqs)
+                built = (depth, hierarchy_generator(hamiltonian, coupling_ops,
+                                                    coeffs, freqs, depth,
+                                                    terminator))
+                generators[terms] = built
+            size = comb(len(coupling_ops) * terms + depth, depth,
+                        exact=True) * dims ** 2
+            matrices = propagate_hierarchy(built[1][:size, :size], dens_mat,
+                                           times)
+            traces = np.trace(matrices, axis1=1, axis2=2)
+            results[(depth, terms)] = matrices / traces[:, np.newaxis,
+                                                        np.newaxis]
+        return results[(depth, terms)]
+
+    def distance(finer, coarser):
+        # Evaluate the finer level first, so the coarser can reuse its
+        # generator.
+        finer = evolve(*finer)
+        return np.max(util.batch_trace_distance(finer, evolve(*coarser)))
+
+    depth, terms = 1, 1
+    while True:
+        if depth >= max_depth or terms >= max_terms:
+            raise ValueError('HEOM dynamics not converged within a depth of '
+                             + str(max_depth) + ' and ' + str(max_terms)
+                             + ' terms. Increase max_depth or max_terms, or'
+                             ' the tolerance.')
+        if distance((depth + 1, terms), (depth, terms)) > tolerance:
+            depth += 1
+        elif distance((depth, terms + 1), (depth, terms)) > tolerance:
+            terms += 1
+        else:
+            return depth, terms
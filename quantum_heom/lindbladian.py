@@ -1,7 +1,11 @@
 """Contains functions to build Lindbladian dephasing and
 thermalising (super)operators."""
 
+from functools import partial
 from itertools import permutations, product
+
+from scipy import linalg, sparse
+from scipy.sparse import linalg as sparse_linalg
 import numpy as np
 
 from quantum_heom import bath
@@ -10,6 +14,7 @@ from quantum_heom import utilities as util
 LINDBLAD_MODELS = ['local dephasing lindblad',
                    'global thermalising lindblad',
                    'local thermalising lindblad']
+LIOUVILLIAN_FORMATS = ['dense', 'sparse', 'matrix-free']
 
 
 def loc_deph_lindblad_op(dims: int, site_j: int) -> np.ndarray:
@@ -174,11 +179,193 @@ def lindblad_superop_sum_element(l_op: np.ndarray) -> np.ndarray:
             - 0.5 * (np.kron(np.matmul(l_op_dag, l_op).conjugate(), iden)
                      + np.kron(iden, np.matmul(l_op_dag, l_op))))
 
+def glob_therm_rates(hamiltonian: np.ndarray, deph_rate: float,
+                     cutoff_freq: float, reorg_energy: float,
+                     temperature: float, spectral_density: str,
+                     exponent: float = 1) -> np.ndarray:
+
+    """
+    Builds the matrix of Redfield rate constants for the transfer
+    of population between each pair of different eigenstates of
+    the system Hamiltonian, as used in the global thermalising
+    Lindblad model. Element (a, b) gives the rate k_{a -> b} of
+    transfer from eigenstate a to eigenstate b, with eigenstates
+    ordered as returned by scipy.linalg.eigh() (i.e. in ascending
+    order of energy), and the diagonal elements are zero.
+
+    Parameters
+    ----------
+    hamiltonian : np.ndarray
+        The system Hamiltonian, with dimensions (N x N), in units
+        of rad ps^-1.
+    deph_rate, cutoff_freq, reorg_energy, temperature,
+    spectral_density, exponent
+        As for lindbladian_superop().
+
+    Returns
+    -------
+    np.ndarray
+        The (N x N) matrix of rate constants, in rad ps^-1.
+    """
+
+    eigv = linalg.eigh(hamiltonian, eigvals_only=True)
+    dims = len(eigv)
+    rates = np.zeros((dims, dims), dtype=complex)
+    for state_a, state_b in permutations(range(dims), 2):
+        rates[state_a, state_b] = bath.rate_constant_redfield(
+            (eigv[state_a] - eigv[state_b]), deph_rate, cutoff_freq,
+            reorg_energy, temperature, spectral_density, exponent)
+    return rates
+
+def lindblad_operators(dims: int, dynamics_model: str,
+                       hamiltonian: np.ndarray = None, deph_rate: float = None,
+                       cutoff_freq: float = None, reorg_energy: float = None,
+                       temperature: float = None, spectral_density: str = None,
+                       exponent: float = 1) -> list:
+
+    """
+    Builds the list of Lindblad (jump) operators A and their
+    associated rates k for the Lindblad model passed, all in the
+    site basis, such that the Lindbladian is given by:
+
+    .. math::
+        L = \\sum_{\\alpha} k_{\\alpha} (A_{\\alpha}^* \\otimes A_{\\alpha}
+            - 0.5 ((A_{\\alpha}^{\\dagger} A_{\\alpha})^* \\otimes I
+                   + I \\otimes A_{\\alpha}^{\\dagger} A_{\\alpha}))
+
+    For the global thermalising model, the operators |b><a| that
+    transfer population between eigenstates a and b are built in
+    the orthonormal eigenbasis given by scipy.linalg.eigh(), and
+    transformed to the site basis. For a degenerate Hamiltonian
+    (i.e. the nearest neighbour cyclic model) this basis is well
+    defined within each degenerate subspace, so the Lindbladian
+    preserves the trace and relaxes to the Gibbs state. Earlier
+    versions transformed each superoperator to the site basis in
+    Liouville space with the eigenstates of utilities.eigs(), which
+    needn't be orthonormal for a degenerate Hamiltonian, and so gave
+    a Lindbladian that did neither.
+
+    Parameters are as for lindbladian_superop().
+
+    Returns
+    -------
+    list of tuple
+        Each element is a tuple of the form (rate, l_op), where
+        rate is the rate constant in rad ps^-1 and l_op the N x N
+        Lindblad operator in the site basis.
+    """
+
+    if dynamics_model == 'local dephasing lindblad':
+        assert deph_rate is not None, 'Need to pass a dephasing rate'
+        # Linblad operator evaluated for each site, in the site basis.
+        return [(deph_rate, loc_deph_lindblad_op(dims, site_j))
+                for site_j in range(dims)]
+
+    # Check inputs for thermalising models
+    for var in [hamiltonian, cutoff_freq, reorg_energy, temperature,
+                spectral_density]:
+        assert var is not None, (
+            'Need to pass a hamiltonian, cutoff frequency, scaling factor,'
+            ' temperature, and spectral density for thermalising models.')
+    if spectral_density == 'ohmic':
+        assert exponent is not None, 'Need to pass the Ohmic exponent.'
+
+    l_ops = []
+
+    if dynamics_model == 'global thermalising lindblad':
+        # Lindblad operator constructed for each pair of different
+        # eigenstates, in the orthonormal eigenbasis, then transformed
+        # to the site basis.
+        eigs = linalg.eigh(hamiltonian)[1]
+        rates = glob_therm_rates(hamiltonian, deph_rate, cutoff_freq,
+                                 reorg_energy, temperature, spectral_density,
+                                 exponent)
+        for state_a, state_b in permutations(range(dims), 2):
+            k_a_to_b = rates[state_a, state_b]
+            if k_a_to_b == 0.:  # deal with degenerate states
+                continue
+            l_op = glob_therm_lindblad_op(dims, state_a, state_b)
+            l_ops.append((k_a_to_b, util.basis_change(l_op, eigs, False)))
+        return l_ops
+
+    if dynamics_model == 'local thermalising lindblad':
+        # Lindblad operator evaluated for each pair (x, y), where x
+        # is a unique frequency gap between eigenstates of the Hamiltonian
+        # and y is a site in the quantum system.
+        eigv, eigs = util.eigv(hamiltonian), util.eigs(hamiltonian)
+        gaps = eigv.reshape(dims, 1) - eigv
+        unique = np.unique(gaps.flatten())  # NEED DECIMAL ROUNDING HERE?
+        for unique, site_m in product(unique, range(dims)):
+            k_omega = bath.rate_constant_redfield(unique,
+                                                  deph_rate,
+                                                  cutoff_freq,
+                                                  reorg_energy,
+                                                  temperature,
+                                                  spectral_density,
+                                                  exponent)
+            l_op = loc_therm_lindblad_op(eigv, eigs, unique, site_m)
+            l_ops.append((k_omega, l_op))
+        return l_ops
+
+    raise NotImplementedError('Other lindblad dynamics models not yet'
+                              ' implemented in quantum_HEOM. Choose from: '
+                              + str(LINDBLAD_MODELS))
+
+def lindbladian_from_operators(l_ops: list, dims: int,
+                               sparse_format: bool = False):
+
+    """
+    Builds the (dims^2) x (dims^2) Lindbladian superoperator from a
+    list of Lindblad operators and their rates, as returned by
+    lindblad_operators(). The jump terms are summed individually
+    while the anti-commutator terms are aggregated into a single
+    effective operator K = sum_k k A^dagger A before taking the
+    Kronecker products, so only 2 are evaluated for it.
+
+    Parameters
+    ----------
+    l_ops : list of tuple
+        The (rate, l_op) pairs, with l_op of dimensions dims x dims.
+    dims : int
+        The dimension (i.e. number of sites) of the open quantum
+        system.
+    sparse_format : bool
+        If True, builds the superoperator as a scipy.sparse CSR
+        matrix. Default is False, building a dense np.ndarray.
+
+    Returns
+    -------
+    np.ndarray or scipy.sparse.csr_matrix
+        The (N^2 x N^2) Lindbladian superoperator.
+    """
+
+    if sparse_format:
+        kron = partial(sparse.kron, format='csr')
+        iden = sparse.identity(dims, dtype=complex, format='csr')
+        lindbladian = sparse.csr_matrix((dims ** 2, dims ** 2), dtype=complex)
+        aggregate = sparse.csr_matrix((dims, dims), dtype=complex)
+    else:
+        kron = np.kron
+        iden = np.eye(dims)
+        lindbladian = np.zeros((dims ** 2, dims ** 2), dtype=complex)
+        aggregate = np.zeros((dims, dims), dtype=complex)
+    for rate, l_op in l_ops:
+        if sparse_format:
+            l_op = sparse.csr_matrix(l_op)
+        lindbladian = lindbladian + rate * kron(l_op.conjugate(), l_op)
+        aggregate = aggregate + rate * (l_op.conjugate().T @ l_op)
+    lindbladian = lindbladian - 0.5 * (kron(aggregate.conjugate(), iden)
+                                       + kron(iden, aggregate))
+    if sparse_format:
+        lindbladian = lindbladian.tocsr()
+        lindbladian.eliminate_zeros()
+    return lindbladian  # rad ps^-1
+
 def lindbladian_superop(dims: int, dynamics_model: str,
                         hamiltonian: np.ndarray = None, deph_rate: float = None,
                         cutoff_freq: float = None, reorg_energy: float = None,
                         temperature: float = None, spectral_density: str = None,
-                        exponent: float = 1) -> np.ndarray:
+                        exponent: float = 1, sparse_format: bool = False):
 
     """
     Builds an (dims^2) x (dims^2) Lindbladian superoperator matrix
@@ -215,77 +402,196 @@ def lindbladian_superop(dims: int, dynamics_model: str,
     temperature : float
         The temperature of the system governed by Lindblad dynamics
         in units of Kelvin.
+    sparse_format : bool
+        If True, builds the Lindbladian as a scipy.sparse CSR
+        matrix, which for local dephasing stores only O(N^2)
+        elements. Default is False.
 
     Returns
     -------
     lindbladian : 2D np.ndarray of complex
         The (N^2 x N^2) lindbladian matrix that will dephase the
         off-diagonals of a vectorised N x N density matrix, in
-        units of rad ps^-1.
+        units of rad ps^-1. A scipy.sparse.csr_matrix if
+        sparse_format is True.
     """
 
-    lindbladian = np.zeros((dims ** 2, dims ** 2), dtype=complex)
-
     if dynamics_model == 'local dephasing lindblad':
         assert deph_rate is not None, 'Need to pass a dephasing rate'
-        # Linblad operator evaluated for each site, in the site basis.
-        for site_j in range(dims):
-            l_op = loc_deph_lindblad_op(dims, site_j)
-            indiv_superop = lindblad_superop_sum_element(l_op)
-            lindbladian += indiv_superop
-        return deph_rate * lindbladian  # rad ps^-1
+        return loc_deph_lindbladian(dims, deph_rate, sparse_format)
+    l_ops = lindblad_operators(dims, dynamics_model, hamiltonian, deph_rate,
+                               cutoff_freq, reorg_energy, temperature,
+                               spectral_density, exponent)
+    return lindbladian_from_operators(l_ops, dims, sparse_format)
 
-    # Check inputs for thermalising models
-    for var in [hamiltonian, cutoff_freq, reorg_energy, temperature,
-                spectral_density]:
-        assert var is not None, (
-            'Need to pass a hamiltonian, cutoff frequency, scaling factor,'
-            ' temperature, and spectral density for thermalising models.')
-    if spectral_density == 'ohmic':
-        assert exponent is not None, 'Need to pass the Ohmic exponent.'
+def loc_deph_lindbladian(dims: int, deph_rate: float,
+                         sparse_format: bool = False):
 
-    eigv, eigs = util.eigv(hamiltonian), util.eigs(hamiltonian)
+    """
+    Builds the (dims^2) x (dims^2) Lindbladian superoperator for
+    the local dephasing model directly. Summed over sites, the
+    dephasing Lindblad operators |j><j| just damp every coherence
+    at the dephasing rate and leave the populations unchanged:
 
-    if dynamics_model == 'global thermalising lindblad':
-        # Lindblad operator constructed for each pair of different
-        # eigenstates, in the eigenbasis.
-        for state_a, state_b in permutations(range(dims), 2):
-            omega_a, omega_b = eigv[state_a], eigv[state_b]
-            k_a_to_b = bath.rate_constant_redfield((omega_a - omega_b),
-                                                   deph_rate,
-                                                   cutoff_freq,
-                                                   reorg_energy,
-                                                   temperature,
-                                                   spectral_density,
-                                                   exponent)
-            if k_a_to_b == 0.:  # deal with degenerate states
-                continue
-            l_op = glob_therm_lindblad_op(dims, state_a, state_b)
-            indiv_superop = lindblad_superop_sum_element(l_op)
-            indiv_superop = util.basis_change(indiv_superop, eigs, True)
-            indiv_superop *= k_a_to_b
-            lindbladian += indiv_superop
-        return lindbladian  # rad ps^-1
+    .. math::
+        L[\\rho]_{ij} = - \\Gamma (1 - \\delta_{ij}) \\rho_{ij}
 
-    if dynamics_model == 'local thermalising lindblad':
-        # Lindblad operator evaluated for each pair (x, y), where x
-        # is a unique frequency gap between eigenstates of the Hamiltonian
-        # and y is a site in the quantum system.
-        gaps = eigv.reshape(dims, 1) - eigv
-        unique = np.unique(gaps.flatten())  # NEED DECIMAL ROUNDING HERE?
-        for unique, site_m in product(unique, range(dims)):
-            k_omega = bath.rate_constant_redfield(unique,
-                                                  deph_rate,
-                                                  cutoff_freq,
-                                                  reorg_energy,
-                                                  temperature,
-                                                  spectral_density,
-                                                  exponent)
-            l_op = loc_therm_lindblad_op(eigv, eigs, unique, site_m)
-            indiv_superop = lindblad_superop_sum_element(l_op)
-            lindbladian += k_omega * indiv_superop
-        return lindbladian  # rad ps^-1
+    so the superoperator is diagonal and is built without the
+    Kronecker products of lindbladian_from_operators(), giving the
+    same matrix.
 
-    raise NotImplementedError('Other lindblad dynamics models not yet'
-                              ' implemented in quantum_HEOM. Choose from: '
-                              + str(LINDBLAD_MODELS))
+    Parameters
+    ----------
+    dims : int
+        The dimension (i.e. number of sites) of the open quantum
+        system.
+    deph_rate : float
+        The dephasing rate constant of the system, in rad ps^-1.
+    sparse_format : bool
+        If True, builds the Lindbladian as a scipy.sparse CSR
+        matrix. Default is False.
+
+    Returns
+    -------
+    np.ndarray or scipy.sparse.csr_matrix
+        The (N^2 x N^2) diagonal Lindbladian superoperator, in
+        rad ps^-1.
+    """
+
+    diagonal = -deph_rate * (1. - np.eye(dims, dtype=complex)).flatten('C')
+    if sparse_format:
+        lindbladian = sparse.diags(diagonal, format='csr', dtype=complex)
+        lindbladian.eliminate_zeros()
+        return lindbladian
+    return np.diag(diagonal)
+
+def liouvillian_operator(hamiltonian: np.ndarray,
+                         l_ops: list) -> sparse_linalg.LinearOperator:
+
+    """
+    Builds a matrix-free representation of the Liouvillian from the
+    system Hamiltonian and a list of Lindblad operators and their
+    rates, as returned by lindblad_operators(). The action on a
+    vectorised density matrix is evaluated directly on N x N
+    matrices, so the (N^2 x N^2) superoperator is never formed.
+    This costs O(N^2 * #ops) memory and O(N^3 * #ops) time per
+    application. The action mirrors the Kronecker product
+    convention of hamiltonian_superop() and
+    lindbladian_from_operators() for row-major vectorisation (in
+    which kron(X, Y) vec(rho) = vec(X rho Y^T)), and so is given by:
+
+    .. math::
+        L[\\rho] = -i(H \\rho - \\rho H^*)
+                  + \\sum_{\\alpha} k_{\\alpha} A_{\\alpha}^* \\rho A_{\\alpha}^T
+                  - 0.5 (K^* \\rho + \\rho K^T)
+
+    where K = sum_k k A^dagger A. For Hermitian density matrices
+    this is the usual Lindblad master equation acting on rho^*.
+
+    Parameters
+    ----------
+    hamiltonian : np.ndarray
+        The N x N system Hamiltonian, in rad ps^-1. If None, only
+        the dissipator is included.
+    l_ops : list of tuple
+        The (rate, l_op) pairs for the Lindblad model, with rates
+        in rad ps^-1.
+
+    Returns
+    -------
+    scipy.sparse.linalg.LinearOperator
+        The (N^2 x N^2) Liouvillian, acting on density matrices
+        vectorised in row-major (C) order, in rad ps^-1.
+    """
+
+    if l_ops:
+        dims = l_ops[0][1].shape[0]
+        rates = np.array([rate for rate, _ in l_ops], dtype=complex)
+        ops = np.array([l_op for _, l_op in l_ops], dtype=complex)
+        aggregate = np.einsum('k,kji,kjl->il', rates, ops.conjugate(), ops)
+        ops_conj, ops_trans = ops.conjugate(), np.swapaxes(ops, 1, 2)
+    else:
+        dims = hamiltonian.shape[0]
+        aggregate = np.zeros((dims, dims), dtype=complex)
+    # Effective non-Hermitian generator, combining the Hamiltonian and
+    # anti-commutator terms: -i(H rho - rho H^*) - 0.5(K^* rho + rho K^T)
+    left = - 0.5 * aggregate.conjugate()
+    right = - 0.5 * aggregate.T
+    if hamiltonian is not None:
+        assert hamiltonian.shape == (dims, dims), (
+            'Hamiltonian must have the same dimensions as the Lindblad'
+            ' operators.')
+        left = left - 1.0j * hamiltonian
+        right = right + 1.0j * hamiltonian.conjugate()
+
+    def matvec(vec):
+        rho = np.reshape(vec, (dims, dims), order='C')
+        result = np.matmul(left, rho) + np.matmul(rho, right)
+        if l_ops:
+            jumps = np.matmul(np.matmul(ops_conj, rho), ops_trans)
+            result = result + np.tensordot(rates, jumps, axes=1)
+        return result.reshape(dims ** 2, order='C')
+
+    return sparse_linalg.LinearOperator((dims ** 2, dims ** 2), matvec=matvec,
+                                        dtype=complex)
+
+def loc_deph_liouvillian_operator(hamiltonian: np.ndarray,
+                                  deph_rate: float
+                                 ) -> sparse_linalg.LinearOperator:
+
+    """
+    Builds a matrix-free representation of the Liouvillian of the
+    local dephasing model, as liouvillian_operator() does for any
+    Lindblad model, but specialised to its structure; the
+    dissipator just damps the coherences elementwise (see
+    loc_deph_lindbladian()), so the action on a vectorised density
+    matrix is given by the Hamiltonian commutator and a mask:
+
+    .. math::
+        L[\\rho] = -i(H \\rho - \\rho H^*)
+                  - \\Gamma (1 - I) \\circ \\rho
+
+    This costs O(N^2) memory and O(N^3) time per application,
+    rather than the O(N^4) of summing over the N Lindblad
+    operators, so combined with the 'krylov' or 'ode' propagation
+    methods can evolve systems of hundreds of sites. Hamiltonians
+    with few non-zero elements (i.e. nearest neighbour
+    interactions) are applied as sparse matrices, reducing the
+    cost to O(N^2) per non-zero element in each row.
+
+    Parameters
+    ----------
+    hamiltonian : np.ndarray
+        The N x N system Hamiltonian, in rad ps^-1.
+    deph_rate : float
+        The dephasing rate constant of the system, in rad ps^-1.
+
+    Returns
+    -------
+    scipy.sparse.linalg.LinearOperator
+        The (N^2 x N^2) Liouvillian, acting on density matrices
+        vectorised in row-major (C) order, in rad ps^-1.
+    """
+
+    dims = hamiltonian.shape[0]
+    assert hamiltonian.shape == (dims, dims), 'Hamiltonian must be square.'
+    left = -1.0j * hamiltonian
+    right = 1.0j * hamiltonian.conjugate()
+    mask = deph_rate * (1. - np.eye(dims))
+    if np.count_nonzero(hamiltonian) <= 0.1 * dims ** 2:
+        # rho right = (right^T rho^T)^T, with right^T stored sparse
+        left, right_trans = sparse.csr_matrix(left), sparse.csr_matrix(right.T)
+
+        def commutator(rho):
+            return left.dot(rho) + right_trans.dot(rho.T).T
+    else:
+        def commutator(rho):
+            return np.matmul(left, rho) + np.matmul(rho, right)
+
+    def matvec(vec):
+        rho = np.reshape(vec, (dims, dims), order='C')
+        result = commutator(rho) - mask * rho
+        return result.reshape(dims ** 2, order='C')
+
+    return sparse_linalg.LinearOperator((dims ** 2, dims ** 2), matvec=matvec,
+                                        dtype=complex)
@@ -8,6 +8,8 @@ from scipy import integrate
 from quantum_heom import utilities as util
 from quantum_heom.lindbladian import LINDBLAD_MODELS
 
+EQUILIBRATION_MEASURES = ['distance', 'change']
+
 
 def integrate_trace_distance(systems, reference) -> list:
 
@@ -50,17 +52,11 @@ def integrate_trace_distance(systems, reference) -> list:
             ' the same number of timesteps')
 
     evo_ref = reference.time_evolution
-    times = [step[0] for step in evo_ref]
-    # comp_distances = np.empty(len(systems), dtype=np.ndarray)
-    # comp_averages = np.empty(len(systems), dtype=float)
+    times = evo_ref.times
     integ_dists = np.empty(len(systems), dtype=float)
     for sys_idx, sys in enumerate(systems):
         evo_sys = sys.time_evolution
-        distances = np.empty(len(evo_sys), dtype=float)
-        for idx, step in enumerate(evo_sys):
-            mat_sys = step[1]
-            mat_ref = evo_ref[idx][1]
-            distances[idx] = util.trace_distance(mat_sys, mat_ref)
+        distances = util.batch_trace_distance(evo_sys.rho, evo_ref.rho)
         # Integrate function times vs distances
         integ_dists[sys_idx] = integrate.trapz(distances, times)
     return integ_dists / (reference.timesteps * reference.time_interval)
@@ -69,7 +65,14 @@ def calc_equilibration_time(system) -> float:
 
     """
     Calculates the time it takes for a system to reach its
-    equilibrium state.
+    equilibrium state. For HEOM dynamics evaluated with the
+    'native' heom_solver this is the time after which the trace
+    distance to the system's steady state, solved for directly with
+    the same hierarchy, stays below the tolerance. The steady state
+    can't be found with QuTiP's solver, so for the 'qutip'
+    heom_solver it is instead the time after which the trace
+    distance to the thermal equilibrium state flattens out, as
+    before the steady state solver was added.
 
     Parameters
     ----------
@@ -84,35 +87,180 @@ def calc_equilibration_time(system) -> float:
     """
 
     evo = system.time_evolution
+    times, distances = evo.times, evo.distance
     tolerance = 0.01
     if system.dynamics_model in LINDBLAD_MODELS:
-        for step in evo:
-            if step[3] < tolerance:
-                return step[0]
+        below = np.flatnonzero(distances < tolerance)
+        if below.size:
+            return times[below[0]]
         raise ValueError("QuantumSystem hasn't equilibrated within timescale of"
                          " of evolution. Increase the number of timesteps.")
-    if system.dynamics_model == 'HEOM':
-        prev_dist = evo[0][3]
-        for idx, step in enumerate(evo):
-            if idx == 0:
-                continue
-            curr_dist = step[3]
+    if system.dynamics_model == 'HEOM' and system.heom_solver == 'qutip':
+        prev_dist = distances[0]
+        for idx in range(1, len(distances)):
+            curr_dist = distances[idx]
             difference = abs(curr_dist - prev_dist)
             if difference < tolerance:
                 try:
                     # Check to see if trace distance has flattened out
-                    five_ahead = abs(evo[idx + 5][3] - prev_dist) < tolerance
-                    ten_ahead = abs(evo[idx + 10][3] - prev_dist) < tolerance
-                    fifteen_ahead = abs(evo[idx + 15][3] - prev_dist) < tolerance
-                    fifty_ahead = abs(evo[idx + 50][3] - prev_dist) < tolerance
+                    flat = all([abs(distances[idx + ahead] - prev_dist)
+                                < tolerance for ahead in (5, 10, 15, 50)])
                 except IndexError:
                     raise ValueError("QuantumSystem hasn't equilibrated within"
                                      " timescale of of evolution. Increase the"
                                      " number of timesteps.")
-                if five_ahead and ten_ahead and fifteen_ahead and fifty_ahead:
-                    return evo[idx - 1][0]
+                if flat:
+                    return times[idx - 1]
             prev_dist = curr_dist
         raise ValueError("QuantumSystem hasn't equilibrated within timescale of"
                          " of evolution. Increase the number of timesteps.")
+    if system.dynamics_model == 'HEOM':
+        # Measure the distance to the exact steady state, found directly,
+        # and return the time after which the system remains within the
+        # tolerance of it.
+        distances = util.batch_trace_distance(evo.rho, system.steady_state)
+        above = np.flatnonzero(distances >= tolerance)
+        if not above.size:
+            return times[0]
+        if above[-1] < len(distances) - 1:
+            return times[above[-1] + 1]
+        raise ValueError("QuantumSystem hasn't equilibrated within timescale of"
+                         " of evolution. Increase the number of timesteps.")
 
     raise ValueError('Invalid dynamics model.')
+
+class EquilibrationMonitor:
+
+    """
+    Detects the equilibration of a system online, from its time
+    evolution data fed in consecutive batches as they are evaluated
+    (i.e. from QuantumSystem.stream_time_evolution()), so that the
+    propagation can be stopped as soon as it is detected. The system
+    is taken to have equilibrated once a measure of its distance from
+    equilibrium stays below the tolerance for 'window' consecutive
+    timesteps; the equilibration time is the time of the first of
+    these. The measure is either the trace distance of the density
+    matrix to a reference state (i.e. the equilibrium or steady
+    state), if one is passed, or otherwise the trace distance between
+    the density matrices at successive timesteps.
+
+    Parameters
+    ----------
+    tolerance : float
+        The value below which the measure must stay.
+    window : int
+        The number of consecutive timesteps over which the measure
+        must stay below the tolerance.
+    reference : np.ndarray
+        The N x N density matrix the system equilibrates to. If None
+        (default), the step-to-step change in the density matrix is
+        measured instead.
+    """
+
+    def __init__(self, tolerance: float, window: int,
+                 reference: np.ndarray = None):
+
+        assert tolerance > 0., 'tolerance must be a positive float.'
+        assert isinstance(window, int) and window > 0, (
+            'window must be a positive int.')
+        self._tolerance = tolerance
+        self._window = window
+        self._reference = reference
+        self._previous = None  # the last density matrix seen
+        self._count = 0  # the number of timesteps seen
+        self._run_start = None  # (index, time) of the current run below tol
+        self._end = None  # the index of the timestep completing the window
+
+    @property
+    def equilibrated(self) -> bool:
+
+        """
+        Gets whether equilibration has been detected.
+
+        Returns
+        -------
+        bool
+            True if the measure has stayed below the tolerance for
+            the whole window, False otherwise.
+        """
+
+        return self._end is not None
+
+    @property
+    def equilibration_time(self) -> float:
+
+        """
+        Gets the equilibration time, or None if equilibration hasn't
+        been detected.
+
+        Returns
+        -------
+        float
+            The time from which the measure stays below the
+            tolerance, in the units of the times fed in.
+        """
+
+        if self.equilibrated:
+            return self._run_start[1]
+        return None
+
+    @property
+    def end(self) -> int:
+
+        """
+        Gets the index of the timestep, counted from the start of
+        the time evolution, at which equilibration was detected (the
+        last timestep of the window), or None if it hasn't been.
+
+        Returns
+        -------
+        int
+            The index of the timestep completing the window.
+        """
+
+        return self._end
+
+    def update(self, evolution) -> bool:
+
+        """
+        Feeds the next batch of consecutive timesteps of the time
+        evolution to the monitor. Batches fed once equilibration has
+        been detected are ignored.
+
+        Parameters
+        ----------
+        evolution : Trajectory
+            The time evolution data for the next batch of timesteps.
+
+        Returns
+        -------
+        bool
+            True if equilibration has been detected, False otherwise.
+        """
+
+        if self.equilibrated or not len(evolution):
+            return self.equilibrated
+        rho = evolution.rho
+        if self._reference is not None:
+            measures = util.batch_trace_distance(rho, self._reference)
+        else:
+            previous = (rho[:1] if self._previous is None
+                        else self._previous[np.newaxis])
+            measures = util.batch_trace_distance(
+                rho, np.concatenate([previous, rho[:-1]]))
+            if self._previous is None:
+                # The change is undefined at the first timestep
+                measures[0] = np.inf
+        self._previous = rho[-1].copy()
+        for offset, measure in enumerate(measures):
+            index = self._count + offset
+            if measure >= self._tolerance:
+                self._run_start = None
+                continue
+            if self._run_start is None:
+                self._run_start = (index, evolution.times[offset])
+            if index - self._run_start[0] + 1 >= self._window:
+                self._end = index
+                break
+        self._count += len(evolution)
+        return self.equilibrated
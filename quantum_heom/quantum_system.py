@@ -1,19 +1,93 @@
 """Module for setting up a quantum system. Contains
 the QuantumSystem class."""
 
-from scipy import constants
+from scipy import constants, sparse
 import numpy as np
 
+from quantum_heom import cache
 from quantum_heom import evolution as evo
 from quantum_heom import hamiltonian as ham
 from quantum_heom import heom
 from quantum_heom import lindbladian as lind
+from quantum_heom import metadata as meta
 
-from quantum_heom.bath import SPECTRAL_DENSITIES
+from quantum_heom.bath import BATH_EXPANSIONS, SPECTRAL_DENSITIES
 from quantum_heom.evolution import (TEMP_DEP_MODELS,
-                                    DYNAMICS_MODELS)
+                                    DYNAMICS_MODELS,
+                                    PROPAGATION_METHODS)
 from quantum_heom.hamiltonian import INTERACTION_MODELS
-from quantum_heom.lindbladian import LINDBLAD_MODELS
+from quantum_heom.heom import HEOM_SOLVERS
+from quantum_heom.lindbladian import LINDBLAD_MODELS, LIOUVILLIAN_FORMATS
+from quantum_heom.metadata import EQUILIBRATION_MEASURES
+from quantum_heom.trajectory import Trajectory
+
+# The settings and other memoised quantities that each memoised quantity
+# of a QuantumSystem is derived from. Setting any of these invalidates the
+# quantity, and in turn everything derived from it.
+CACHE_DEPENDENCIES = {
+    'initial_density_matrix': ['sites', 'init_site_pop'],
+    'hamiltonian': ['sites', 'interaction_model', 'alpha_beta', 'epsi_delta'],
+    'hamiltonian_superop': ['hamiltonian', 'liouvillian_format'],
+    'equilibrium_state': ['dynamics_model', 'sites', 'hamiltonian',
+                          'temperature'],
+    'lindblad_operators': ['sites', 'dynamics_model', 'hamiltonian',
+                           'deph_rate', 'cutoff_freq', 'reorg_energy',
+                           'temperature', 'spectral_density',
+                           'ohmic_exponent'],
+    'lindbladian_superop': ['lindblad_operators', 'liouvillian_format'],
+    'liouvillian': ['hamiltonian', 'hamiltonian_superop',
+                    'lindbladian_superop', 'lindblad_operators',
+                    'liouvillian_format'],
+    'propagator': ['hamiltonian_superop', 'lindbladian_superop',
+                   'time_interval'],
+    'secular_propagator': ['sites', 'dynamics_model', 'hamiltonian',
+                           'deph_rate', 'cutoff_freq', 'reorg_energy',
+                           'temperature', 'spectral_density',
+                           'ohmic_exponent'],
+    'coupling_op': ['sites'],
+    'coupling_ops': ['sites', 'interaction_model'],
+    'time_evolution': ['initial_density_matrix', 'equilibrium_state',
+                       'dynamics_model', 'timesteps', 'time_interval',
+                       'propagation_method', 'liouvillian', 'propagator',
+                       'secular_propagator', 'hamiltonian', 'coupling_op',
+                       'temperature', 'reorg_energy', 'cutoff_freq',
+                       'bath_cutoff', 'matsubara_terms', 'matsubara_coeffs',
+                       'matsubara_freqs', 'heom_solver', 'coupling_ops',
+                       'bath_expansion', 'ado_tolerance'],
+    'bath_terms': ['time_evolution'],
+    'steady_state': ['dynamics_model', 'hamiltonian', 'coupling_ops',
+                     'temperature', 'reorg_energy', 'cutoff_freq',
+                     'bath_cutoff', 'matsubara_terms', 'matsubara_coeffs',
+                     'matsubara_freqs', 'bath_expansion',
+                     'hamiltonian_superop', 'lindbladian_superop'],
+}
+
+
+def dependent_quantities(name: str) -> set:
+
+    """
+    Returns the names of all the memoised quantities of a
+    QuantumSystem that depend, directly or through other memoised
+    quantities, on the setting or quantity of the name passed.
+
+    Parameters
+    ----------
+    name : str
+        The name of the setting (i.e. 'temperature') or memoised
+        quantity (i.e. 'hamiltonian').
+
+    Returns
+    -------
+    set of str
+        The names of the dependent memoised quantities.
+    """
+
+    dependents = set()
+    for quantity, dependencies in CACHE_DEPENDENCIES.items():
+        if name in dependencies:
+            dependents.add(quantity)
+            dependents |= dependent_quantities(quantity)
+    return dependents
 
 
 class QuantumSystem:
@@ -21,6 +95,14 @@ class QuantumSystem:
     """
     Class where the properties of the quantum system are defined.
 
+    Quantities derived from the settings (i.e. the Hamiltonian,
+    superoperators, equilibrium state and time evolution) are
+    memoised; each is evaluated on first access and reused until a
+    setting it depends on is changed. The np.ndarrays returned for
+    them, including the arrays of the time evolution Trajectory,
+    are the memoised arrays themselves, so are read-only; copy them
+    (i.e. with np.array(system.hamiltonian)) before modifying them.
+
     Parameters
     ----------
     sites : int (required)
@@ -61,6 +143,14 @@ class QuantumSystem:
         timesteps : int
             The number of timesteps for which the time evolution
             of the system is evaluated. Default value is 500.
+        disk_cache : bool
+            Whether to store the time evolution in, and load it
+            from, a persistent on-disk cache keyed by a hash of all
+            the other settings, so that repeated simulations of the
+            same system (i.e. when re-rendering figures) are loaded
+            rather than re-solved. The cache directory is given by
+            the QUANTUM_HEOM_CACHE_DIR environment variable. Default
+            is False.
         temperature : float
             The temperature of the thermal bath, in Kelvin. Default
             value is 300 K.
@@ -102,14 +192,67 @@ class QuantumSystem:
         bath_cutoff : int
             The number of bath terms to include in the HEOM
             evaluation of the system dynamics. Default value is 20.
+            The 'native' heom_solver raises a ValueError if the
+            hierarchy this gives has more than heom.MAX_ADOS ADOs,
+            as for 7-site FMO with the default value.
+        heom_solver : str
+            The solver used for HEOM dynamics. Must be one of
+            'qutip' (QuTiP's HSolverDL, which only supports 2-site
+            spin-boson systems) or 'native' (the sparse HEOM engine
+            in heom.py, which supports any number of sites, each
+            coupled to its own independent Debye bath). Default is
+            'qutip'.
+        bath_expansion : str
+            The expansion of the bath correlation function into
+            exponentials for HEOM dynamics. Must be one of
+            'matsubara' or 'pade'; the Pade spectrum decomposition
+            converges with far fewer terms (matsubara_terms), and
+            hence far fewer ADOs, particularly at low temperature.
+            'pade' requires the 'native' heom_solver. The
+            matsubara_coeffs and matsubara_freqs hold the terms of
+            whichever expansion is used. Default is 'matsubara'.
+        ado_tolerance : float
+            The tolerance for adaptive filtering of the auxiliary
+            density operators (ADOs) in HEOM dynamics. At each
+            timestep, ADOs whose elements are all smaller in
+            magnitude than this are dropped from the propagation,
+            and readmitted if they grow again, so that only the
+            non-negligible part of the hierarchy truncated at
+            bath_cutoff is propagated. Requires the 'native'
+            heom_solver. Default is None, i.e. no filtering.
+        propagation_method : str
+            How to propagate the density matrix for Lindblad
+            models. Must be one of 'stepping' (repeated application
+            of a one-step exponential propagator), 'spectral'
+            (diagonalisation of the Liouvillian, evaluating all
+            timesteps directly) or 'krylov' (action of the
+            exponential on the density matrix via Krylov subspace
+            methods) or 'ode' (integration of the master equation
+            with an adaptive ODE solver). Combined with the 'sparse'
+            or 'matrix-free' liouvillian_format, the latter two
+            never form a dense N^2 x N^2 matrix. For the 'global
+            thermalising lindblad' model only, may also be
+            'secular' (separate evolution of the populations and
+            coherences in the eigenbasis of the Hamiltonian; see
+            evolution.SecularPropagator), which never forms the
+            Liouvillian. Default is 'stepping'.
+        liouvillian_format : str
+            The storage format of the Hamiltonian and Lindbladian
+            superoperators for Lindblad models. Must be one of
+            'dense' (np.ndarray), 'sparse' (scipy.sparse CSR
+            matrix) or 'matrix-free' (a LinearOperator that acts
+            on the density matrix with the jump operators
+            directly). Default is 'dense'.
     """
 
     def __init__(self, sites, interaction_model, dynamics_model, **settings):
 
+        # Memoised derived quantities, invalidated by the setters
+        self._cache = {}
         # SITES SETTINGS
         self.sites = sites
         if settings.get('init_site_pop') is not None:
-            self._init_site_pop = settings.get('init_site_pop')
+            self._init_site_pop = list(settings.get('init_site_pop'))
         else:
             self._init_site_pop = [1]  # initial excitation on site 1
         # INTERACTIONS SETTINGS
@@ -134,12 +277,24 @@ class QuantumSystem:
             self.timesteps = settings.get('timesteps')
         else:
             self.timesteps = 500
+        if settings.get('disk_cache') is not None:
+            self.disk_cache = settings.get('disk_cache')
+        else:
+            self.disk_cache = False
         # SETTINGS FOR LINDBLAD MODELS
         if self.dynamics_model in LINDBLAD_MODELS:
             if settings.get('deph_rate') is not None:
                 self.deph_rate = settings.get('deph_rate')
             else:
                 self.deph_rate = 11  # rad ps^-1
+            if settings.get('propagation_method') is not None:
+                self.propagation_method = settings.get('propagation_method')
+            else:
+                self.propagation_method = 'stepping'
+            if settings.get('liouvillian_format') is not None:
+                self.liouvillian_format = settings.get('liouvillian_format')
+            else:
+                self.liouvillian_format = 'dense'
         # SETTINGS FOR TEMPERATURE DEPENDENT MODELS
         if self.dynamics_model in TEMP_DEP_MODELS:
             if settings.get('temperature') is not None:
@@ -182,10 +337,63 @@ class QuantumSystem:
                 self.bath_cutoff = settings.get('bath_cutoff')
             else:
                 self.bath_cutoff = 20
+            if settings.get('heom_solver') is not None:
+                self.heom_solver = settings.get('heom_solver')
+            else:
+                self.heom_solver = 'qutip'
+            if settings.get('bath_expansion') is not None:
+                self.bath_expansion = settings.get('bath_expansion')
+            else:
+                self.bath_expansion = 'matsubara'
+            self.ado_tolerance = settings.get('ado_tolerance')
+
+    def __getstate__(self) -> dict:
+
+        """
+        Returns the state of the system for pickling (i.e. to send
+        it to another process) or copying; its settings, without the
+        memoised quantities derived from them, which are evaluated
+        again as needed.
+        """
+
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        return state
 
     # -------------------------------------------------------------------
     # SITES + INITIAL DENSITY MATRIX FUNCTIONS
     # -------------------------------------------------------------------
+    def _cached(self, name: str, build):
+
+        """
+        Returns the memoised value of the derived quantity of the
+        name passed, first evaluating it with build() if it isn't
+        already stored. Arrays are stored read-only so that the
+        memoised value can't be modified in place by the caller.
+        """
+
+        if name not in self._cache:
+            value = build()
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            elif isinstance(value, Trajectory):
+                for array in (value.times, value.rho, value.purity,
+                              value.distance):
+                    array.flags.writeable = False
+            self._cache[name] = value
+        return self._cache[name]
+
+    def _invalidate(self, name: str):
+
+        """
+        Removes the memoised values of all the quantities that
+        depend on the setting of the name passed, as given by
+        CACHE_DEPENDENCIES.
+        """
+
+        for quantity in dependent_quantities(name):
+            self._cache.pop(quantity, None)
+
     @property
     def sites(self) -> int:
 
@@ -213,6 +421,7 @@ class QuantumSystem:
             raise ValueError('Number of sites must be a positive integer')
 
         self._sites = sites
+        self._invalidate('sites')
 
     @property
     def init_site_pop(self) -> list:
@@ -232,10 +441,11 @@ class QuantumSystem:
         -------
         list of int
             The site numbers that will be initially and equally
-            populated.
+            populated. A copy, so modifying it has no effect on the
+            system; set init_site_pop to change them.
         """
 
-        return self._init_site_pop
+        return list(self._init_site_pop)
 
     @init_site_pop.setter
     def init_site_pop(self, init_site_pop: list):
@@ -243,7 +453,10 @@ class QuantumSystem:
         for site in init_site_pop:
             if site < 1 or site > self.sites:
                 raise ValueError('Invalid site number.')
-        self._init_site_pop = init_site_pop
+        # Stored as a copy, so later changes to the list passed can't
+        # bypass the invalidation of the quantities that depend on it
+        self._init_site_pop = list(init_site_pop)
+        self._invalidate('init_site_pop')
 
     @property
     def initial_density_matrix(self) -> np.ndarray:
@@ -258,10 +471,12 @@ class QuantumSystem:
         -------
         np.ndarray
             N x N 2D array (where N is the number of sites)
-            for the initial density matrix.
+            for the initial density matrix. Read-only.
         """
 
-        return evo.initial_density_matrix(self.sites, self.init_site_pop)
+        return self._cached('initial_density_matrix',
+                            lambda: evo.initial_density_matrix(
+                                self.sites, self.init_site_pop))
 
     # -------------------------------------------------------------------
     # INTERACTIONS FUNCTIONS
@@ -298,6 +513,7 @@ class QuantumSystem:
             assert self.sites == 2, (
                 'The spin-boson model is only valid for 2-site systems.')
         self._interaction_model = model
+        self._invalidate('interaction_model')
 
     @property
     def hamiltonian(self) -> np.ndarray:
@@ -329,11 +545,13 @@ class QuantumSystem:
         np.ndarray
             An N x N 2D array that represents the interactions
             between sites in the quantum system, where N is the
-            number of sites. In units of rad ps^-1.
+            number of sites. In units of rad ps^-1. Read-only.
         """
 
-        return ham.system_hamiltonian(self.sites, self.interaction_model,
-                                      self.alpha_beta, self.epsi_delta)
+        return self._cached('hamiltonian',
+                            lambda: ham.system_hamiltonian(
+                                self.sites, self.interaction_model,
+                                self.alpha_beta, self.epsi_delta))
 
     @property
     def hamiltonian_superop(self) -> np.ndarray:
@@ -349,10 +567,15 @@ class QuantumSystem:
         -------
         np.ndarray
             The (N^2) x (N^2) 2D array representing the Hamiltonian
-            superoperator, in units of rad ps^-1.
+            superoperator, in units of rad ps^-1. Read-only. A
+            scipy.sparse CSR matrix if liouvillian_format is
+            'sparse'.
         """
 
-        return ham.hamiltonian_superop(self.hamiltonian)
+        return self._cached('hamiltonian_superop',
+                            lambda: ham.hamiltonian_superop(
+                                self.hamiltonian,
+                                self.liouvillian_format == 'sparse'))
 
     @property
     def alpha_beta(self) -> tuple:
@@ -384,6 +607,7 @@ class QuantumSystem:
                                                ' a tuple.')
         assert len(alpha_beta) == 2, 'Must pass as 2 float values in a tuple.'
         self._alpha_beta = alpha_beta
+        self._invalidate('alpha_beta')
 
     @property
     def epsi_delta(self) -> tuple:
@@ -413,6 +637,7 @@ class QuantumSystem:
         assert len(epsi_delta) == 2, 'Must pass as 2 float values in a tuple.'
         assert self.sites == 2, 'spin-boson model only valid for 2-site systems'
         self._epsi_delta = epsi_delta
+        self._invalidate('epsi_delta')
 
     # -------------------------------------------------------------------
     # DYNAMICS PROPERTIES
@@ -447,13 +672,8 @@ class QuantumSystem:
         if model not in DYNAMICS_MODELS:
             raise ValueError('Must choose an dynamics model from '
                              + str(DYNAMICS_MODELS))
-        if model == 'HEOM':
-            assert self.sites == 2, (
-                'Currently HEOM can only be run for 2-site systems.')
-            assert self.interaction_model == 'spin-boson', (
-                'Currently only a spin-boson interaction model can be used in'
-                ' in conjunction with HEOM dynamics.')
         self._dynamics_model = model
+        self._invalidate('dynamics_model')
 
     @property
     def equilibrium_state(self) -> np.ndarray:
@@ -482,11 +702,13 @@ class QuantumSystem:
         -------
         np.ndarray
             A 2D square density matrix for the system's equilibrium
-            state.
+            state. Read-only.
         """
 
-        return evo.equilibrium_state(self.dynamics_model, self.sites,
-                                     self.hamiltonian, self.temperature)
+        return self._cached('equilibrium_state',
+                            lambda: evo.equilibrium_state(
+                                self.dynamics_model, self.sites,
+                                self.hamiltonian, self.temperature))
 
     # -------------------------------------------------------------------
     # TIME-EVOLUTION FUNCTIONS
@@ -515,6 +737,7 @@ class QuantumSystem:
                                                   ' passed as a float.')
         assert time_interval > 0., 'time_interval must be positive.'
         self._time_interval = time_interval
+        self._invalidate('time_interval')
 
     @property
     def timesteps(self) -> int:
@@ -548,9 +771,31 @@ class QuantumSystem:
                 raise ValueError('Number of timesteps must be a positive'
                                  ' integer')
             self._timesteps = timesteps
+        self._invalidate('timesteps')
+
+    @property
+    def disk_cache(self) -> bool:
+
+        """
+        Gets or sets whether the time evolution of the system is
+        stored in, and loaded from, the persistent on-disk cache.
+
+        Returns
+        -------
+        bool
+            True if the on-disk cache is used, False otherwise.
+        """
+
+        return self._disk_cache
+
+    @disk_cache.setter
+    def disk_cache(self, disk_cache: bool):
+
+        assert isinstance(disk_cache, bool), 'Must pass disk_cache as a bool'
+        self._disk_cache = disk_cache
 
     @property
-    def time_evolution(self) -> np.ndarray:
+    def time_evolution(self) -> Trajectory:
 
         """
         Evaluates the density operator of the system at n_steps
@@ -564,27 +809,85 @@ class QuantumSystem:
 
         Returns
         -------
-        evolution : np.ndarray
-            An array of length corresponding to the number of
-            timesteps the evolution is evaluated for. Each element
-            is a tuple of the form (time, matrix, squared, distance),
-            where 'time' is the time at which the density matrix
-            - 'matrix' - is evaluted, 'squared' is the trace of
-            'matrix' squared, and 'distance' is the trace distance
-            of 'matrix' from the system's equilibrium state.
+        evolution : Trajectory
+            The time evolution data, of length corresponding to the
+            number of timesteps the evolution is evaluated for (plus
+            the initial state). Holds arrays of the times at which
+            the density matrix is evaluated, the density matrices,
+            the trace of each matrix squared, and the trace distance
+            of each matrix from the system's equilibrium state.
+            Indexing it gives each step in the legacy form (time,
+            matrix, squared, distance). Its arrays are read-only.
+        """
+
+        return self._cached('time_evolution', self._evaluate_time_evolution)
+
+    def _evaluate_time_evolution(self) -> Trajectory:
+
+        """
+        Evaluates the time evolution of the system, as memoised by
+        the time_evolution property. If disk_cache is True, the
+        result is loaded from the on-disk cache if it holds one for
+        the system's current settings, and otherwise is stored in it
+        once evaluated.
         """
 
+        if not self.disk_cache:
+            return self._simulate_time_evolution()
+        key = cache.settings_key(self._settings())
+        stored = cache.load(key)
+        if stored is not None:
+            evolution, extras = stored
+            if self.dynamics_model == 'HEOM':
+                self._cache['bath_terms'] = (extras.get('matsubara_coeffs'),
+                                             extras.get('matsubara_freqs'))
+            return evolution
+        evolution = self._simulate_time_evolution()
+        if self.dynamics_model == 'HEOM':
+            coeffs, freqs = self._cache['bath_terms']
+            cache.save(key, evolution, matsubara_coeffs=coeffs,
+                       matsubara_freqs=freqs)
+        else:
+            cache.save(key, evolution)
+        return evolution
+
+    def _settings(self) -> dict:
+
+        """
+        Returns all the physical and numerical settings of the
+        system, as {name: value} pairs, excluding those that have
+        no effect on its time evolution. Only values set by the
+        user are included; none are changed by evaluating the
+        system, so the settings, and hence the disk cache key,
+        are the same before and after the first evaluation.
+        """
+
+        return {name.lstrip('_'): value
+                for name, value in self.__dict__.items()
+                if name not in ('_cache', '_disk_cache')}
+
+    def _simulate_time_evolution(self) -> Trajectory:
+
+        """
+        Evaluates the time evolution of the system from scratch.
+        """
+
+        # The reference state for the trace distance, evaluated once and
+        # shared with the time evolution functions.
+        eq_state = self.equilibrium_state
         # LINDBLAD DYNAMICS
         if self.dynamics_model in LINDBLAD_MODELS:
-            superop = self.hamiltonian_superop + self.lindbladian_superop
+            method, superop, propagator = self._lindblad_propagation()
             return evo.time_evo_lindblad(self.initial_density_matrix,
                                          superop,  # rad ps^-1
                                          self.timesteps,
-                                         self.time_interval, # fs
+                                         self.time_interval,  # fs
                                          self.dynamics_model,
                                          self.hamiltonian,  # rad ps^-1
-                                         self.temperature  # Kelvin
-                                        )
+                                         self.temperature,  # Kelvin
+                                         propagator,
+                                         method,
+                                         eq_state)
 
         # HEOM DYNAMICS
         if self.dynamics_model == 'HEOM':
@@ -605,25 +908,284 @@ class QuantumSystem:
             # Perform conversions
             temperature = (self.temperature * 1e-12
                            * (constants.k / constants.hbar))  # K ---> rad ps^-1
-            tmp = evo.time_evo_heom(self.initial_density_matrix,  # dimensionless
-                                    self.timesteps,  # dimensionless
-                                    self.time_interval * 1e-3,  # fs --> ps
-                                    self.hamiltonian,  # rad ps^-1
-                                    self.coupling_op,  # dimensionless
-                                    self.reorg_energy,  # rad ps^-1
-                                    temperature,  # rad ps^-1
-                                    self.bath_cutoff,  # dimensionless
-                                    self.matsubara_terms,  # dimensionless
-                                    self.cutoff_freq,  # rad ps^-1
-                                    self.matsubara_coeffs,  # dimensionless
-                                    self.matsubara_freqs  # rad ps^-1
-                                   )
-            # Unpack the data, retrieving the evolution data, and setting
-            # the QuantumSystem's matsubara coefficients and frequencies
-            # to those returned by the function (as set by QuTiP's HEOMSolver).
-            evolution, self.matsubara_coeffs, self.matsubara_freqs = tmp
+            if self.heom_solver == 'native':
+                tmp = self._evolve_heom_native(self.initial_density_matrix)
+            else:
+                if self.bath_expansion != 'matsubara':
+                    raise NotImplementedError(
+                        'The ' + self.bath_expansion + ' bath expansion is'
+                        ' only implemented for the native heom_solver.')
+                if self.ado_tolerance is not None:
+                    raise NotImplementedError(
+                        'ADO filtering is only implemented for the native'
+                        ' heom_solver.')
+                tmp = evo.time_evo_heom(self.initial_density_matrix,  # dimensionless
+                                        self.timesteps,  # dimensionless
+                                        self.time_interval * 1e-3,  # fs --> ps
+                                        self.hamiltonian,  # rad ps^-1
+                                        self.coupling_op,  # dimensionless
+                                        self.reorg_energy,  # rad ps^-1
+                                        temperature,  # rad ps^-1
+                                        self.bath_cutoff,  # dimensionless
+                                        self.matsubara_terms,  # dimensionless
+                                        self.cutoff_freq,  # rad ps^-1
+                                        self._matsubara_coeffs,  # unitless
+                                        self._matsubara_freqs,  # rad ps^-1
+                                        eq_state
+                                       )
+            # Unpack the data, memoising the matsubara coefficients and
+            # frequencies used alongside the evolution rather than setting
+            # them on the system, where they would be taken as user-set
+            # values by later evaluations with different bath parameters.
+            evolution, coeffs, freqs = tmp
+            self._cache['bath_terms'] = (coeffs, freqs)
             return evolution
 
+    def _evolve_heom_native(self, dens_mat: np.ndarray) -> tuple:
+
+        """
+        Evaluates the HEOM time evolution of an initial density
+        matrix, or a stack of them, with the native HEOM engine,
+        returning the same 3-ple as evolution.time_evo_heom_native().
+        """
+
+        temperature = (self.temperature * 1e-12
+                       * (constants.k / constants.hbar))  # K ---> rad ps^-1
+        return evo.time_evo_heom_native(dens_mat,
+                                        self.timesteps,
+                                        self.time_interval * 1e-3,  # fs --> ps
+                                        self.hamiltonian,  # rad ps^-1
+                                        self.coupling_ops,
+                                        self.reorg_energy,  # rad ps^-1
+                                        temperature,  # rad ps^-1
+                                        self.bath_cutoff,
+                                        self.matsubara_terms,
+                                        self.cutoff_freq,  # rad ps^-1
+                                        self._matsubara_coeffs,
+                                        self._matsubara_freqs,  # rad ps^-1
+                                        self.equilibrium_state,
+                                        self.bath_expansion,
+                                        self.ado_tolerance)
+
+    def time_evolutions(self, init_site_pops: list) -> list:
+
+        """
+        Evaluates the time evolution of the system from each of a
+        set of initial site populations, i.e. [[1], [6], [1, 6]],
+        with all other settings as for time_evolution. For HEOM
+        dynamics with the 'native' heom_solver, all the initial
+        states are propagated together, sharing a single hierarchy
+        generator as a multi-column right-hand side. Otherwise they
+        are evaluated in turn, reusing the memoised Liouvillian,
+        propagator or HEOM solver. The system's own init_site_pop is
+        left unchanged.
+
+        Parameters
+        ----------
+        init_site_pops : list of list of int
+            The initial site populations to evolve from, each in the
+            form taken by init_site_pop.
+
+        Returns
+        -------
+        list of Trajectory
+            The time evolution data for each initial state.
+        """
+
+        if self.dynamics_model == 'HEOM' and self.heom_solver == 'native':
+            dens_mats = np.array([evo.initial_density_matrix(self.sites, pop)
+                                  for pop in init_site_pops])
+            return self._evolve_heom_native(dens_mats)[0]
+        original = self.init_site_pop
+        evolutions = []
+        try:
+            for init_site_pop in init_site_pops:
+                self.init_site_pop = init_site_pop
+                evolutions.append(self.time_evolution)
+        finally:
+            self.init_site_pop = original
+        return evolutions
+
+    def stream_time_evolution(self, batch_size: int = 100,
+                              timesteps: int = None):
+
+        """
+        Evaluates the time evolution of the system as for
+        time_evolution, but yields it in batches of consecutive
+        timesteps as they are evaluated, so that long runs can be
+        inspected, written to disk, plotted live or stopped early
+        (by breaking out of the loop) without holding the whole
+        trajectory in memory. Nothing is memoised. For HEOM
+        dynamics, requires the 'native' heom_solver.
+
+        Parameters
+        ----------
+        batch_size : int
+            The number of consecutive timesteps in each batch.
+            Default is 100.
+        timesteps : int
+            The number of timesteps to evolve for. If None
+            (default), the system's timesteps setting is used.
+
+        Yields
+        ------
+        Trajectory
+            The time evolution data for each batch of timesteps in
+            turn, in the same format as time_evolution.
+        """
+
+        timesteps = self.timesteps if timesteps is None else timesteps
+        eq_state = self.equilibrium_state
+        if self.dynamics_model in LINDBLAD_MODELS:
+            method, superop, propagator = self._lindblad_propagation()
+            return evo.stream_time_evo_lindblad(self.initial_density_matrix,
+                                                superop,  # rad ps^-1
+                                                timesteps,
+                                                self.time_interval,  # fs
+                                                self.dynamics_model,
+                                                self.hamiltonian,  # rad ps^-1
+                                                self.temperature,  # Kelvin
+                                                propagator,
+                                                method,
+                                                eq_state,
+                                                batch_size)
+        if self.heom_solver != 'native':
+            raise NotImplementedError(
+                'Streaming HEOM dynamics is only implemented for the native'
+                ' heom_solver.')
+        temperature = (self.temperature * 1e-12
+                       * (constants.k / constants.hbar))  # K ---> rad ps^-1
+        return evo.stream_time_evo_heom_native(self.initial_density_matrix,
+                                               timesteps,
+                                               self.time_interval * 1e-3,  # ps
+                                               self.hamiltonian,  # rad ps^-1
+                                               self.coupling_ops,
+                                               self.reorg_energy,  # rad ps^-1
+                                               temperature,  # rad ps^-1
+                                               self.bath_cutoff,
+                                               self.matsubara_terms,
+                                               self.cutoff_freq,  # rad ps^-1
+                                               self._matsubara_coeffs,
+                                               self._matsubara_freqs,
+                                               eq_state,
+                                               self.bath_expansion,
+                                               self.ado_tolerance,
+                                               batch_size)
+
+    def evolve_until_equilibrated(self, tolerance: float = 0.01,
+                                  window: int = 20,
+                                  measure: str = 'distance',
+                                  batch_size: int = 100,
+                                  timesteps: int = None) -> tuple:
+
+        """
+        Evaluates the time evolution of the system, as for
+        stream_time_evolution, monitoring its equilibration online
+        with a metadata.EquilibrationMonitor and stopping the
+        propagation once it has equilibrated, rather than always
+        evolving for the full number of timesteps. Nothing is
+        memoised.
+
+        Parameters
+        ----------
+        tolerance : float
+            The value below which the measure must stay for the
+            system to be considered equilibrated. Default is 0.01.
+        window : int
+            The number of consecutive timesteps over which the
+            measure must stay below the tolerance. Default is 20.
+        measure : str
+            The measure of the distance from equilibrium, from
+            EQUILIBRATION_MEASURES. Either 'distance', the trace
+            distance to the exact long-time state (the
+            steady_state), or 'change', the trace distance
+            between the density matrices at successive timesteps.
+            Default is 'distance'.
+        batch_size : int
+            The number of timesteps evaluated between checks.
+            Default is 100.
+        timesteps : int
+            The maximum number of timesteps to evolve for. If None
+            (default), the system's timesteps setting is used.
+
+        Returns
+        -------
+        evolution : Trajectory
+            The time evolution data, up to the timestep at which
+            equilibration was detected (the end of the window), or
+            for all the timesteps if it wasn't.
+        equilibration_time : float
+            The time, in fs, from which the measure stays below the
+            tolerance, or None if the system didn't equilibrate
+            within the maximum number of timesteps.
+        """
+
+        if measure not in EQUILIBRATION_MEASURES:
+            raise ValueError('Must choose an equilibration measure from '
+                             + str(EQUILIBRATION_MEASURES))
+        reference = None
+        if measure == 'distance':
+            reference = self.steady_state
+        monitor = meta.EquilibrationMonitor(tolerance, window, reference)
+        batches = []
+        for batch in self.stream_time_evolution(batch_size, timesteps):
+            batches.append(batch)
+            if monitor.update(batch):
+                break
+        evolution = Trajectory(*[np.concatenate([getattr(batch, attr)
+                                                 for batch in batches])
+                                 for attr in ('times', 'rho', 'purity',
+                                              'distance')])
+        if monitor.equilibrated:
+            evolution = evolution[:monitor.end + 1]
+        return evolution, monitor.equilibration_time
+
+    def time_evolution_at(self, times: np.ndarray) -> Trajectory:
+
+        """
+        Evaluates the density operator of the system at an
+        arbitrary set of times, which need not be evenly spaced
+        (i.e. log-spaced times for long equilibration studies). The
+        Liouvillian is diagonalised once and all times evaluated
+        directly, so no intermediate timesteps are computed. If the
+        propagation_method is 'krylov', 'ode' or 'secular', the
+        Krylov engine, ODE solver or secular propagator is used
+        instead of diagonalisation. Only available for Lindblad
+        models.
+
+        Parameters
+        ----------
+        times : np.ndarray
+            1D array of the times at which to evaluate the density
+            matrix, in fs. Must be non-negative and in ascending
+            order.
+
+        Returns
+        -------
+        evolution : Trajectory
+            The time evolution data at each time passed, in the
+            same format as returned by time_evolution.
+        """
+
+        if self.dynamics_model not in LINDBLAD_MODELS:
+            raise ValueError('Can only evaluate the time evolution at'
+                             ' arbitrary times for systems defined with'
+                             ' Lindblad dynamics. Choose from '
+                             + str(LINDBLAD_MODELS))
+        method, superop, propagator = self._lindblad_propagation()
+        if method == 'stepping':
+            method, propagator = 'spectral', None
+        return evo.time_evo_lindblad_times(self.initial_density_matrix,
+                                           superop,  # rad ps^-1
+                                           times,  # fs
+                                           self.dynamics_model,
+                                           self.hamiltonian,  # rad ps^-1
+                                           self.temperature,  # Kelvin
+                                           self.equilibrium_state,
+                                           method,
+                                           propagator
+                                          )
+
     # -------------------------------------------------------------------
     # LINDBLAD-SPECIFIC PROPERTIES
     # -------------------------------------------------------------------
@@ -655,6 +1217,75 @@ class QuantumSystem:
                              ' in units of rad s^-1.')
 
         self._deph_rate = deph_rate
+        self._invalidate('deph_rate')
+
+    @property
+    def propagation_method(self) -> str:
+
+        """
+        Gets or sets the method used to propagate the density
+        matrix in time for Lindblad models; either 'stepping',
+        'spectral', 'krylov', 'ode' or 'secular'.
+
+        Raises
+        ------
+        ValueError
+            If trying to set to an invalid method.
+
+        Returns
+        -------
+        str
+            The propagation method being used.
+        """
+
+        if self.dynamics_model in LINDBLAD_MODELS:
+            return self._propagation_method
+
+    @propagation_method.setter
+    def propagation_method(self, method: str):
+
+        if method not in PROPAGATION_METHODS:
+            raise ValueError('Must choose a propagation method from '
+                             + str(PROPAGATION_METHODS))
+        self._propagation_method = method
+        self._invalidate('propagation_method')
+
+    @property
+    def liouvillian_format(self) -> str:
+
+        """
+        Gets or sets the storage format of the Hamiltonian and
+        Lindbladian superoperators for Lindblad models; either
+        'dense', 'sparse' or 'matrix-free'. The sparse (CSR) format
+        stores only the non-zero elements, so is suited to systems
+        with many sites using the local dephasing model and nearest
+        neighbour interactions. The matrix-free format only affects
+        the liouvillian property, which is then never formed as an
+        N^2 x N^2 matrix; the individual Hamiltonian and
+        Lindbladian superoperators remain dense.
+
+        Raises
+        ------
+        ValueError
+            If trying to set to an invalid format.
+
+        Returns
+        -------
+        str
+            The superoperator storage format being used.
+        """
+
+        if self.dynamics_model in LINDBLAD_MODELS:
+            return self._liouvillian_format
+
+    @liouvillian_format.setter
+    def liouvillian_format(self, liouvillian_format: str):
+
+        if liouvillian_format not in LIOUVILLIAN_FORMATS:
+            raise ValueError('Must choose a Liouvillian format from '
+                             + str(LIOUVILLIAN_FORMATS))
+        self._liouvillian_format = liouvillian_format
+        self._invalidate('liouvillian_format')
 
     @property
     def lindbladian_superop(self) -> np.ndarray:
@@ -668,24 +1299,181 @@ class QuantumSystem:
         -------
         np.ndarray
             The (N^2) x (N^2) 2D array representing the Lindbladian
-            superoperator, in rad ps^-1.
+            superoperator, in rad ps^-1. Read-only. A scipy.sparse
+            CSR matrix if liouvillian_format is 'sparse'.
         """
 
         # Assumes any deph_rate, cutoff_freq, reorg_energy in rad ps^-1
+        if self.dynamics_model == 'local dephasing lindblad':
+            return self._cached('lindbladian_superop',
+                                lambda: lind.loc_deph_lindbladian(
+                                    self.sites,
+                                    self.deph_rate,  # rad ps^-1
+                                    self.liouvillian_format == 'sparse'))
         if self.dynamics_model in LINDBLAD_MODELS:
-            return lind.lindbladian_superop(self.sites,
-                                            self.dynamics_model,
-                                            self.hamiltonian,  # rad ps^-1
-                                            self.deph_rate,  # rad ps^-1
-                                            self.cutoff_freq,  # rad ps^-1
-                                            self.reorg_energy,  # rad ps^-1
-                                            self.temperature,  # Kelvin
-                                            self.spectral_density,
-                                            self.ohmic_exponent)  # rad ps^-1
+            return self._cached('lindbladian_superop',
+                                lambda: lind.lindbladian_from_operators(
+                                    self.lindblad_operators,  # rad ps^-1
+                                    self.sites,
+                                    self.liouvillian_format == 'sparse'))
         raise ValueError(
             'Can only build a Lindbladian superoperator for systems defined'
             ' with Lindblad dynamics. Choose from ' + str(LINDBLAD_MODELS))
 
+    @property
+    def lindblad_operators(self) -> list:
+
+        """
+        Builds the Lindblad (jump) operators of the system and their
+        associated rates, in the site basis.
+
+        Returns
+        -------
+        list of tuple
+            Each element of the form (rate, l_op), where rate is in
+            rad ps^-1 and l_op is an N x N np.ndarray.
+        """
+
+        if self.dynamics_model in LINDBLAD_MODELS:
+            return self._cached('lindblad_operators',
+                                lambda: lind.lindblad_operators(
+                                    self.sites,
+                                    self.dynamics_model,
+                                    self.hamiltonian,  # rad ps^-1
+                                    self.deph_rate,  # rad ps^-1
+                                    self.cutoff_freq,  # rad ps^-1
+                                    self.reorg_energy,  # rad ps^-1
+                                    self.temperature,  # Kelvin
+                                    self.spectral_density,
+                                    self.ohmic_exponent))
+        raise ValueError(
+            'Can only build Lindblad operators for systems defined'
+            ' with Lindblad dynamics. Choose from ' + str(LINDBLAD_MODELS))
+
+    @property
+    def liouvillian(self):
+
+        """
+        Builds the Liouvillian of the system, the sum of the
+        Hamiltonian and Lindbladian superoperators, in the format
+        given by liouvillian_format; either a dense np.ndarray, a
+        scipy.sparse CSR matrix, or a matrix-free LinearOperator.
+        The matrix-free Liouvillian of the local dephasing model
+        applies the Hamiltonian commutator and the dephasing of the
+        coherences directly, in O(N^3) time (see
+        lindbladian.loc_deph_liouvillian_operator()).
+
+        Returns
+        -------
+        np.ndarray, scipy.sparse.csr_matrix or LinearOperator
+            The (N^2) x (N^2) Liouvillian, in rad ps^-1. Read-only
+            if a np.ndarray.
+        """
+
+        if self.dynamics_model not in LINDBLAD_MODELS:
+            raise ValueError(
+                'Can only build a Liouvillian for systems defined with'
+                ' Lindblad dynamics. Choose from ' + str(LINDBLAD_MODELS))
+        if (self.liouvillian_format == 'matrix-free'
+                and self.dynamics_model == 'local dephasing lindblad'):
+            return self._cached('liouvillian',
+                                lambda: lind.loc_deph_liouvillian_operator(
+                                    self.hamiltonian,  # rad ps^-1
+                                    self.deph_rate))  # rad ps^-1
+        if self.liouvillian_format == 'matrix-free':
+            return self._cached('liouvillian',
+                                lambda: lind.liouvillian_operator(
+                                    self.hamiltonian,  # rad ps^-1
+                                    self.lindblad_operators))
+        return self._cached('liouvillian',
+                            lambda: (self.hamiltonian_superop
+                                     + self.lindbladian_superop))
+
+    @property
+    def propagator(self) -> evo.LindbladPropagator:
+
+        """
+        Gets the exponential propagator exp(L dt) for the system's
+        Liouvillian L (the sum of the Hamiltonian and Lindbladian
+        superoperators) and time interval dt. The propagator is
+        memoised and reused by every subsequent time evolution
+        until either the Liouvillian or time_interval changes, so
+        that runs differing only in, for example, init_site_pop
+        share the same propagator.
+
+        Returns
+        -------
+        evo.LindbladPropagator
+            The propagator for the system, with a time interval in
+            units of ps.
+        """
+
+        def build():
+            superop = self.hamiltonian_superop + self.lindbladian_superop
+            if sparse.issparse(superop):
+                superop = superop.toarray()  # the exponential is dense
+            return evo.LindbladPropagator(superop,
+                                          self.time_interval * 1e-3)  # ps
+
+        return self._cached('propagator', build)
+
+    @property
+    def secular_propagator(self) -> evo.SecularPropagator:
+
+        """
+        Gets the SecularPropagator for the system, which evolves
+        the populations and coherences of the eigenstates of the
+        Hamiltonian separately, for the 'global thermalising
+        lindblad' model. Memoised as for the propagator.
+
+        Raises
+        ------
+        ValueError
+            If the system isn't described by the 'global
+            thermalising lindblad' model.
+
+        Returns
+        -------
+        evo.SecularPropagator
+            The secular propagator for the system.
+        """
+
+        if self.dynamics_model != 'global thermalising lindblad':
+            raise ValueError('The secular propagator is only defined for'
+                             " the 'global thermalising lindblad' model.")
+        return self._cached('secular_propagator',
+                            lambda: evo.SecularPropagator(
+                                self.hamiltonian,  # rad ps^-1
+                                lind.glob_therm_rates(
+                                    self.hamiltonian,  # rad ps^-1
+                                    self.deph_rate,  # rad ps^-1
+                                    self.cutoff_freq,  # rad ps^-1
+                                    self.reorg_energy,  # rad ps^-1
+                                    self.temperature,  # Kelvin
+                                    self.spectral_density,
+                                    self.ohmic_exponent)))
+
+    def _lindblad_propagation(self) -> tuple:
+
+        """
+        Returns the propagation method, the superoperator and the
+        propagator (if any) with which to evolve the system under
+        Lindblad dynamics, as passed to the Lindblad time evolution
+        functions.
+        """
+
+        method = self.propagation_method
+        if method == 'secular':
+            return method, None, self.secular_propagator
+        if method == 'stepping':
+            propagator = self.propagator
+            return method, propagator.superop, propagator
+        # Krylov and ODE methods only need the action of the Liouvillian
+        if method in ('krylov', 'ode'):
+            return method, self.liouvillian, None
+        superop = self.hamiltonian_superop + self.lindbladian_superop
+        return method, superop, None
+
     # -------------------------------------------------------------------
     # HEOM-SPECIFIC PROPERTIES
     # -------------------------------------------------------------------
@@ -717,6 +1505,7 @@ class QuantumSystem:
             raise ValueError('The number of Matsubara terms must be a positive'
                              ' integer.')
         self._matsubara_terms = terms
+        self._invalidate('matsubara_terms')
 
     @property
     def matsubara_coeffs(self) -> np.ndarray:
@@ -734,11 +1523,17 @@ class QuantumSystem:
         -------
         np.ndarray
             An array of matsubara coefficients, in order,
-            corresponding to the first n matsubara terms.
+            corresponding to the first n matsubara terms. If none
+            have been set, those generated by the bath expansion
+            for the latest evaluation of the time evolution, or
+            None if it hasn't been evaluated with the current
+            settings.
         """
 
         if self.dynamics_model == 'HEOM':
-            return self._matsubara_coeffs
+            if self._matsubara_coeffs is not None:
+                return self._matsubara_coeffs
+            return self._cache.get('bath_terms', (None, None))[0]
 
     @matsubara_coeffs.setter
     def matsubara_coeffs(self, coeffs: np.ndarray):
@@ -757,6 +1552,7 @@ class QuantumSystem:
             self._matsubara_coeffs = coeffs
         except TypeError:
             self._matsubara_coeffs = None
+        self._invalidate('matsubara_coeffs')
 
     @property
     def matsubara_freqs(self) -> np.ndarray:
@@ -776,11 +1572,16 @@ class QuantumSystem:
         np.ndarray
             An array of matsubara frequencies, in order,
             corresponding to the first n matsubara terms, in units
-            of s^-1.
+            of s^-1. If none have been set, those generated by the
+            bath expansion for the latest evaluation of the time
+            evolution, or None if it hasn't been evaluated with the
+            current settings.
         """
 
         if self.dynamics_model == 'HEOM':
-            return self._matsubara_freqs
+            if self._matsubara_freqs is not None:
+                return self._matsubara_freqs
+            return self._cache.get('bath_terms', (None, None))[1]
 
     @matsubara_freqs.setter
     def matsubara_freqs(self, freqs: np.ndarray):
@@ -799,6 +1600,7 @@ class QuantumSystem:
             self._matsubara_freqs = freqs
         except TypeError:
             self._matsubara_freqs = None
+        self._invalidate('matsubara_freqs')
 
     @property
     def bath_cutoff(self) -> int:
@@ -828,6 +1630,7 @@ class QuantumSystem:
             raise ValueError('The number of bath terms must be a positive'
                              ' integer.')
         self._bath_cutoff = bath_cutoff
+        self._invalidate('bath_cutoff')
 
     @property
     def coupling_op(self) -> np.ndarray:
@@ -841,9 +1644,227 @@ class QuantumSystem:
         np.ndarray of complex
             2D square array of size N x N (where N is the number
             of sites) that represents the coupling operator.
+            Read-only.
+        """
+
+        return self._cached('coupling_op',
+                            lambda: heom.system_bath_coupling_op(self.sites))
+
+    @property
+    def coupling_ops(self) -> np.ndarray:
+
+        """
+        Get the operators describing the coupling between the system
+        and each of its independent baths, used in the native HEOM
+        model of the dynamics; a single sigma z operator for the
+        spin-boson model, and otherwise the projector onto each
+        site.
+
+        Returns
+        -------
+        np.ndarray
+            3D array of size B x N x N (where B is the number of
+            baths and N the number of sites) of the coupling
+            operators. Read-only.
+        """
+
+        return self._cached('coupling_ops',
+                            lambda: heom.system_bath_coupling_ops(
+                                self.sites, self.interaction_model))
+
+    @property
+    def heom_solver(self) -> str:
+
         """
+        Get or set the solver used for HEOM dynamics; either
+        'qutip' or 'native'.
 
-        return heom.system_bath_coupling_op(self.sites)
+        Raises
+        ------
+        ValueError
+            If trying to set the solver to an invalid option.
+
+        Returns
+        -------
+        str
+            The HEOM solver being used.
+        """
+
+        if self.dynamics_model == 'HEOM':
+            return self._heom_solver
+
+    @heom_solver.setter
+    def heom_solver(self, solver: str):
+
+        if solver not in HEOM_SOLVERS:
+            raise ValueError('Must choose a HEOM solver from '
+                             + str(HEOM_SOLVERS))
+        if solver == 'qutip':
+            assert self.sites == 2, (
+                'Currently HEOM can only be run for 2-site systems with the'
+                ' qutip heom_solver.')
+            assert self.interaction_model == 'spin-boson', (
+                'Currently only a spin-boson interaction model can be used in'
+                ' in conjunction with the qutip heom_solver.')
+        self._heom_solver = solver
+        self._invalidate('heom_solver')
+
+    @property
+    def bath_expansion(self) -> str:
+
+        """
+        Get or set the expansion of the bath correlation function
+        into exponentials used in HEOM dynamics; either 'matsubara'
+        or 'pade'. Setting it discards any terms generated by the
+        previous expansion, but not matsubara_coeffs or
+        matsubara_freqs that have been set.
+
+        Raises
+        ------
+        ValueError
+            If trying to set the expansion to an invalid option.
+
+        Returns
+        -------
+        str
+            The bath expansion being used.
+        """
+
+        if self.dynamics_model == 'HEOM':
+            return self._bath_expansion
+
+    @bath_expansion.setter
+    def bath_expansion(self, expansion: str):
+
+        if expansion not in BATH_EXPANSIONS:
+            raise ValueError('Must choose a bath expansion from '
+                             + str(BATH_EXPANSIONS))
+        self._bath_expansion = expansion
+        self._invalidate('bath_expansion')
+
+    @property
+    def ado_tolerance(self) -> float:
+
+        """
+        Get or set the tolerance for adaptive filtering of the ADOs
+        in HEOM dynamics, or None if the full hierarchy is
+        propagated.
+
+        Raises
+        ------
+        ValueError
+            If being set to a negative value.
+
+        Returns
+        -------
+        float
+            The ADO filtering tolerance.
+        """
+
+        if self.dynamics_model == 'HEOM':
+            return self._ado_tolerance
+
+    @ado_tolerance.setter
+    def ado_tolerance(self, tolerance: float):
+
+        if tolerance is not None and tolerance < 0.:
+            raise ValueError('The ADO filtering tolerance must be a'
+                             ' non-negative float.')
+        self._ado_tolerance = tolerance
+        self._invalidate('ado_tolerance')
+
+    def converge_hierarchy(self, tolerance: float = 1e-3,
+                           timesteps: int = 50, max_depth: int = 20,
+                           max_terms: int = 10) -> tuple:
+
+        """
+        Finds the cheapest bath_cutoff (hierarchy depth) and
+        matsubara_terms for which the system's HEOM dynamics are
+        converged over its first few timesteps, using the native
+        HEOM engine and the system's bath_expansion. See
+        heom.converge_hierarchy() for details. The system's own
+        settings are left unchanged.
+
+        Parameters
+        ----------
+        tolerance : float
+            The maximum trace distance between the dynamics of
+            successive levels for them to be considered converged.
+            Default is 1e-3.
+        timesteps : int
+            The number of timesteps, spaced by time_interval, over
+            which to compare the dynamics. Default is 50.
+        max_depth : int
+            The maximum hierarchy depth to try. Default is 20.
+        max_terms : int
+            The maximum number of exponential terms to try.
+            Default is 10.
+
+        Returns
+        -------
+        tuple of int
+            The converged bath_cutoff and matsubara_terms.
+        """
+
+        assert self.dynamics_model == 'HEOM', (
+            'Can only converge the hierarchy for HEOM dynamics.')
+        times = np.arange(timesteps + 1) * self.time_interval * 1e-3  # ps
+        return heom.converge_hierarchy(self.hamiltonian,  # rad ps^-1
+                                       self.coupling_ops,
+                                       self.initial_density_matrix,
+                                       times,  # ps
+                                       self.cutoff_freq,  # rad ps^-1
+                                       self.reorg_energy,  # rad ps^-1
+                                       self.temperature,  # Kelvin
+                                       tolerance,
+                                       self.bath_expansion,
+                                       max_depth,
+                                       max_terms)
+
+    @property
+    def steady_state(self) -> np.ndarray:
+
+        """
+        Returns the steady state of the system; the exact long-time
+        limit of its time evolution, found directly as the null
+        space of the generator of its dynamics rather than by
+        time-evolving to equilibrium. For Lindblad models this is
+        the null space of the Liouvillian (see
+        evolution.steady_state_lindblad()), so comparing it with
+        the equilibrium_state checks that the analytic equilibrium
+        state is the model's fixed point. For HEOM dynamics it is
+        that of the native HEOM engine's hierarchy generator, for
+        the hierarchy truncation used, whichever heom_solver is
+        set; unlike the equilibrium_state, this includes the effect
+        of the system-bath coupling on the populations and
+        coherences of the system.
+
+        Returns
+        -------
+        np.ndarray
+            A 2D square density matrix for the system's steady
+            state. Read-only.
+        """
+
+        if self.dynamics_model in LINDBLAD_MODELS:
+            return self._cached('steady_state',
+                                lambda: evo.steady_state_lindblad(
+                                    self.hamiltonian_superop  # rad ps^-1
+                                    + self.lindbladian_superop))
+        temperature = (self.temperature * 1e-12
+                       * (constants.k / constants.hbar))  # K ---> rad ps^-1
+        return self._cached('steady_state',
+                            lambda: evo.steady_state_heom(
+                                self.hamiltonian,  # rad ps^-1
+                                self.coupling_ops,
+                                self.reorg_energy,  # rad ps^-1
+                                temperature,  # rad ps^-1
+                                self.bath_cutoff,
+                                self.matsubara_terms,
+                                self.cutoff_freq,  # rad ps^-1
+                                self._matsubara_coeffs,
+                                self._matsubara_freqs,  # rad ps^-1
+                                self.bath_expansion))
 
     # -------------------------------------------------------------------
     # BATH + THERMAL PROPERTIES
@@ -877,6 +1898,7 @@ class QuantumSystem:
             raise ValueError('Temperature must be a positive float value'
                              ' in Kelvin.')
         self._temperature = temperature
+        self._invalidate('temperature')
 
     @property
     def cutoff_freq(self) -> float:
@@ -908,6 +1930,7 @@ class QuantumSystem:
         if cutoff_freq <= 0.:
             raise ValueError('Cutoff frequency must be a positive float.')
         self._cutoff_freq = cutoff_freq
+        self._invalidate('cutoff_freq')
 
     @property
     def reorg_energy(self) -> float:
@@ -942,6 +1965,7 @@ class QuantumSystem:
             raise ValueError('Scale factor must be a non-negative float in rad'
                              ' s^-1.')
         self._reorg_energy = reorg_energy
+        self._invalidate('reorg_energy')
 
     @property
     def spectral_density(self) -> str:
@@ -971,6 +1995,7 @@ class QuantumSystem:
                 'Currently systems described by HEOM dynamics can only be'
                 ' evaluated for Debye spectral densities.')
         self._spectral_density = spectral_density
+        self._invalidate('spectral_density')
 
     @property
     def ohmic_exponent(self) -> float:
@@ -1002,3 +2027,4 @@ class QuantumSystem:
 
         if exponent > 0.:
             self._ohmic_exponent = exponent
+        self._invalidate('ohmic_exponent')
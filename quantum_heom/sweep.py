@@ -0,0 +1,208 @@
+"""Contains functions for sweeping the settings of QuantumSystems over a
+grid of parameter values, evaluating the points of the grid in parallel
+over a pool of processes."""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import copy
+from itertools import product
+import multiprocessing
+import os
+
+import numpy as np
+
+from quantum_heom import metadata as meta
+
+SWEEP_PARAMETERS = ['temperature', 'cutoff_freq', 'reorg_energy', 'alpha',
+                    'beta', 'epsi', 'delta', 'deph_rate']
+# The environment variables that set the number of threads used by each
+# of the common BLAS/OpenMP implementations numpy may be linked against.
+BLAS_THREAD_VARIABLES = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                         'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                         'NUMEXPR_NUM_THREADS']
+
+
+def set_parameter(system, name: str, value: float):
+
+    """
+    Sets a parameter of a QuantumSystem to the value passed. As
+    well as the names of the QuantumSystem's settings, the system
+    Hamiltonian parameters 'alpha' or 'beta' (for nearest neighbour
+    models), or 'epsi' or 'delta' (for spin-boson) can be passed,
+    setting one element of alpha_beta or epsi_delta and leaving the
+    other unchanged.
+
+    Parameters
+    ----------
+    system : QuantumSystem
+        The QuantumSystem whose parameter to set.
+    name : str
+        The name of the parameter, from SWEEP_PARAMETERS.
+    value : float
+        The value to set the parameter to.
+    """
+
+    assert name in SWEEP_PARAMETERS, (
+        'Must choose a parameter to set from ' + str(SWEEP_PARAMETERS))
+    if name == 'alpha':
+        system.alpha_beta = (value, system.alpha_beta[1])
+    elif name == 'beta':
+        system.alpha_beta = (system.alpha_beta[0], value)
+    elif name == 'epsi':
+        system.epsi_delta = (value, system.epsi_delta[1])
+    elif name == 'delta':
+        system.epsi_delta = (system.epsi_delta[0], value)
+    else:
+        setattr(system, name, value)
+
+def parameter_grid(grid: dict) -> np.ndarray:
+
+    """
+    Returns every combination of the values of the parameters
+    passed, as a structured array with a float field for each
+    parameter. Combinations are ordered as by itertools.product,
+    i.e. with the values of the last parameter varying fastest.
+
+    Parameters
+    ----------
+    grid : dict
+        The values of each parameter to sweep over, as
+        {name: values} pairs, i.e. {'temperature': [100., 300.]}.
+
+    Returns
+    -------
+    np.ndarray
+        1D structured array of the grid points.
+    """
+
+    assert grid, 'Must pass at least one parameter to sweep over.'
+    for name in grid:
+        assert name in SWEEP_PARAMETERS, (
+            'Must choose parameters to sweep over from '
+            + str(SWEEP_PARAMETERS))
+    names = list(grid.keys())
+    points = list(product(*[grid[name] for name in names]))
+    return np.array(points, dtype=[(name, float) for name in names])
+
+@contextmanager
+def pinned_blas_threads(threads: int):
+
+    """
+    Sets the number of BLAS/OpenMP threads for any processes
+    started within the context, restoring the environment on exit,
+    so that parallel workers don't oversubscribe the cores.
+
+    Parameters
+    ----------
+    threads : int
+        The number of threads each process started may use.
+    """
+
+    previous = {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES}
+    os.environ.update({name: str(threads) for name in BLAS_THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+
+def _evaluate_point(args: tuple) -> np.ndarray:
+
+    """
+    Evaluates the integrated trace distance of each system with
+    respect to the reference at a single grid point. The reference
+    dynamics are evaluated once and shared between all the systems.
+    """
+
+    systems, reference, point = args
+    systems = [copy.deepcopy(system) for system in systems]
+    reference = copy.deepcopy(reference)
+    for name in point.dtype.names:
+        for system in systems + [reference]:
+            set_parameter(system, name, float(point[name]))
+    return meta.integrate_trace_distance(systems, reference)
+
+def sweep(systems, reference, grid: dict, processes: int = None,
+          threads_per_process: int = 1) -> np.ndarray:
+
+    """
+    Evaluates the integrated trace distance (see
+    metadata.integrate_trace_distance()) of each QuantumSystem in
+    'systems' with respect to the 'reference' QuantumSystem at
+    every point of a grid of parameter values, the parameters of
+    all the systems and the reference being set to the values at
+    each point. The reference dynamics are evaluated once per grid
+    point. The systems passed are left unchanged.
+
+    The grid points are evaluated over a pool of processes, each
+    limited to threads_per_process BLAS threads so that the pool
+    doesn't oversubscribe the cores. The processes are started with
+    the 'spawn' method, so scripts calling this function must guard
+    their entry point with if __name__ == '__main__'. Systems with
+    disk_cache set share their results through the on-disk cache,
+    as for serial runs.
+
+    Parameters
+    ----------
+    systems : list of QuantumSystem
+        The QuantumSystem objects whose trace distance with respect
+        to the reference QuantumSystem will be evaluated.
+    reference : QuantumSystem
+        The reference QuantumSystem object.
+    grid : dict
+        The values of each parameter to sweep over, as
+        {name: values} pairs. Names must be in SWEEP_PARAMETERS.
+    processes : int
+        The number of worker processes. If None (default), as many
+        as fit on the machine's cores at threads_per_process
+        threads each. If 1, the grid points are evaluated serially
+        in the calling process.
+    threads_per_process : int
+        The number of BLAS threads each worker process uses.
+        Default is 1.
+
+    Returns
+    -------
+    np.ndarray
+        1D structured array with a float field for each parameter,
+        giving the grid point as in parameter_grid(), and an
+        'integ_dist' field holding the integrated trace distance of
+        each system at that point.
+    """
+
+    if not isinstance(systems, list):
+        systems = [systems]
+    for system in systems:
+        assert system.sites == reference.sites, (
+            'All QuantumSystem objects must have the same dimensions')
+        assert system.timesteps == reference.timesteps, (
+            'The time evolution of all QuantumSystems must be evaluated for'
+            ' the same number of timesteps')
+        assert system.time_interval == reference.time_interval, (
+            'The time evolution of all QuantumSystems must be evaluated with'
+            ' the same time interval')
+    assert threads_per_process >= 1, 'threads_per_process must be positive.'
+    points = parameter_grid(grid)
+    if processes is None:
+        processes = max(1, (os.cpu_count() or 1) // threads_per_process)
+    assert processes >= 1, 'processes must be a positive int.'
+    processes = min(processes, len(points))
+
+    tasks = [(systems, reference, point) for point in points]
+    if processes == 1:
+        dists = [_evaluate_point(task) for task in tasks]
+    else:
+        with pinned_blas_threads(threads_per_process):
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(processes, mp_context=context) as pool:
+                dists = list(pool.map(_evaluate_point, tasks))
+
+    dtype = points.dtype.descr + [('integ_dist', float, (len(systems),))]
+    results = np.empty(len(points), dtype=dtype)
+    for name in points.dtype.names:
+        results[name] = points[name]
+    results['integ_dist'] = dists
+    return results
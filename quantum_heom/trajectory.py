@@ -0,0 +1,229 @@
+"""Contains the Trajectory class, which stores the time evolution
+data of a QuantumSystem in contiguous arrays."""
+
+import numpy as np
+
+
+class Trajectory:
+
+    """
+    Time evolution data of a quantum system, stored column-wise in
+    contiguous arrays rather than as one object array per timestep.
+    For a trajectory of T timesteps of an N-site system:
+
+        times     (T,)         float
+        rho       (T, N, N)    complex
+        purity    (T,)         float
+        distance  (T,)         float
+
+    Populations and individual density matrix elements are returned
+    as views of the rho array, so no data is copied when extracting
+    them for plotting or analysis. For compatibility with code
+    written for the legacy format, indexing a Trajectory with an
+    int returns the step as an array of the form (time, matrix,
+    squared, distance), and iterating over it yields each such step
+    in turn.
+
+    Parameters
+    ----------
+    times : np.ndarray
+        1D array of the times at which the density matrix is
+        evaluated, in fs.
+    rho : np.ndarray
+        3D array of the density matrix at each time.
+    purity : np.ndarray
+        1D array of the trace of the density matrix squared at each
+        time.
+    distance : np.ndarray
+        1D array of the trace distance of the density matrix from
+        the system's equilibrium state at each time.
+    """
+
+    def __init__(self, times: np.ndarray, rho: np.ndarray,
+                 purity: np.ndarray, distance: np.ndarray):
+
+        self._times = np.ascontiguousarray(times, dtype=float)
+        self._rho = np.ascontiguousarray(rho, dtype=complex)
+        self._purity = np.ascontiguousarray(purity, dtype=float)
+        self._distance = np.ascontiguousarray(distance, dtype=float)
+        assert self._rho.ndim == 3, 'rho must be a (T x N x N) array.'
+        assert self._rho.shape[1] == self._rho.shape[2], (
+            'Density matrices must be square.')
+        for array in (self._times, self._purity, self._distance):
+            assert array.shape == (self._rho.shape[0],), (
+                'times, purity and distance must be 1D arrays with an'
+                ' element for each density matrix.')
+
+    @classmethod
+    def from_legacy(cls, evolution: np.ndarray):
+
+        """
+        Builds a Trajectory from time evolution data in the legacy
+        format; an object array where each element is an array of
+        the form (time, matrix, squared, distance).
+
+        Parameters
+        ----------
+        evolution : np.ndarray
+            The time evolution data in the legacy format.
+
+        Returns
+        -------
+        Trajectory
+            The same data stored in contiguous arrays.
+        """
+
+        if isinstance(evolution, cls):
+            return evolution
+        times = np.array([step[0] for step in evolution], dtype=float)
+        rho = np.array([step[1] for step in evolution], dtype=complex)
+        purity = np.array([step[2] for step in evolution], dtype=float)
+        distance = np.array([step[3] for step in evolution], dtype=float)
+        return cls(times, rho, purity, distance)
+
+    @property
+    def times(self) -> np.ndarray:
+
+        """
+        Gets the times at which the density matrix is evaluated.
+
+        Returns
+        -------
+        np.ndarray
+            1D array of times, in fs.
+        """
+
+        return self._times
+
+    @property
+    def rho(self) -> np.ndarray:
+
+        """
+        Gets the density matrix at each time.
+
+        Returns
+        -------
+        np.ndarray
+            (T x N x N) array of complex density matrices.
+        """
+
+        return self._rho
+
+    @property
+    def purity(self) -> np.ndarray:
+
+        """
+        Gets the trace of the density matrix squared at each time.
+
+        Returns
+        -------
+        np.ndarray
+            1D array of trace squared values.
+        """
+
+        return self._purity
+
+    @property
+    def distance(self) -> np.ndarray:
+
+        """
+        Gets the trace distance of the density matrix from the
+        system's equilibrium state at each time.
+
+        Returns
+        -------
+        np.ndarray
+            1D array of trace distances.
+        """
+
+        return self._distance
+
+    @property
+    def dims(self) -> int:
+
+        """
+        Gets the dimension (i.e. number of sites) of the density
+        matrices.
+
+        Returns
+        -------
+        int
+            The dimension N of each N x N density matrix.
+        """
+
+        return self._rho.shape[1]
+
+    @property
+    def populations(self) -> np.ndarray:
+
+        """
+        Gets the site populations (the real part of the diagonal
+        elements of the density matrix) at each time, as a read-only
+        view of the density matrix data.
+
+        Returns
+        -------
+        np.ndarray
+            (T x N) array of site populations.
+        """
+
+        return np.diagonal(self._rho, axis1=1, axis2=2).real
+
+    def element(self, element: str) -> np.ndarray:
+
+        """
+        Gets a single element of the density matrix at each time,
+        as a view of the density matrix data. Off-diagonal elements
+        give the coherences between sites.
+
+        Parameters
+        ----------
+        element : str
+            The string representation of the element, numbered with
+            indexing starting at 1; i.e. '21'.
+
+        Returns
+        -------
+        np.ndarray
+            1D complex array of the element's value at each time.
+        """
+
+        row, col = int(element[0]) - 1, int(element[1]) - 1
+        return self._rho[:, row, col]
+
+    def legacy(self) -> np.ndarray:
+
+        """
+        Returns the time evolution data in the legacy format; an
+        object array where each element is an array of the form
+        (time, matrix, squared, distance).
+
+        Returns
+        -------
+        np.ndarray
+            The time evolution data in the legacy format.
+        """
+
+        evolution = np.empty(len(self), dtype=np.ndarray)
+        for idx in range(len(self)):
+            evolution[idx] = self[idx]
+        return evolution
+
+    def __len__(self) -> int:
+
+        return len(self._times)
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return Trajectory(self._times[index], self._rho[index],
+                              self._purity[index], self._distance[index])
+        step = np.empty(4, dtype=object)
+        step[:] = [self._times[index], self._rho[index],
+                   self._purity[index], self._distance[index]]
+        return step
+
+    def __iter__(self):
+
+        for idx in range(len(self)):
+            yield self[idx]
@@ -1,5 +1,6 @@
 """Contains general use utility functions."""
 
+from collections import OrderedDict
 from itertools import permutations, product
 
 from scipy import linalg, constants
@@ -61,6 +62,65 @@ def trace_distance(A: np.ndarray, B: np.ndarray) -> float:
     diag = np.diag(np.absolute(eigv(A - B)))
     return 0.5 * np.trace(diag)
 
+def batch_trace_matrix_squared(matrices: np.ndarray) -> np.ndarray:
+
+    """
+    Returns the trace of the square of each of a stack of Hermitian
+    matrices (i.e. the purity of each density matrix in a
+    trajectory), evaluated in one vectorised call using the
+    identity tr(A^2) = sum_ij |A_ij|^2 for Hermitian A.
+
+    Parameters
+    ----------
+    matrices : np.ndarray
+        A (T x N x N) array of Hermitian matrices, or a single
+        (N x N) Hermitian matrix.
+
+    Returns
+    -------
+    np.ndarray
+        1D array of length T of the trace of each matrix squared,
+        or a float if a single matrix is passed.
+    """
+
+    matrices = np.asarray(matrices)
+    assert matrices.shape[-1] == matrices.shape[-2], (
+        'Input matrices must be square.')
+
+    return np.sum(np.real(matrices * matrices.conjugate()), axis=(-2, -1))
+
+def batch_trace_distance(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+
+    """
+    Returns the trace distance between each of a stack of Hermitian
+    matrices and a reference, as defined in trace_distance(), using
+    a Hermitian eigenvalue solver on the whole stack at once. The
+    reference B can either be a single matrix (i.e. the equilibrium
+    state) or a stack of matrices the same shape as A, in which case
+    the distance is taken elementwise along the stack.
+
+    Parameters
+    ----------
+    A : np.ndarray
+        A (T x N x N) array of Hermitian matrices, i.e. the density
+        matrix at each time in a trajectory.
+    B : np.ndarray
+        The reference matrix, either of shape (N x N) or (T x N x N).
+
+    Returns
+    -------
+    np.ndarray
+        1D array of length T of the trace distance of each matrix in
+        A relative to the reference.
+    """
+
+    diff = np.asarray(A) - np.asarray(B)
+    assert diff.shape[-1] == diff.shape[-2], 'Input matrices must be square.'
+    # Symmetrise to remove any non-Hermitian numerical noise
+    diff = 0.5 * (diff + np.swapaxes(diff, -1, -2).conjugate())
+
+    return 0.5 * np.sum(np.absolute(np.linalg.eigvalsh(diff)), axis=-1)
+
 def renormalise_matrix(matrix: np.ndarray) -> np.ndarray:
 
     """
@@ -86,6 +146,33 @@ def renormalise_matrix(matrix: np.ndarray) -> np.ndarray:
     matrix = matrix / trace
     return matrix
 
+def batch_renormalise_matrices(matrices: np.ndarray) -> np.ndarray:
+
+    """
+    Renormalises each of a stack of square matrices (i.e. the
+    density matrix at each time in a trajectory) to trace=1, as in
+    renormalise_matrix(), in one vectorised operation.
+
+    Parameters
+    ----------
+    matrices : np.ndarray
+        A (T x N x N) array of the matrices to renormalise.
+
+    Returns
+    -------
+    np.ndarray
+        The (T x N x N) array of renormalised matrices, each with
+        trace=1.
+    """
+
+    assert isinstance(matrices, np.ndarray), 'Must pass as numpy ndarray'
+    assert matrices.shape[-1] == matrices.shape[-2], (
+        'Input matrices must be square.')
+    traces = np.trace(matrices, axis1=-2, axis2=-1)
+    assert np.all(traces != 0.), 'Input matrices cannot have trace zero.'
+
+    return matrices / traces[..., np.newaxis, np.newaxis]
+
 def commutator(A: np.ndarray, B: np.ndarray, anti: bool = False) -> complex:
 
     """
@@ -460,3 +547,66 @@ def unit_conversion(value: float, unit_from: str, unit_to: str) -> float:
     if unit_from == 'rad ps^-1' and unit_to == 'fs rad^-1':
         return 1.0e3 / value
     raise NotImplementedError('Other unit conversions not yet implemented.')
+
+def array_key(*values) -> tuple:
+
+    """
+    Builds a hashable key from a set of values, any of which may be
+    np.ndarrays, for use as a dictionary key when memoising
+    quantities built from arrays. Arrays equal in shape, dtype and
+    contents give equal keys.
+
+    Parameters
+    ----------
+    *values
+        The values to build the key from. Must be np.ndarrays or
+        hashable.
+
+    Returns
+    -------
+    tuple
+        The hashable key.
+    """
+
+    key = []
+    for value in values:
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            key.append((value.shape, value.dtype.str, value.tobytes()))
+        else:
+            key.append(value)
+    return tuple(key)
+
+def memoise_lru(cache: OrderedDict, key, build, max_size: int):
+
+    """
+    Returns the value stored in a cache under a key, first building
+    it with build() if it isn't already stored. At most max_size
+    values are kept, evicting the least recently used first.
+
+    Parameters
+    ----------
+    cache : collections.OrderedDict
+        The cache, ordered from least to most recently used.
+    key
+        The hashable key of the value; i.e. as built by
+        array_key().
+    build : callable
+        Called with no arguments to build the value if it isn't in
+        the cache.
+    max_size : int
+        The maximum number of values to keep in the cache.
+
+    Returns
+    -------
+    The cached value.
+    """
+
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    value = build()
+    cache[key] = value
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+    return value
@@ -1,7 +1,7 @@
 """Tests all the functions in bath.py, related to Spectral densities,
 Bose-Einstein distributions and rate constants."""
 
-from scipy import constants as c
+from scipy import constants as c, integrate
 import numpy as np
 import pytest
 
@@ -207,3 +207,46 @@ def test_bose_einstein_distrib_error(omega, temp):
 
     with pytest.raises(AssertionError):
         bath.bose_einstein_distrib(omega, temp)
+
+
+@pytest.mark.parametrize('temp, time', [(77., 0.05), (300., 0.02)])
+def test_matsubara_decomposition_reconstructs_correlation(temp, time):
+
+    """
+    Tests that the exponential decomposition of the Debye
+    correlation function matches the correlation function
+    evaluated by direct numerical integration of the spectral
+    density, at a time in ps.
+    """
+
+    cutoff, reorg = 6.024, 1.391
+    beta = c.hbar * 1e12 / (c.k * temp)
+    real = integrate.quad(lambda w: (2 * reorg * w * cutoff
+                                     / ((w**2 + cutoff**2)
+                                        * np.tanh(beta * w / 2))),
+                          0, np.inf, weight='cos', wvar=time)[0] / np.pi
+    exact = real - 1j * reorg * cutoff * np.exp(- cutoff * time)
+    coeffs, freqs = bath.matsubara_decomposition(cutoff, reorg, temp, 50)
+    approx = np.sum(coeffs * np.exp(- freqs * time))
+    assert np.isclose(approx, exact, rtol=1e-8)
+    assert np.all(np.diff(freqs[1:]) > 0)
+
+
+@pytest.mark.parametrize('temp', [77., 300.])
+def test_pade_decomposition_converges_faster(temp):
+
+    """
+    Tests that the Pade decomposition of the Debye correlation
+    function has the same Debye pole term as the Matsubara
+    decomposition, but captures its zero-frequency weight (i.e.
+    leaves a vanishing terminator) with only a few terms, which the
+    Matsubara expansion does not.
+    """
+
+    cutoff, reorg = 6.024, 1.391
+    mats = bath.matsubara_decomposition(cutoff, reorg, temp, 3)
+    pade = bath.pade_decomposition(cutoff, reorg, temp, 3)
+    assert mats[0][0] == pade[0][0] and mats[1][0] == pade[1][0]
+    assert np.all(np.diff(pade[1][1:]) > 0)
+    assert abs(bath.terminator_factor(cutoff, reorg, temp, *pade)) < 1e-6
+    assert abs(bath.terminator_factor(cutoff, reorg, temp, *mats)) > 1e-3
@@ -0,0 +1,162 @@
+"""Tests the functions contained within cache.py"""
+
+import os
+
+import numpy as np
+import pytest
+
+from quantum_heom import cache
+from quantum_heom import evolution as evo
+from quantum_heom.quantum_system import QuantumSystem
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+
+    """
+    Points the on-disk cache at a temporary directory.
+    """
+
+    monkeypatch.setenv(cache.CACHE_DIR_VARIABLE, str(tmp_path))
+    return tmp_path
+
+
+def test_settings_key_canonical():
+
+    """
+    Tests that equal settings give the same key regardless of their
+    order or container types, and that changing any setting changes
+    the key.
+    """
+
+    settings = {'sites': 2, 'alpha_beta': (20., -15.5), 'timesteps': 10}
+    key = cache.settings_key(settings)
+    assert key == cache.settings_key({'timesteps': np.int64(10),
+                                      'alpha_beta': [20, -15.5],
+                                      'sites': 2})
+    assert key != cache.settings_key(dict(settings, timesteps=11))
+    assert key != cache.settings_key(dict(settings, alpha_beta=(20., 15.5)))
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics',
+    [(2, 'spin-boson', 'local dephasing lindblad'),
+     (3, 'nearest neighbour cyclic', 'global thermalising lindblad'),
+     (2, 'spin-boson', 'HEOM')])
+def test_time_evolution_loaded_from_disk(dims, interactions, dynamics,
+                                         monkeypatch):
+
+    """
+    Tests that the time evolution of a system with disk_cache set is
+    loaded, rather than re-evaluated, by a second system with the
+    same settings, along with any matsubara coefficients and
+    frequencies generated for a HEOM run.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=10,
+                         disk_cache=True)
+    evol = qsys.time_evolution
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Time evolution was re-evaluated.')
+
+    monkeypatch.setattr(evo, 'time_evo_lindblad', fail)
+    monkeypatch.setattr(evo, 'time_evo_heom', fail)
+    other = QuantumSystem(dims, interaction_model=interactions,
+                          dynamics_model=dynamics, timesteps=10,
+                          disk_cache=True)
+    loaded = other.time_evolution
+    for attr in ('times', 'rho', 'purity', 'distance'):
+        assert np.all(getattr(loaded, attr) == getattr(evol, attr))
+    if dynamics == 'HEOM':
+        assert np.all(other.matsubara_coeffs == qsys.matsubara_coeffs)
+        assert np.all(other.matsubara_freqs == qsys.matsubara_freqs)
+    other.timesteps = 11
+    with pytest.raises(AssertionError):
+        other.time_evolution
+
+
+@pytest.mark.parametrize('solver', ['qutip', 'native'])
+def test_settings_key_unchanged_by_evaluation(solver):
+
+    """
+    Tests that the disk cache key of a HEOM system is the same
+    before and after its time evolution is evaluated or loaded, and
+    that a loaded system whose temperature is then changed evolves
+    as a fresh system with that temperature.
+    """
+
+    kwargs = dict(interaction_model='spin-boson', dynamics_model='HEOM',
+                  heom_solver=solver, timesteps=10, bath_cutoff=3,
+                  disk_cache=True)
+    qsys = QuantumSystem(2, **kwargs)
+    key = cache.settings_key(qsys._settings())
+    qsys.time_evolution
+    assert cache.settings_key(qsys._settings()) == key
+    other = QuantumSystem(2, **kwargs)
+    other.time_evolution
+    assert cache.settings_key(other._settings()) == key
+    other.temperature = 77.
+    fresh = QuantumSystem(2, temperature=77., **kwargs)
+    assert cache.settings_key(other._settings()) == cache.settings_key(
+        fresh._settings())
+    assert np.allclose(other.time_evolution.rho, fresh.time_evolution.rho)
+    assert np.allclose(other.matsubara_coeffs, fresh.matsubara_coeffs)
+
+
+def test_evict_least_recently_used(cache_dir):
+
+    """
+    Tests that eviction removes the least recently used entries
+    first, where loading an entry counts as using it.
+    """
+
+    evol = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='local dephasing lindblad',
+                         timesteps=5).time_evolution
+    for idx, key in enumerate(['a', 'b', 'c']):
+        cache.save(key, evol)
+        os.utime(str(cache_dir / (key + '.npz')), (idx, idx))
+    assert cache.load('a') is not None
+    size = os.path.getsize(str(cache_dir / 'a.npz'))
+    cache.evict(2 * size)
+    assert sorted(os.listdir(str(cache_dir))) == ['a.npz', 'c.npz']
+    cache.clear()
+    assert cache.load('a') is None
+
+
+def test_concurrent_temporary_files(cache_dir, monkeypatch):
+
+    """
+    Tests that eviction ignores other processes' temporary files and
+    entries removed while it runs, and that a failed save raises its
+    own error even if its temporary file has already gone.
+    """
+
+    evol = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='local dephasing lindblad',
+                         timesteps=5).time_evolution
+    (cache_dir / 'writing.tmp').write_bytes(b'partial')
+    cache.save('a', evol)
+    cache.evict(0)
+    assert os.listdir(str(cache_dir)) == ['writing.tmp']
+    stat = os.stat
+
+    def vanished(path, *args, **kwargs):
+        if path.endswith('b.npz'):
+            raise FileNotFoundError(path)
+        return stat(path, *args, **kwargs)
+
+    cache.save('b', evol)
+    monkeypatch.setattr(os, 'stat', vanished)
+    cache.evict(0)
+    monkeypatch.setattr(os, 'stat', stat)
+
+    def interrupted(src, dst):
+        os.remove(src)
+        raise PermissionError(dst)
+
+    monkeypatch.setattr(os, 'replace', interrupted)
+    with pytest.raises(PermissionError):
+        cache.save('c', evol)
@@ -0,0 +1,102 @@
+"""Tests the functions contained within disorder.py"""
+
+import numpy as np
+import pytest
+
+from quantum_heom import disorder
+from quantum_heom import evolution as evo
+from quantum_heom import hamiltonian as ham
+from quantum_heom import lindbladian as lind
+from quantum_heom.quantum_system import QuantumSystem
+
+
+def test_running_statistics():
+
+    """
+    Tests that accumulating a stream of arrays in batches, and
+    merging accumulators, gives the same mean and variance as
+    evaluating them from all the arrays at once.
+    """
+
+    data = np.random.RandomState(0).normal(3., 2., (103, 4, 5))
+    first, second = (disorder.RunningStatistics((4, 5)) for _ in range(2))
+    for start in range(0, 60, 17):
+        first.update(data[start:min(start + 17, 60)])
+    second.update(data[60:])
+    first.merge(second)
+    assert first.count == 103
+    assert np.allclose(first.mean, np.mean(data, axis=0))
+    assert np.allclose(first.variance, np.var(data, axis=0, ddof=1))
+    assert np.allclose(first.confidence_interval(0.95),
+                       1.959964 * np.std(data, axis=0, ddof=1) / np.sqrt(103))
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics',
+    [(2, 'spin-boson', 'local dephasing lindblad'),
+     (3, 'nearest neighbour cyclic', 'global thermalising lindblad'),
+     (7, 'FMO', 'local thermalising lindblad')])
+def test_static_disorder_average(dims, interactions, dynamics):
+
+    """
+    Tests that the disorder-averaged dynamics match those averaged
+    by hand over the same realisations, that zero disorder gives
+    the dynamics of the ordered system, and that the system passed
+    is left unchanged.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=40)
+    times, mean, interval = disorder.static_disorder_average(qsys, 0., 3,
+                                                             seed=1)
+    assert np.allclose(times, qsys.time_evolution.times)
+    assert np.allclose(mean, qsys.time_evolution.rho)
+    assert np.allclose(interval, 0.)
+
+    realisations, seed = 5, 7
+    _, mean, interval = disorder.static_disorder_average(
+        qsys, 10., realisations, seed=seed, batch_size=realisations)
+    batch_seed = np.random.RandomState(seed).randint(2 ** 31, size=1)[0]
+    hamiltonians = disorder.disordered_hamiltonians(qsys.hamiltonian, 10.,
+                                                    realisations, batch_seed)
+    manual = []
+    for hamiltonian in hamiltonians:
+        superop = (ham.hamiltonian_superop(hamiltonian)
+                   + lind.lindbladian_superop(dims, dynamics, hamiltonian,
+                                              qsys.deph_rate,
+                                              qsys.cutoff_freq,
+                                              qsys.reorg_energy,
+                                              qsys.temperature,
+                                              qsys.spectral_density))
+        manual.append(evo.time_evo_lindblad(qsys.initial_density_matrix,
+                                            superop, 40, qsys.time_interval,
+                                            dynamics, hamiltonian,
+                                            qsys.temperature).rho)
+    assert np.allclose(mean, np.mean(manual, axis=0))
+    assert np.allclose(interval.real, 1.959964 * np.std(np.real(manual),
+                                                        axis=0, ddof=1)
+                       / np.sqrt(realisations), atol=1e-8)
+    assert np.allclose(qsys.hamiltonian, ham.system_hamiltonian(
+        dims, interactions, qsys.alpha_beta, qsys.epsi_delta))
+
+
+def test_static_disorder_processes():
+
+    """
+    Tests that the result for a given seed doesn't depend on the
+    number of processes, and that HEOM systems raise an error.
+    """
+
+    qsys = QuantumSystem(3, interaction_model='nearest neighbour linear',
+                         dynamics_model='local dephasing lindblad',
+                         timesteps=20)
+    serial = disorder.static_disorder_average(qsys, 5., 12, seed=3,
+                                              batch_size=4)
+    parallel = disorder.static_disorder_average(qsys, 5., 12, seed=3,
+                                                batch_size=4, processes=2)
+    for ser, par in zip(serial, parallel):
+        assert np.allclose(ser, par)
+    with pytest.raises(NotImplementedError):
+        disorder.static_disorder_average(
+            QuantumSystem(2, interaction_model='spin-boson',
+                          dynamics_model='HEOM'), 5., 4)
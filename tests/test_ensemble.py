@@ -0,0 +1,77 @@
+"""Tests the functions contained within ensemble.py"""
+
+import numpy as np
+import pytest
+
+from quantum_heom import ensemble
+from quantum_heom.quantum_system import QuantumSystem
+
+
+@pytest.mark.parametrize(
+    'dims, interactions',
+    [(2, 'spin-boson'),
+     (3, 'nearest neighbour cyclic'),
+     (5, 'nearest neighbour linear')])
+def test_ensemble_matches_individual(dims, interactions):
+
+    """
+    Tests that evolving an ensemble of systems, with different
+    dynamics models and parameters, in one batched pass gives the
+    same time evolution data as evaluating each system in turn.
+    """
+
+    systems = []
+    for model in ['local dephasing lindblad', 'global thermalising lindblad',
+                  'local thermalising lindblad']:
+        for temperature in [100., 300.]:
+            systems.append(QuantumSystem(dims, interaction_model=interactions,
+                                         dynamics_model=model,
+                                         temperature=temperature,
+                                         timesteps=100))
+    evolutions = ensemble.ensemble_time_evolution(systems)
+    for system, evol in zip(systems, evolutions):
+        expected = system.time_evolution
+        for attr in ('times', 'rho', 'purity', 'distance'):
+            assert np.allclose(getattr(evol, attr), getattr(expected, attr),
+                               atol=1e-10)
+
+
+def test_evolve_ensemble_stepping_fallback():
+
+    """
+    Tests that members whose eigendecompositions aren't trusted are
+    stepped with exponential propagators, giving the same result.
+    """
+
+    systems = [QuantumSystem(3, interaction_model='nearest neighbour cyclic',
+                             dynamics_model='global thermalising lindblad',
+                             alpha_beta=(20., beta))
+               for beta in [-15.5, -10., 5.]]
+    superops = ensemble.ensemble_superops(systems)
+    dens_mats = np.array([system.initial_density_matrix
+                          for system in systems])
+    times = np.linspace(0., 0.5, 21)  # ps
+    spectral = ensemble.evolve_ensemble(dens_mats, superops, times)
+    stepped = ensemble.evolve_ensemble(dens_mats, superops, times,
+                                       max_condition=0.)
+    assert spectral.shape == (3, 21, 3, 3)
+    assert np.allclose(spectral, stepped, atol=1e-10)
+
+
+def test_ensemble_invalid_systems():
+
+    """
+    Tests that an error is raised for ensembles of systems of
+    different sizes, or with HEOM dynamics.
+    """
+
+    with pytest.raises(AssertionError):
+        ensemble.ensemble_superops(
+            [QuantumSystem(2, interaction_model='spin-boson',
+                           dynamics_model='local dephasing lindblad'),
+             QuantumSystem(3, interaction_model='nearest neighbour cyclic',
+                           dynamics_model='local dephasing lindblad')])
+    with pytest.raises(AssertionError):
+        ensemble.ensemble_superops(
+            [QuantumSystem(2, interaction_model='spin-boson',
+                           dynamics_model='HEOM')])
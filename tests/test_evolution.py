@@ -1,10 +1,13 @@
 """Tests the functions in evolution.py"""
 
+from scipy import constants, linalg
+from scipy.sparse import linalg as sparse_linalg
 import numpy as np
 import pytest
 from itertools import product
 
 from quantum_heom import evolution as evo
+from quantum_heom import lindbladian as lind
 from quantum_heom import utilities as util
 from quantum_heom.quantum_system import QuantumSystem
 
@@ -117,3 +120,328 @@ def test_time_evo_lindblad_trace_one(dims, interactions, dynamics):
     for idx, step in enumerate(evol):
         trace = np.absolute(np.trace(step[1]))
         assert np.isclose(trace, 1.)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics',
+    [(2, 'spin-boson', 'local dephasing lindblad'),
+     (3, 'nearest neighbour cyclic', 'global thermalising lindblad'),
+     (7, 'FMO', 'local thermalising lindblad')])
+def test_lindblad_propagator_one_step(dims, interactions, dynamics):
+
+    """
+    Tests that evolving a density matrix with a LindbladPropagator
+    gives the same result as exponentiating the superoperator
+    directly.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics)
+    superop = qsys.hamiltonian_superop + qsys.lindbladian_superop
+    propa = evo.LindbladPropagator(superop, 5e-3)
+    rho = qsys.initial_density_matrix
+    assert propa.matches(superop, 5e-3)
+    assert not propa.matches(superop, 1e-3)
+    assert np.allclose(propa.evolve(rho),
+                       evo.evolve_matrix_one_step(rho, superop, 5e-3))
+
+
+def test_quantum_system_propagator_reuse():
+
+    """
+    Tests that a QuantumSystem reuses its propagator between time
+    evolutions that share a Liouvillian, and rebuilds it when the
+    time interval changes.
+    """
+
+    qsys = QuantumSystem(3, interaction_model='nearest neighbour linear',
+                         dynamics_model='global thermalising lindblad',
+                         timesteps=10)
+    propa = qsys.propagator
+    qsys.init_site_pop = [2]
+    evol = qsys.time_evolution
+    assert qsys.propagator is propa
+    assert np.allclose(evol[1][1], propa.evolve(qsys.initial_density_matrix))
+    qsys.time_interval = 2.
+    assert qsys.propagator is not propa
+    assert np.isclose(qsys.propagator.time_interval, 2e-3)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics',
+    [(2, 'spin-boson', 'local dephasing lindblad'),
+     (3, 'nearest neighbour cyclic', 'global thermalising lindblad'),
+     (7, 'FMO', 'local thermalising lindblad')])
+def test_time_evo_lindblad_spectral_matches_stepping(dims, interactions,
+                                                     dynamics):
+
+    """
+    Tests that the spectral propagation method gives the same
+    density matrices and trace measures as the stepping method.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=200)
+    stepped = qsys.time_evolution
+    qsys.propagation_method = 'spectral'
+    spectral = qsys.time_evolution
+    assert len(spectral) == len(stepped)
+    for step_a, step_b in zip(stepped, spectral):
+        assert np.isclose(step_a[0], step_b[0])
+        assert np.allclose(step_a[1], step_b[1])
+        assert np.isclose(step_a[2], step_b[2])
+        assert np.isclose(step_a[3], step_b[3])
+
+
+def test_evolve_matrix_times_non_uniform():
+
+    """
+    Tests that the density matrix evaluated at log-spaced times
+    matches that evaluated by exponentiating the superoperator at
+    each time individually.
+    """
+
+    qsys = QuantumSystem(7, interaction_model='FMO',
+                         dynamics_model='global thermalising lindblad')
+    superop = qsys.hamiltonian_superop + qsys.lindbladian_superop
+    rho = qsys.initial_density_matrix
+    times = np.logspace(-3, 1, 9)  # ps
+    evolved = evo.evolve_matrix_times(rho, superop, times)
+    for time, mat in zip(times, evolved):
+        assert np.allclose(mat, evo.evolve_matrix_one_step(rho, superop, time))
+
+
+def test_evolve_matrix_times_defective_fallback():
+
+    """
+    Tests that a defective superoperator (a Jordan block) cannot be
+    diagonalised, and that evolution at arbitrary times falls back
+    to stepping with exponential propagators.
+    """
+
+    superop = np.zeros((4, 4), dtype=complex)
+    superop[0][3] = 1.
+    superop[1][1], superop[2][2] = -1., -1.
+    with pytest.raises(np.linalg.LinAlgError):
+        evo.SpectralPropagator(superop)
+    rho = np.array([[0.5, 0.5], [0.5, 0.5]], dtype=complex)
+    times = np.array([0., 0.5, 1.5, 2.])
+    evolved = evo.evolve_matrix_times(rho, superop, times)
+    for time, mat in zip(times, evolved):
+        expected = evo.evolve_matrix_one_step(rho, superop, time)
+        assert np.allclose(mat, expected / np.trace(expected))
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, temperature',
+    [(2, 'spin-boson', 300.),
+     (3, 'nearest neighbour linear', 77.),
+     (7, 'FMO', 300.),
+     (7, 'FMO', 1.)])
+def test_equilibrium_state_thermal(dims, interactions, temperature):
+
+    """
+    Tests that the equilibrium state for thermalising models is the
+    normalised Boltzmann distribution over the Hamiltonian, and is
+    finite even at low temperatures.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model='global thermalising lindblad',
+                         temperature=temperature)
+    ham = qsys.hamiltonian
+    eq_state = evo.equilibrium_state(qsys.dynamics_model, dims, ham,
+                                     temperature)
+    assert np.all(np.isfinite(eq_state))
+    assert np.isclose(np.trace(eq_state), 1.)
+    # exp(-H / k_B T), shifted by the lowest site energy to avoid underflow
+    beta = 1e12 * constants.hbar / (constants.k * temperature)
+    shift = np.min(linalg.eigvalsh(ham))
+    expected = linalg.expm(- beta * (ham - shift * np.eye(dims)))
+    assert np.allclose(eq_state, expected / np.trace(expected))
+
+
+def test_time_evo_lindblad_precomputed_eq_state():
+
+    """
+    Tests that passing a precomputed equilibrium state gives the
+    same trace distances as computing it within the evolution.
+    """
+
+    qsys = QuantumSystem(7, interaction_model='FMO',
+                         dynamics_model='local thermalising lindblad',
+                         timesteps=50)
+    superop = qsys.hamiltonian_superop + qsys.lindbladian_superop
+    args = (qsys.initial_density_matrix, superop, qsys.timesteps,
+            qsys.time_interval, qsys.dynamics_model, qsys.hamiltonian,
+            qsys.temperature)
+    computed = evo.time_evo_lindblad(*args)
+    passed = evo.time_evo_lindblad(*args, eq_state=qsys.equilibrium_state)
+    for step_a, step_b in zip(computed, passed):
+        assert np.isclose(step_a[3], step_b[3])
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics, liouvillian_format',
+    [(2, 'spin-boson', 'local dephasing lindblad', 'dense'),
+     (5, 'nearest neighbour linear', 'local dephasing lindblad', 'sparse'),
+     (3, 'nearest neighbour cyclic', 'global thermalising lindblad', 'sparse'),
+     (7, 'FMO', 'local thermalising lindblad', 'dense')])
+def test_time_evo_lindblad_krylov_matches_stepping(dims, interactions,
+                                                   dynamics,
+                                                   liouvillian_format):
+
+    """
+    Tests that the Krylov propagation method gives the same density
+    matrices as the stepping method, for both dense and sparse
+    superoperators.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=100,
+                         liouvillian_format=liouvillian_format)
+    stepped = qsys.time_evolution
+    qsys.propagation_method = 'krylov'
+    krylov = qsys.time_evolution
+    assert np.allclose(krylov.times, stepped.times)
+    assert np.allclose(krylov.rho, stepped.rho)
+    assert np.allclose(krylov.distance, stepped.distance)
+
+
+def test_krylov_expm_multiply_matrix_free():
+
+    """
+    Tests that the Arnoldi method evaluates the action of the
+    exponential of a matrix-free superoperator at uneven times in
+    agreement with the dense matrix exponential.
+    """
+
+    qsys = QuantumSystem(7, interaction_model='FMO',
+                         dynamics_model='global thermalising lindblad')
+    superop = qsys.hamiltonian_superop + qsys.lindbladian_superop
+    operator = sparse_linalg.aslinearoperator(superop)
+    rho = qsys.initial_density_matrix
+    times = np.array([0., 1e-3, 0.05, 0.3, 2.])  # ps
+    evolved = evo.evolve_matrix_krylov(rho, operator, times)
+    for time, mat in zip(times, evolved):
+        assert np.allclose(mat, evo.evolve_matrix_one_step(rho, superop, time))
+
+
+def test_time_evo_lindblad_krylov_large_chain():
+
+    """
+    Tests that the Krylov method with a sparse Liouvillian can
+    evolve a chain too large to exponentiate densely, preserving
+    the trace and Hermiticity of the density matrix.
+    """
+
+    qsys = QuantumSystem(60, interaction_model='nearest neighbour linear',
+                         dynamics_model='local dephasing lindblad',
+                         timesteps=50, liouvillian_format='sparse',
+                         propagation_method='krylov')
+    evol = qsys.time_evolution
+    assert np.allclose(np.trace(evol.rho, axis1=1, axis2=2), 1.)
+    assert np.allclose(evol.rho, np.conjugate(np.swapaxes(evol.rho, 1, 2)))
+    assert np.all(evol.purity <= 1. + 1e-10)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics, method',
+    [(2, 'spin-boson', 'local dephasing lindblad', 'ode'),
+     (5, 'nearest neighbour linear', 'global thermalising lindblad', 'ode'),
+     (7, 'FMO', 'local thermalising lindblad', 'krylov'),
+     (3, 'nearest neighbour cyclic', 'local dephasing lindblad', 'krylov')])
+def test_time_evo_lindblad_matrix_free(dims, interactions, dynamics, method):
+
+    """
+    Tests that evolving with a matrix-free Liouvillian, with either
+    the ODE or Krylov method, gives the same density matrices as the
+    stepping method with the dense superoperator.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=100)
+    stepped = qsys.time_evolution
+    qsys.liouvillian_format = 'matrix-free'
+    qsys.propagation_method = method
+    evol = qsys.time_evolution
+    assert np.allclose(evol.rho, stepped.rho, atol=1e-7)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics, liouvillian_format, method',
+    [(2, 'spin-boson', 'local dephasing lindblad', 'dense', None),
+     (3, 'nearest neighbour cyclic', 'global thermalising lindblad', 'dense',
+      'iterative'),
+     (7, 'FMO', 'local thermalising lindblad', 'dense', 'direct'),
+     (7, 'FMO', 'global thermalising lindblad', 'sparse', 'direct'),
+     (40, 'nearest neighbour linear', 'local dephasing lindblad', 'sparse',
+      None)])
+def test_steady_state_lindblad(dims, interactions, dynamics,
+                               liouvillian_format, method):
+
+    """
+    Tests that the steady state found directly from the Liouvillian
+    is a trace-one fixed point of the dynamics, and matches the
+    analytic equilibrium state for each Lindblad model.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics,
+                         liouvillian_format=liouvillian_format)
+    superop = qsys.hamiltonian_superop + qsys.lindbladian_superop
+    steady = evo.steady_state_lindblad(superop, method)
+    assert np.isclose(np.trace(steady), 1.)
+    assert np.allclose(superop.dot(steady.flatten()), 0., atol=1e-8)
+    assert util.trace_distance(steady, qsys.equilibrium_state) < 1e-10
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, settings',
+    [(2, 'spin-boson', {}),
+     (7, 'FMO', {'temperature': 77.}),
+     (5, 'nearest neighbour linear', {'spectral_density': 'ohmic'}),
+     (4, 'nearest neighbour linear', {'spectral_density': 'renger-marcus'})])
+def test_secular_propagator(dims, interactions, settings):
+
+    """
+    Tests that evolving the populations and coherences of the
+    eigenstates separately with a SecularPropagator gives the same
+    density matrices as the full global thermalising Liouvillian,
+    with and without diagonalising the rate matrix.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model='global thermalising lindblad',
+                         timesteps=100, **settings)
+    times = qsys.time_evolution.times * 1e-3  # fs --> ps
+    propagator = qsys.secular_propagator
+    assert np.allclose(np.sum(propagator.rate_matrix, axis=0), 0.)
+    assert np.allclose(propagator.evolve(qsys.initial_density_matrix, times),
+                       qsys.time_evolution.rho, atol=1e-10)
+    exact = evo.SecularPropagator(qsys.hamiltonian, lind.glob_therm_rates(
+        qsys.hamiltonian, qsys.deph_rate, qsys.cutoff_freq, qsys.reorg_energy,
+        qsys.temperature, qsys.spectral_density, qsys.ohmic_exponent),
+                                  max_condition=0.)
+    assert np.allclose(exact.evolve(qsys.initial_density_matrix, times),
+                       qsys.time_evolution.rho, atol=1e-10)
+
+
+@pytest.mark.parametrize('dims', [3, 5])
+def test_secular_propagator_degenerate(dims):
+
+    """
+    Tests that the SecularPropagator of a degenerate (cyclic)
+    Hamiltonian evolves a density matrix in the same way as the
+    exponential of the global thermalising Liouvillian.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model='nearest neighbour cyclic',
+                         dynamics_model='global thermalising lindblad')
+    superop = qsys.hamiltonian_superop + qsys.lindbladian_superop
+    rho = qsys.initial_density_matrix
+    times = np.array([0., 0.01, 0.1, 1.])  # ps
+    expected = [np.matmul(linalg.expm(superop * time), rho.flatten('C'))
+                for time in times]
+    evolved = qsys.secular_propagator.evolve(rho, times)
+    assert np.allclose(evolved.reshape((len(times), -1)), expected)
@@ -107,6 +107,25 @@ def test_hamiltonian_superop_dimensions(dims):
     superop = ham.hamiltonian_superop(arr)
     assert superop.shape[0] == superop.shape[1] == dims**2
 
+@pytest.mark.parametrize(
+    'dims, model',
+    [(2, 'nearest neighbour cyclic'),
+     (10, 'nearest neighbour linear'),
+     (7, 'FMO'),
+     (2, 'spin-boson')])
+def test_hamiltonian_superop_sparse(dims, model):
+
+    """
+    Tests that the sparse Hamiltonian superoperator is a CSR matrix
+    equal to the dense superoperator.
+    """
+
+    hamiltonian = ham.system_hamiltonian(dims, model, (20., -15.5), (20., 40.))
+    dense = ham.hamiltonian_superop(hamiltonian)
+    superop = ham.hamiltonian_superop(hamiltonian, sparse_format=True)
+    assert superop.format == 'csr'
+    assert np.allclose(superop.toarray(), dense)
+
 @pytest.mark.parametrize(
     'inp_h, exp',
     [(np.array([[0, 1],
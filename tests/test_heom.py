@@ -1,9 +1,13 @@
 """Contains unit tests for functions in heom.py"""
 
+from scipy.special import comb
 import numpy as np
 import pytest
 
+from quantum_heom import bath
 import quantum_heom.heom as heom
+import quantum_heom.utilities as util
+from quantum_heom.quantum_system import QuantumSystem
 
 @pytest.mark.parametrize('sites, exp', [(2, np.array([[1, 0], [0, -1]]))])
 def test_system_bath_coupling_op(sites, exp):
@@ -14,3 +18,359 @@ def test_system_bath_coupling_op(sites, exp):
     """
 
     assert np.all(heom.system_bath_coupling_op(sites) == exp)
+
+
+@pytest.mark.parametrize('modes, depth', [(1, 5), (2, 3), (7, 2), (4, 0)])
+def test_ado_indices(modes, depth):
+
+    """
+    Tests that every ADO of a hierarchy up to the truncation depth
+    is enumerated exactly once, ordered by level with the system
+    density matrix first.
+    """
+
+    ados = heom.ado_indices(modes, depth)
+    levels = ados.sum(axis=1)
+    assert len(ados) == comb(modes + depth, depth, exact=True)
+    assert len(set(map(tuple, ados))) == len(ados)
+    assert np.all(ados >= 0) and np.all(levels <= depth)
+    assert np.all(np.diff(levels) >= 0) and not np.any(ados[0])
+
+
+def test_native_heom_matches_qutip():
+
+    """
+    Tests that the native HEOM engine reproduces the dynamics of
+    QuTiP's HSolverDL for a 2-site spin-boson system.
+    """
+
+    kwargs = dict(interaction_model='spin-boson', dynamics_model='HEOM',
+                  timesteps=50, bath_cutoff=5)
+    qutip = QuantumSystem(2, heom_solver='qutip', **kwargs)
+    native = QuantumSystem(2, heom_solver='native', **kwargs)
+    assert np.allclose(native.time_evolution.rho, qutip.time_evolution.rho,
+                       atol=1e-6)
+    assert np.allclose(native.matsubara_coeffs, qutip.matsubara_coeffs)
+    assert np.allclose(native.matsubara_freqs, qutip.matsubara_freqs)
+
+
+def test_qutip_heom_custom_matsubara_terms():
+
+    """
+    Tests that matsubara coefficients and frequencies set on a
+    system are used in the dynamics evaluated with QuTiP's HEOM
+    solver, as well as returned, giving the same dynamics as the
+    native HEOM engine with those terms.
+    """
+
+    kwargs = dict(interaction_model='spin-boson', dynamics_model='HEOM',
+                  timesteps=20, bath_cutoff=5)
+    default = QuantumSystem(2, **kwargs)
+    default.time_evolution
+    coeffs = default.matsubara_coeffs * 1.5
+    freqs = default.matsubara_freqs * 0.8
+    qutip = QuantumSystem(2, matsubara_coeffs=coeffs, matsubara_freqs=freqs,
+                          **kwargs)
+    native = QuantumSystem(2, matsubara_coeffs=coeffs, matsubara_freqs=freqs,
+                           heom_solver='native', **kwargs)
+    assert not np.allclose(qutip.time_evolution.rho,
+                           default.time_evolution.rho, atol=1e-3)
+    assert np.allclose(qutip.time_evolution.rho, native.time_evolution.rho,
+                       atol=1e-5)
+    assert np.allclose(qutip.matsubara_coeffs, coeffs)
+    qutip.matsubara_coeffs = coeffs[:1]
+    with pytest.raises(ValueError):
+        qutip.time_evolution
+
+
+@pytest.mark.parametrize('setting, value', [('temperature', 77.),
+                                            ('reorg_energy', 10.),
+                                            ('cutoff_freq', 20.)])
+def test_native_heom_bath_parameter_change(setting, value):
+
+    """
+    Tests that changing a bath parameter of a system whose HEOM
+    dynamics have been evaluated gives the same dynamics, steady
+    state and matsubara terms as a fresh system with that value,
+    rather than reusing the terms generated by the first run.
+    """
+
+    kwargs = dict(interaction_model='spin-boson', dynamics_model='HEOM',
+                  heom_solver='native', timesteps=20, bath_cutoff=3)
+    qsys = QuantumSystem(2, **kwargs)
+    qsys.time_evolution
+    qsys.steady_state
+    setattr(qsys, setting, value)
+    assert qsys.matsubara_coeffs is None and qsys.matsubara_freqs is None
+    fresh = QuantumSystem(2, **kwargs, **{setting: value})
+    assert np.allclose(qsys.time_evolution.rho, fresh.time_evolution.rho)
+    assert np.allclose(qsys.steady_state, fresh.steady_state)
+    assert np.allclose(qsys.matsubara_coeffs, fresh.matsubara_coeffs)
+    assert np.allclose(qsys.matsubara_freqs, fresh.matsubara_freqs)
+
+
+def test_native_heom_matsubara_terms_replaced():
+
+    """
+    Tests that matsubara coefficients and frequencies set on a
+    system replace all the generated terms, and that an error is
+    raised if their number differs from that of the expansion.
+    """
+
+    kwargs = dict(interaction_model='spin-boson', dynamics_model='HEOM',
+                  heom_solver='native', timesteps=20, bath_cutoff=3)
+    generated = QuantumSystem(2, **kwargs)
+    generated.time_evolution
+    qsys = QuantumSystem(2, matsubara_coeffs=generated.matsubara_coeffs,
+                         matsubara_freqs=generated.matsubara_freqs,
+                         **kwargs)
+    assert np.allclose(qsys.time_evolution.rho,
+                       generated.time_evolution.rho)
+    qsys.matsubara_coeffs = generated.matsubara_coeffs[:1]
+    with pytest.raises(ValueError):
+        qsys.time_evolution
+
+
+def test_native_heom_hierarchy_size_limit():
+
+    """
+    Tests that an error is raised for a hierarchy with more ADOs
+    than heom.MAX_ADOS, as for 7-site FMO at the default
+    bath_cutoff, before any of it is assembled.
+    """
+
+    qsys = QuantumSystem(7, interaction_model='FMO', dynamics_model='HEOM',
+                         heom_solver='native', timesteps=5)
+    assert qsys.bath_cutoff == 20
+    with pytest.raises(ValueError, match='MAX_ADOS'):
+        qsys.time_evolution
+
+
+@pytest.mark.parametrize(
+    'sites, interactions',
+    [(3, 'nearest neighbour linear'),
+     (7, 'FMO')])
+def test_native_heom_n_sites(sites, interactions):
+
+    """
+    Tests that the native HEOM engine evolves N-site systems, each
+    site coupled to its own bath, to valid density matrices; of unit
+    trace, Hermitian, and with populations that remain physical.
+    """
+
+    qsys = QuantumSystem(sites, interaction_model=interactions,
+                         dynamics_model='HEOM', heom_solver='native',
+                         timesteps=20, bath_cutoff=2, matsubara_terms=1)
+    evol = qsys.time_evolution
+    assert qsys.coupling_ops.shape == (sites, sites, sites)
+    assert np.allclose(np.trace(evol.rho, axis1=1, axis2=2), 1.)
+    assert np.allclose(evol.rho, np.conjugate(np.swapaxes(evol.rho, 1, 2)),
+                       atol=1e-10)
+    assert np.all(evol.populations > -1e-6)
+    assert not np.allclose(evol.rho[-1], evol.rho[0])
+
+
+def test_qutip_heom_solver_restricted():
+
+    """
+    Tests that an error is raised if trying to use QuTiP's HEOM
+    solver for a system other than the 2-site spin-boson model.
+    """
+
+    with pytest.raises(AssertionError):
+        QuantumSystem(3, interaction_model='nearest neighbour linear',
+                      dynamics_model='HEOM', heom_solver='qutip')
+    with pytest.raises(ValueError):
+        QuantumSystem(2, interaction_model='spin-boson',
+                      dynamics_model='HEOM', heom_solver='invalid')
+
+
+def test_native_heom_pade_expansion():
+
+    """
+    Tests that, at low temperature, HEOM dynamics evaluated with a
+    few Pade terms are closer to the converged dynamics than those
+    evaluated with the same number of Matsubara terms, and that the
+    Pade expansion is rejected by the qutip solver.
+    """
+
+    def evolve(expansion, terms):
+        qsys = QuantumSystem(2, interaction_model='spin-boson',
+                             dynamics_model='HEOM', heom_solver='native',
+                             bath_expansion=expansion, matsubara_terms=terms,
+                             temperature=77., reorg_energy=10.,
+                             bath_cutoff=5, timesteps=50)
+        return qsys.time_evolution.rho
+
+    converged = evolve('pade', 8)
+    pade_error = np.abs(evolve('pade', 3) - converged).max()
+    mats_error = np.abs(evolve('matsubara', 3) - converged).max()
+    assert pade_error < mats_error / 2
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='HEOM', bath_expansion='pade')
+    with pytest.raises(NotImplementedError):
+        qsys.time_evolution
+
+
+@pytest.mark.parametrize('setting, value', [('bath_expansion', 'pade'),
+                                            ('matsubara_terms', 1),
+                                            ('matsubara_terms', 4)])
+def test_native_heom_expansion_change(setting, value):
+
+    """
+    Tests that switching the bath expansion, or changing the number
+    of its terms, on a system whose HEOM dynamics have been
+    evaluated gives the same dynamics and terms as a fresh system
+    with that setting.
+    """
+
+    kwargs = dict(interaction_model='spin-boson', dynamics_model='HEOM',
+                  heom_solver='native', temperature=77., timesteps=20,
+                  bath_cutoff=3, matsubara_terms=3)
+    qsys = QuantumSystem(2, **kwargs)
+    qsys.time_evolution
+    setattr(qsys, setting, value)
+    kwargs[setting] = value
+    fresh = QuantumSystem(2, **kwargs)
+    assert np.allclose(qsys.time_evolution.rho, fresh.time_evolution.rho)
+    assert np.allclose(qsys.matsubara_coeffs, fresh.matsubara_coeffs)
+    assert np.allclose(qsys.matsubara_freqs, fresh.matsubara_freqs)
+
+
+@pytest.mark.parametrize('modes, depth', [(2, 3), (4, 2)])
+def test_ado_adjacency(modes, depth):
+
+    """
+    Tests that ADOs are adjacent in the hierarchy exactly when they
+    differ by a single excitation of a single mode.
+    """
+
+    ados = heom.ado_indices(modes, depth)
+    adjacency = heom.ado_adjacency(ados).toarray()
+    diffs = np.abs(ados[:, np.newaxis, :] - ados[np.newaxis, :, :]).sum(axis=2)
+    assert np.all((adjacency > 0) == (diffs == 1))
+
+
+@pytest.mark.parametrize('tolerance, atol', [(1e-8, 1e-7), (1e-4, 1e-3)])
+def test_native_heom_ado_filtering(tolerance, atol):
+
+    """
+    Tests that HEOM dynamics evaluated with adaptive filtering of
+    the ADOs agree with those of the full hierarchy, to within an
+    error set by the filtering tolerance.
+    """
+
+    kwargs = dict(interaction_model='nearest neighbour linear',
+                  dynamics_model='HEOM', heom_solver='native',
+                  bath_expansion='pade', bath_cutoff=4, timesteps=40)
+    full = QuantumSystem(3, **kwargs).time_evolution
+    filtered = QuantumSystem(3, ado_tolerance=tolerance,
+                             **kwargs).time_evolution
+    assert np.allclose(filtered.rho, full.rho, atol=atol)
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='HEOM', ado_tolerance=tolerance)
+    with pytest.raises(NotImplementedError):
+        qsys.time_evolution
+
+
+def test_converge_hierarchy():
+
+    """
+    Tests that the converged hierarchy settings give dynamics close
+    to those of a deeper hierarchy with more terms, and that an
+    error is raised if they can't be converged within the limits.
+    """
+
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='HEOM', heom_solver='native',
+                         bath_expansion='pade', timesteps=20)
+    depth, terms = qsys.converge_hierarchy(tolerance=1e-3, timesteps=20)
+    assert depth >= 1 and terms >= 1
+    qsys.bath_cutoff, qsys.matsubara_terms = depth, terms
+    converged = qsys.time_evolution.rho
+    qsys.bath_cutoff, qsys.matsubara_terms = depth + 2, terms + 2
+    refined = qsys.time_evolution.rho
+    assert np.max(util.batch_trace_distance(converged, refined)) < 5e-3
+    with pytest.raises(ValueError):
+        qsys.converge_hierarchy(tolerance=1e-3, timesteps=20, max_depth=2)
+
+
+def test_cached_hierarchy_generator():
+
+    """
+    Tests that the generator for a given system and bath is
+    assembled once and reused, and that changing the truncation
+    gives a different generator.
+    """
+
+    heom.clear_generator_cache()
+    ham = np.array([[10., -5.], [-5., -10.]])
+    ops = heom.system_bath_coupling_ops(2, 'spin-boson')
+    coeffs, freqs = np.array([100. - 8j, 5.]), np.array([6., 250.])
+    first = heom.cached_hierarchy_generator(ham, ops, coeffs, freqs, 3, 0.1)
+    again = heom.cached_hierarchy_generator(ham.copy(), ops.copy(), coeffs,
+                                            freqs, 3, 0.1)
+    deeper = heom.cached_hierarchy_generator(ham, ops, coeffs, freqs, 4, 0.1)
+    assert again is first and deeper is not first
+    assert (first != heom.hierarchy_generator(ham, ops, coeffs, freqs, 3,
+                                              0.1)).nnz == 0
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, solver',
+    [(2, 'spin-boson', 'qutip'),
+     (2, 'spin-boson', 'native'),
+     (3, 'nearest neighbour cyclic', 'native')])
+def test_time_evolutions_batch(dims, interactions, solver):
+
+    """
+    Tests that evolving a batch of initial states together gives
+    the same dynamics as evolving systems initialised in each state
+    separately, and leaves the system's initial state unchanged.
+    """
+
+    kwargs = dict(interaction_model=interactions, dynamics_model='HEOM',
+                  heom_solver=solver, bath_cutoff=4, timesteps=30)
+    pops = [[1], [2], [1, 2]]
+    qsys = QuantumSystem(dims, **kwargs)
+    evols = qsys.time_evolutions(pops)
+    assert qsys.init_site_pop == [1]
+    for pop, evol in zip(pops, evols):
+        single = QuantumSystem(dims, init_site_pop=pop, **kwargs)
+        assert np.allclose(evol.rho, single.time_evolution.rho, atol=1e-8)
+        assert np.allclose(evol.distance, single.time_evolution.distance,
+                           atol=1e-8)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, method',
+    [(2, 'spin-boson', 'direct'),
+     (2, 'spin-boson', 'iterative'),
+     (3, 'nearest neighbour cyclic', 'direct'),
+     (3, 'nearest neighbour cyclic', 'iterative')])
+def test_hierarchy_steady_state(dims, interactions, method):
+
+    """
+    Tests that the steady state found directly from the hierarchy
+    generator is a valid density matrix, matches that of the
+    QuantumSystem, and matches the system density matrix after
+    propagating the hierarchy to long times.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model='HEOM', heom_solver='native',
+                         bath_cutoff=3, matsubara_terms=2)
+    coeffs, freqs = bath.matsubara_decomposition(qsys.cutoff_freq,
+                                                 qsys.reorg_energy,
+                                                 qsys.temperature, 2)
+    terminator = bath.terminator_factor(qsys.cutoff_freq, qsys.reorg_energy,
+                                        qsys.temperature, coeffs, freqs)
+    generator = heom.hierarchy_generator(qsys.hamiltonian, qsys.coupling_ops,
+                                         coeffs, freqs, 3, terminator)
+    steady = heom.hierarchy_steady_state(generator, dims, method)
+    assert np.isclose(np.trace(steady), 1.)
+    assert np.allclose(steady, steady.conjugate().T)
+    assert np.allclose(steady, qsys.steady_state, atol=1e-8)
+    final = heom.propagate_hierarchy(generator, qsys.initial_density_matrix,
+                                     np.array([0., 50.]))[-1]
+    assert np.allclose(final / np.trace(final), steady, atol=1e-6)
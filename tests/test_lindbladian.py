@@ -1,7 +1,7 @@
 """Tests the functions that build the dephaising lindbladian operators
 and lindbladian superoperator."""
 
-from itertools import product
+from itertools import permutations, product
 
 from scipy import linalg
 import numpy as np
@@ -10,6 +10,7 @@ import pytest
 from quantum_heom.quantum_system import QuantumSystem
 import quantum_heom.evolution as evo
 import quantum_heom.lindbladian as lind
+import quantum_heom.utilities as util
 
 from quantum_heom.lindbladian import LINDBLAD_MODELS
 
@@ -216,3 +217,168 @@ def test_lindbladian_superop_therm_correct(dyn, ham, cutoff, reorg,
                                        spectral_density=spec)
     diff = np.round(superop - expected, decimals=7)
     assert np.allclose(diff, 0)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions',
+    [(2, 'spin-boson'),
+     (7, 'FMO'),
+     (3, 'nearest neighbour cyclic'),
+     (5, 'nearest neighbour cyclic')])
+def test_glob_therm_lindbladian_degenerate(dims, interactions):
+
+    """
+    Tests that the global thermalising Lindbladian is equal to the
+    sum of the superoperators of its Lindblad operators transformed
+    from the orthonormal eigenbasis of the Hamiltonian in Liouville
+    space, and that for degenerate (cyclic) as well as
+    non-degenerate Hamiltonians its Liouvillian preserves the trace
+    and has the Gibbs state as a stationary state.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model='global thermalising lindblad')
+    rates = lind.glob_therm_rates(qsys.hamiltonian, qsys.deph_rate,
+                                  qsys.cutoff_freq, qsys.reorg_energy,
+                                  qsys.temperature, qsys.spectral_density,
+                                  qsys.ohmic_exponent)
+    eigs = linalg.eigh(qsys.hamiltonian)[1]
+    expected = np.zeros((dims ** 2, dims ** 2), dtype=complex)
+    for state_a, state_b in permutations(range(dims), 2):
+        l_op = lind.glob_therm_lindblad_op(dims, state_a, state_b)
+        expected += rates[state_a, state_b] * util.basis_change(
+            lind.lindblad_superop_sum_element(l_op), eigs, True)
+    assert np.allclose(qsys.lindbladian_superop, expected)
+    liouvillian = qsys.hamiltonian_superop + qsys.lindbladian_superop
+    trace = np.eye(dims).flatten('C')
+    assert np.allclose(np.matmul(trace, liouvillian), 0.)
+    assert np.allclose(np.matmul(liouvillian,
+                                 qsys.equilibrium_state.flatten('C')), 0.)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics',
+    [(2, 'spin-boson', 'local dephasing lindblad'),
+     (5, 'nearest neighbour linear', 'local dephasing lindblad'),
+     (2, 'spin-boson', 'global thermalising lindblad'),
+     (7, 'FMO', 'global thermalising lindblad'),
+     (3, 'nearest neighbour cyclic', 'local thermalising lindblad'),
+     (7, 'FMO', 'local thermalising lindblad')])
+def test_lindbladian_superop_sparse_matches_dense(dims, interactions,
+                                                  dynamics):
+
+    """
+    Tests that the sparse Lindbladian superoperator is equal to the
+    dense one for each Lindblad model, and that a QuantumSystem set
+    to the sparse format evolves in the same way.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=20)
+    dense = qsys.lindbladian_superop
+    evol = qsys.time_evolution
+    qsys.liouvillian_format = 'sparse'
+    superop = qsys.lindbladian_superop
+    assert superop.format == 'csr'
+    assert np.allclose(superop.toarray(), dense)
+    assert np.allclose(qsys.time_evolution.rho, evol.rho)
+
+
+@pytest.mark.parametrize('dims', [10, 50])
+def test_lindbladian_superop_sparse_loc_deph_nnz(dims):
+
+    """
+    Tests that the sparse local dephasing Lindbladian only stores
+    the dims^2 - dims non-zero elements that dephase the
+    coherences.
+    """
+
+    superop = lind.lindbladian_superop(dims, 'local dephasing lindblad',
+                                       deph_rate=11., sparse_format=True)
+    assert superop.nnz == dims ** 2 - dims
+
+
+def test_liouvillian_format_invalid():
+
+    """
+    Tests that setting an invalid Liouvillian format raises a
+    ValueError.
+    """
+
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='local dephasing lindblad')
+    with pytest.raises(ValueError):
+        qsys.liouvillian_format = 'banded'
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics',
+    [(2, 'spin-boson', 'local dephasing lindblad'),
+     (4, 'nearest neighbour cyclic', 'local dephasing lindblad'),
+     (3, 'nearest neighbour linear', 'global thermalising lindblad'),
+     (7, 'FMO', 'global thermalising lindblad'),
+     (2, 'spin-boson', 'local thermalising lindblad'),
+     (7, 'FMO', 'local thermalising lindblad')])
+def test_liouvillian_operator_matches_superop(dims, interactions, dynamics):
+
+    """
+    Tests that the matrix-free Liouvillian acts on a (random, not
+    necessarily Hermitian) vectorised matrix in the same way as the
+    dense Hamiltonian plus Lindbladian superoperator.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics)
+    dense = qsys.hamiltonian_superop + qsys.lindbladian_superop
+    qsys.liouvillian_format = 'matrix-free'
+    operator = qsys.liouvillian
+    rng = np.random.RandomState(dims)
+    vec = rng.randn(dims ** 2) + 1j * rng.randn(dims ** 2)
+    assert operator.shape == dense.shape
+    assert np.allclose(operator.matvec(vec), np.matmul(dense, vec))
+
+
+@pytest.mark.parametrize('dims, sparse_format',
+                         [(2, False), (5, True), (9, False), (12, True)])
+def test_loc_deph_lindbladian_matches_operators(dims, sparse_format):
+
+    """
+    Tests that the local dephasing Lindbladian built directly is
+    equal to that built from the sum over its Lindblad operators.
+    """
+
+    l_ops = lind.lindblad_operators(dims, 'local dephasing lindblad',
+                                    deph_rate=11.)
+    expected = lind.lindbladian_from_operators(l_ops, dims, sparse_format)
+    superop = lind.loc_deph_lindbladian(dims, 11., sparse_format)
+    if sparse_format:
+        assert superop.format == 'csr'
+        superop, expected = superop.toarray(), expected.toarray()
+    assert np.array_equal(superop, expected)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions',
+    [(2, 'spin-boson'),
+     (7, 'FMO'),
+     (30, 'nearest neighbour linear'),
+     (40, 'nearest neighbour cyclic')])
+def test_loc_deph_liouvillian_operator(dims, interactions):
+
+    """
+    Tests that the specialised local dephasing Liouvillian, with
+    both dense and sparse Hamiltonians, acts in the same way as the
+    general matrix-free Liouvillian built from its Lindblad
+    operators.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model='local dephasing lindblad')
+    general = lind.liouvillian_operator(qsys.hamiltonian,
+                                        qsys.lindblad_operators)
+    operator = lind.loc_deph_liouvillian_operator(qsys.hamiltonian,
+                                                  qsys.deph_rate)
+    rng = np.random.RandomState(dims)
+    vec = rng.randn(dims ** 2) + 1j * rng.randn(dims ** 2)
+    assert operator.shape == general.shape
+    assert np.allclose(operator.matvec(vec), general.matvec(vec))
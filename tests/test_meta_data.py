@@ -1,8 +1,11 @@
 """Tests the functions in metadata.py"""
 
+import numpy as np
 import pytest
 
+from quantum_heom import evolution
 from quantum_heom import metadata as meta
+from quantum_heom import utilities as util
 from quantum_heom.quantum_system import QuantumSystem
 
 
@@ -23,3 +26,83 @@ def test_integrate_trace_distance_zero(sites, interactions, dynamics):
                          dynamics_model=dynamics)
 
     assert meta.integrate_trace_distance([qsys], qsys) == [0]
+
+
+def test_calc_equilibration_time_heom():
+
+    """
+    Tests that the equilibration time of a HEOM system is the time
+    after which its trace distance to the steady state stays below
+    the tolerance, and that an error is raised if it is never
+    reached.
+    """
+
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='HEOM', heom_solver='native',
+                         bath_cutoff=3, timesteps=1000)
+    time = meta.calc_equilibration_time(qsys)
+    distances = util.batch_trace_distance(qsys.time_evolution.rho,
+                                          qsys.steady_state)
+    after = qsys.time_evolution.times >= time
+    assert 0. < time < qsys.time_evolution.times[-1]
+    assert np.all(distances[after] < 0.01)
+    qsys.timesteps = 5
+    with pytest.raises(ValueError):
+        meta.calc_equilibration_time(qsys)
+
+
+def test_calc_equilibration_time_heom_qutip(monkeypatch):
+
+    """
+    Tests that the equilibration time of a HEOM system evaluated
+    with QuTiP's solver is found from the flattening out of its
+    trace distance to the equilibrium state, without solving for
+    the steady state with the native HEOM engine.
+    """
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Steady state was evaluated.')
+
+    monkeypatch.setattr(evolution, 'steady_state_heom', fail)
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='HEOM', heom_solver='qutip',
+                         bath_cutoff=3, timesteps=500)
+    time = meta.calc_equilibration_time(qsys)
+    evol = qsys.time_evolution
+    idx = np.flatnonzero(evol.times == time)[0]
+    assert 0. < time < evol.times[-1]
+    assert np.all(np.abs(evol.distance[idx + np.array([6, 11, 16, 51])]
+                         - evol.distance[idx]) < 0.01)
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 200])
+def test_equilibration_monitor(batch_size):
+
+    """
+    Tests that the monitor detects equilibration at the first time
+    from which the measure stays below the tolerance for the whole
+    window, whatever the size of the batches it is fed, and for
+    both the distance to a reference and the step-to-step change.
+    """
+
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='global thermalising lindblad',
+                         timesteps=1500)
+    evol = qsys.time_evolution
+    change = util.batch_trace_distance(evol.rho[1:], evol.rho[:-1])
+    for reference, measures in [(qsys.equilibrium_state, evol.distance),
+                                (None, np.concatenate([[np.inf], change]))]:
+        tolerance = np.sort(measures)[len(measures) // 2]
+        monitor = meta.EquilibrationMonitor(tolerance, 20, reference)
+        for start in range(0, len(evol), batch_size):
+            if monitor.update(evol[start:start + batch_size]):
+                break
+        below = measures < tolerance
+        runs = [idx for idx in range(len(below) - 19)
+                if np.all(below[idx:idx + 20])]
+        assert monitor.equilibrated
+        assert monitor.equilibration_time == evol.times[runs[0]]
+        assert monitor.end == runs[0] + 19
+    monitor = meta.EquilibrationMonitor(1e-12, 20, qsys.equilibrium_state)
+    assert not monitor.update(evol)
+    assert monitor.equilibration_time is None
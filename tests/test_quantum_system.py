@@ -224,3 +224,205 @@
 #     qsys.init_site_pop = input
 #
 #     assert np.all(qsys.initial_density_matrix == exp)
+
+
+import numpy as np
+import pytest
+
+from quantum_heom import utilities as util
+from quantum_heom.quantum_system import QuantumSystem, dependent_quantities
+
+
+@pytest.mark.parametrize(
+    'dynamics', ['local dephasing lindblad', 'global thermalising lindblad',
+                 'HEOM'])
+def test_time_evolution_memoised(dynamics):
+
+    """
+    Tests that the time evolution is only evaluated once for a
+    QuantumSystem whose settings haven't changed, and that it can't
+    be modified in place.
+    """
+
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model=dynamics, timesteps=20)
+    evol = qsys.time_evolution
+    assert qsys.time_evolution is evol
+    assert qsys.hamiltonian is qsys.hamiltonian
+    with pytest.raises(ValueError):
+        evol.rho[0][0][0] = 0.
+
+
+def test_init_site_pop_modified_in_place():
+
+    """
+    Tests that modifying the list of initial site populations, either
+    that passed to the setter or that returned by the getter, in
+    place has no effect on the system, so can't leave stale initial
+    density matrices or time evolutions memoised.
+    """
+
+    sites = [1]
+    qsys = QuantumSystem(3, interaction_model='nearest neighbour linear',
+                         dynamics_model='local dephasing lindblad',
+                         init_site_pop=sites, timesteps=5)
+    initial = qsys.initial_density_matrix
+    sites.append(2)
+    qsys.init_site_pop.append(3)
+    assert qsys.init_site_pop == [1]
+    assert qsys.initial_density_matrix is initial
+    qsys.init_site_pop = sites
+    sites.append(3)
+    assert qsys.init_site_pop == [1, 2]
+    assert np.allclose(qsys.time_evolution.rho[0],
+                       [[0.5, 0.5, 0.], [0.5, 0.5, 0.], [0., 0., 0.]])
+
+
+@pytest.mark.parametrize(
+    'setting, value, kept, invalidated',
+    [('init_site_pop', [2], ['hamiltonian', 'propagator', 'equilibrium_state'],
+      ['initial_density_matrix', 'time_evolution']),
+     ('temperature', 77., ['hamiltonian', 'initial_density_matrix'],
+      ['equilibrium_state', 'lindbladian_superop', 'propagator',
+       'time_evolution']),
+     ('alpha_beta', (10., -5.), ['initial_density_matrix'],
+      ['hamiltonian', 'hamiltonian_superop', 'lindbladian_superop',
+       'equilibrium_state', 'propagator', 'time_evolution']),
+     ('timesteps', 10, ['hamiltonian', 'propagator', 'equilibrium_state'],
+      ['time_evolution']),
+     ('time_interval', 2., ['hamiltonian', 'lindbladian_superop'],
+      ['propagator', 'time_evolution'])])
+def test_setter_invalidates_dependents(setting, value, kept, invalidated):
+
+    """
+    Tests that setting a parameter of a QuantumSystem invalidates
+    exactly the memoised quantities that depend on it, so they are
+    re-evaluated on next access, while others are reused.
+    """
+
+    qsys = QuantumSystem(3, interaction_model='nearest neighbour linear',
+                         dynamics_model='global thermalising lindblad',
+                         timesteps=20)
+    before = {name: getattr(qsys, name) for name in kept + invalidated}
+    before['time_evolution'] = qsys.time_evolution
+    setattr(qsys, setting, value)
+    for name in kept:
+        assert getattr(qsys, name) is before[name]
+    for name in invalidated:
+        assert name in dependent_quantities(setting)
+        assert getattr(qsys, name) is not before[name]
+    evol = qsys.time_evolution
+    assert len(evol) == qsys.timesteps + 1
+    assert np.allclose(evol.rho[0], qsys.initial_density_matrix)
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics, settings',
+    [(3, 'nearest neighbour cyclic', 'global thermalising lindblad',
+      {'propagation_method': 'stepping'}),
+     (3, 'nearest neighbour cyclic', 'local thermalising lindblad',
+      {'propagation_method': 'spectral'}),
+     (3, 'nearest neighbour linear', 'local dephasing lindblad',
+      {'propagation_method': 'krylov', 'liouvillian_format': 'sparse'}),
+     (2, 'spin-boson', 'local dephasing lindblad',
+      {'propagation_method': 'ode'}),
+     (2, 'spin-boson', 'HEOM', {'heom_solver': 'native', 'bath_cutoff': 4}),
+     (3, 'nearest neighbour cyclic', 'HEOM',
+      {'heom_solver': 'native', 'bath_cutoff': 4, 'ado_tolerance': 1e-10})])
+def test_stream_time_evolution(dims, interactions, dynamics, settings):
+
+    """
+    Tests that the batches yielded by stream_time_evolution() join
+    to give the same time evolution as time_evolution, for each
+    propagation method and for HEOM dynamics.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=45, **settings)
+    batches = list(qsys.stream_time_evolution(batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 10, 10, 6]
+    evol = qsys.time_evolution
+    tol = 1e-6 if settings.get('propagation_method') == 'ode' else 1e-8
+    for attr in ('times', 'rho', 'purity', 'distance'):
+        streamed = np.concatenate([getattr(batch, attr) for batch in batches])
+        assert np.allclose(streamed, getattr(evol, attr), atol=tol)
+    longer = list(qsys.stream_time_evolution(batch_size=50, timesteps=60))
+    assert longer[-1].times[-1] == 60 * qsys.time_interval
+
+
+def test_stream_time_evolution_qutip_heom():
+
+    """
+    Tests that streaming HEOM dynamics with the qutip heom_solver
+    raises an error.
+    """
+
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='HEOM')
+    with pytest.raises(NotImplementedError):
+        qsys.stream_time_evolution()
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics, settings',
+    [(2, 'spin-boson', 'global thermalising lindblad', {}),
+     (3, 'nearest neighbour cyclic', 'local dephasing lindblad',
+      {'propagation_method': 'spectral'}),
+     (2, 'spin-boson', 'HEOM', {'heom_solver': 'native', 'bath_cutoff': 4})])
+def test_evolve_until_equilibrated(dims, interactions, dynamics, settings):
+
+    """
+    Tests that evolving until equilibrated stops at the end of the
+    window once the system has equilibrated, giving the start of
+    the time evolution and the same equilibration time as found
+    from the full time evolution, and evolves for all the timesteps
+    if it doesn't equilibrate.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=2000, **settings)
+    evol, time = qsys.evolve_until_equilibrated(tolerance=0.01, window=20,
+                                                batch_size=50)
+    full = qsys.time_evolution
+    assert len(evol) < len(full)
+    assert np.allclose(evol.rho, full.rho[:len(evol)], atol=1e-8)
+    distances = util.batch_trace_distance(full.rho, qsys.steady_state)
+    start = int(round(time / qsys.time_interval))
+    assert np.all(distances[start:len(evol)] < 0.01)
+    assert len(evol) == start + 20
+    assert distances[start - 1] >= 0.01
+    evol, time = qsys.evolve_until_equilibrated(timesteps=10)
+    assert len(evol) == 11 and time is None
+    with pytest.raises(ValueError):
+        qsys.evolve_until_equilibrated(measure='invalid')
+
+
+@pytest.mark.parametrize(
+    'dims, interactions',
+    [(2, 'spin-boson'),
+     (3, 'nearest neighbour cyclic'),
+     (7, 'FMO')])
+def test_secular_propagation_method(dims, interactions):
+
+    """
+    Tests that the 'secular' propagation method gives the same time
+    evolution as stepping, whether evaluated in full, at arbitrary
+    times or streamed, including for the degenerate cyclic
+    Hamiltonian, and can only be used for the global thermalising
+    model.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model='global thermalising lindblad',
+                         timesteps=60)
+    stepped = qsys.time_evolution
+    qsys.propagation_method = 'secular'
+    assert np.allclose(qsys.time_evolution.rho, stepped.rho, atol=1e-10)
+    streamed = np.concatenate([batch.rho for batch in
+                               qsys.stream_time_evolution(batch_size=25)])
+    assert np.allclose(streamed, stepped.rho, atol=1e-10)
+    evol = qsys.time_evolution_at(stepped.times[[0, 7, 60]])
+    assert np.allclose(evol.rho, stepped.rho[[0, 7, 60]], atol=1e-10)
+    qsys.dynamics_model = 'local thermalising lindblad'
+    with pytest.raises(ValueError):
+        qsys.time_evolution
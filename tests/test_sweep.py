@@ -0,0 +1,73 @@
+"""Tests the functions contained within sweep.py"""
+
+import numpy as np
+import pytest
+
+from quantum_heom import metadata as meta
+from quantum_heom import sweep
+from quantum_heom.quantum_system import QuantumSystem
+
+
+def test_parameter_grid():
+
+    """
+    Tests that the grid holds every combination of the parameter
+    values, with the last parameter varying fastest.
+    """
+
+    points = sweep.parameter_grid({'temperature': [100., 300.],
+                                   'alpha': [1., 2., 3.]})
+    assert points.dtype.names == ('temperature', 'alpha')
+    assert np.all(points['temperature'] == [100.] * 3 + [300.] * 3)
+    assert np.all(points['alpha'] == [1., 2., 3.] * 2)
+    with pytest.raises(AssertionError):
+        sweep.parameter_grid({'sites': [2, 3]})
+
+
+@pytest.mark.parametrize(
+    'name, value, attr, expected',
+    [('alpha', 5., 'alpha_beta', (5., -15.5)),
+     ('beta', 5., 'alpha_beta', (20., 5.)),
+     ('temperature', 77., 'temperature', 77.)])
+def test_set_parameter(name, value, attr, expected):
+
+    """
+    Tests that single elements of the Hamiltonian parameters, and
+    other settings, are set correctly.
+    """
+
+    qsys = QuantumSystem(2, interaction_model='nearest neighbour linear',
+                         dynamics_model='local thermalising lindblad')
+    sweep.set_parameter(qsys, name, value)
+    assert getattr(qsys, attr) == expected
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_sweep_matches_serial(processes):
+
+    """
+    Tests that sweeping over a grid, serially or over a pool of
+    processes, gives the same integrated trace distances as
+    setting the parameters of the systems directly, and leaves the
+    systems passed unchanged.
+    """
+
+    kwargs = dict(interaction_model='nearest neighbour linear', timesteps=50)
+    systems = [QuantumSystem(3, dynamics_model='local thermalising lindblad',
+                             **kwargs),
+               QuantumSystem(3, dynamics_model='global thermalising lindblad',
+                             **kwargs)]
+    reference = QuantumSystem(3, dynamics_model='local dephasing lindblad',
+                              **kwargs)
+    grid = {'alpha': [10., 20.], 'temperature': [100., 300.]}
+    results = sweep.sweep(systems, reference, grid, processes=processes)
+    assert results.shape == (4,)
+    assert results['integ_dist'].shape == (4, 2)
+    assert systems[0].alpha_beta == (20., -15.5)
+    assert systems[0].temperature == 300.
+    for point in results:
+        for system in systems + [reference]:
+            system.alpha_beta = (point['alpha'], -15.5)
+            system.temperature = point['temperature']
+        expected = meta.integrate_trace_distance(systems, reference)
+        assert np.allclose(point['integ_dist'], expected)
@@ -0,0 +1,102 @@
+"""Tests the Trajectory class in trajectory.py"""
+
+import numpy as np
+import pytest
+
+from quantum_heom import evolution as evo
+from quantum_heom.quantum_system import QuantumSystem
+from quantum_heom.trajectory import Trajectory
+
+
+@pytest.mark.parametrize(
+    'dims, interactions, dynamics',
+    [(2, 'spin-boson', 'local dephasing lindblad'),
+     (3, 'nearest neighbour cyclic', 'global thermalising lindblad'),
+     (7, 'FMO', 'local thermalising lindblad'),
+     (2, 'spin-boson', 'HEOM')])
+def test_time_evolution_trajectory_shapes(dims, interactions, dynamics):
+
+    """
+    Tests that the time evolution of a QuantumSystem is returned as
+    a Trajectory whose arrays have a row for each timestep.
+    """
+
+    qsys = QuantumSystem(dims, interaction_model=interactions,
+                         dynamics_model=dynamics, timesteps=20)
+    evol = qsys.time_evolution
+    assert isinstance(evol, Trajectory)
+    assert evol.dims == dims
+    assert evol.times.shape == (21,)
+    assert evol.rho.shape == (21, dims, dims)
+    assert evol.purity.shape == (21,)
+    assert evol.distance.shape == (21,)
+    assert np.allclose(evol.times, np.arange(21) * qsys.time_interval)
+    assert np.allclose(evol.rho[0], qsys.initial_density_matrix)
+
+
+def test_trajectory_views_share_memory():
+
+    """
+    Tests that populations and density matrix elements are views of
+    the Trajectory's density matrix data, rather than copies.
+    """
+
+    qsys = QuantumSystem(3, interaction_model='nearest neighbour linear',
+                         dynamics_model='local dephasing lindblad',
+                         timesteps=10)
+    evol = qsys.time_evolution
+    pops, coh = evol.populations, evol.element('21')
+    assert np.shares_memory(pops, evol.rho)
+    assert np.shares_memory(coh, evol.rho)
+    assert pops.shape == (11, 3)
+    assert np.allclose(pops, np.real(evol.rho.diagonal(axis1=1, axis2=2)))
+    assert np.allclose(coh, evol.rho[:, 1, 0])
+
+
+def test_trajectory_legacy_round_trip():
+
+    """
+    Tests that indexing and iterating over a Trajectory gives steps
+    in the legacy (time, matrix, squared, distance) form, and that
+    converting to and from the legacy format preserves the data.
+    """
+
+    qsys = QuantumSystem(2, interaction_model='spin-boson',
+                         dynamics_model='global thermalising lindblad',
+                         timesteps=5)
+    evol = qsys.time_evolution
+    legacy = evol.legacy()
+    assert len(legacy) == len(evol)
+    for idx, step in enumerate(evol):
+        time, matrix, squared, distance = step
+        assert time == evol.times[idx] == legacy[idx][0]
+        assert np.all(matrix == evol.rho[idx])
+        assert squared == evol.purity[idx]
+        assert distance == evol.distance[idx]
+    rebuilt = Trajectory.from_legacy(legacy)
+    assert np.all(rebuilt.rho == evol.rho)
+    assert np.all(rebuilt.distance == evol.distance)
+    sliced = evol[2:]
+    assert isinstance(sliced, Trajectory) and len(sliced) == len(evol) - 2
+
+
+@pytest.mark.parametrize('legacy', [True, False])
+def test_process_evo_data_trajectory(legacy):
+
+    """
+    Tests that processing the time evolution data gives the same
+    arrays when passed either a Trajectory or legacy format data.
+    """
+
+    qsys = QuantumSystem(3, interaction_model='nearest neighbour cyclic',
+                         dynamics_model='local thermalising lindblad',
+                         timesteps=10)
+    evol = qsys.time_evolution
+    data = evol.legacy() if legacy else evol
+    times, matrix_data, squared, distance = evo.process_evo_data(
+        data, ['11', '21'], ['squared', 'distance'])
+    assert np.all(times == evol.times)
+    assert np.all(matrix_data['11'] == evol.rho[:, 0, 0])
+    assert np.all(matrix_data['21'] == evol.rho[:, 1, 0])
+    assert np.all(squared == evol.purity)
+    assert np.all(distance == evol.distance)
@@ -38,6 +38,33 @@ def test_trace_matrix_squared_not_pure(mat, ans):
     assert np.isclose(util.trace_matrix_squared(mat), ans)
 
 
+@pytest.mark.parametrize('dims', [2, 3, 7])
+def test_batch_trace_measures_match_single(dims):
+
+    """
+    Tests that the batched trace of matrix squared and trace
+    distance match those evaluated one matrix at a time, for a
+    stack of random density matrices and both a single and a
+    stacked reference.
+    """
+
+    rng = np.random.RandomState(dims)
+    mats = np.empty((5, dims, dims), dtype=complex)
+    for idx in range(5):
+        tmp = rng.randn(dims, dims) + 1j * rng.randn(dims, dims)
+        tmp = np.matmul(tmp, tmp.conjugate().T)
+        mats[idx] = tmp / np.trace(tmp)
+    ref = np.eye(dims) / dims
+    squared = util.batch_trace_matrix_squared(mats)
+    dists = util.batch_trace_distance(mats, ref)
+    pairwise = util.batch_trace_distance(mats, mats[::-1])
+    for idx, mat in enumerate(mats):
+        assert np.isclose(squared[idx], util.trace_matrix_squared(mat))
+        assert np.isclose(dists[idx], util.trace_distance(mat, ref))
+        assert np.isclose(pairwise[idx],
+                          util.trace_distance(mat, mats[::-1][idx]))
+
+
 @pytest.mark.parametrize(
     'mat_a, mat_b, ans',
     [(np.array([[0, 0], [0, 0]]),
@@ -140,6 +167,24 @@ def test_renormalise_matrix_invalid(matrix):
     with pytest.raises(AssertionError):
         util.renormalise_matrix(matrix)
 
+def test_batch_renormalise_matrices():
+
+    """
+    Asserts that the batched renormalisation matches renormalising
+    each matrix in turn, and raises an error if any matrix in the
+    stack has trace zero.
+    """
+
+    matrices = np.array([[[1, 2], [3, 4]],
+                         [[100, -300], [2, 44]],
+                         [[0.5j, 1], [1, 0.5]]])
+    renormalised = util.batch_renormalise_matrices(matrices)
+    for matrix, expected in zip(matrices, renormalised):
+        assert np.allclose(util.renormalise_matrix(matrix), expected)
+    with pytest.raises(AssertionError):
+        util.batch_renormalise_matrices(np.array([np.eye(2),
+                                                  [[1, 2], [3, -1]]]))
+
 # -------------------------------------------------------------------
 # OTHER FUNCTIONS
 # -------------------------------------------------------------------